@@ -20,6 +20,10 @@ CONFIG_FOLDER = join(ROOT_FOLDER, 'configs')
 DB_FOLDER = join(ROOT_FOLDER, 'db')
 REPORT_FOLDER = join(ROOT_FOLDER, 'report')
 TMP_FOLDER = join(ROOT_FOLDER, 'tmp')
+CODE_CACHE_FOLDER = join(ROOT_FOLDER, 'cache', 'code')
+MANIFEST_FOLDER = join(ROOT_FOLDER, 'cache', 'manifest')
+ENV_CACHE_FOLDER = join(ROOT_FOLDER, 'cache', 'env')
+WHEEL_FOLDER = join(ROOT_FOLDER, 'cache', 'wheel')
 
 os.makedirs(ROOT_FOLDER, exist_ok=True)
 os.makedirs(DATA_FOLDER, exist_ok=True)
@@ -30,6 +34,10 @@ os.makedirs(CONFIG_FOLDER, exist_ok=True)
 os.makedirs(DB_FOLDER, exist_ok=True)
 os.makedirs(REPORT_FOLDER, exist_ok=True)
 os.makedirs(TMP_FOLDER, exist_ok=True)
+os.makedirs(CODE_CACHE_FOLDER, exist_ok=True)
+os.makedirs(MANIFEST_FOLDER, exist_ok=True)
+os.makedirs(ENV_CACHE_FOLDER, exist_ok=True)
+os.makedirs(WHEEL_FOLDER, exist_ok=True)
 
 # copy conf files if they do not exist
 
@@ -70,6 +78,25 @@ MASTER_PORT_RANGE = list(map(int, os.getenv('MASTER_PORT_RANGE').split('-')))
 FILE_SYNC_INTERVAL = int(os.getenv('FILE_SYNC_INTERVAL', '0'))
 WORKER_USAGE_INTERVAL = int(os.getenv('WORKER_USAGE_INTERVAL', '10'))
 INSTALL_DEPENDENCIES = os.getenv('INSTALL_DEPENDENCIES') == 'True'
+WORKER_WARM_POOL = os.getenv('WORKER_WARM_POOL') == 'True'
+WORKER_SCALE = os.getenv('WORKER_SCALE') == 'True'
+WORKER_MIN = int(os.getenv('WORKER_MIN', '1'))
+WORKER_IDLE_TIMEOUT = int(os.getenv('WORKER_IDLE_TIMEOUT', '300'))
+WORKER_MAX_MEMORY = float(os.getenv('WORKER_MAX_MEMORY', '90'))
+BLOB_STORE = os.getenv('BLOB_STORE', 'DB')
+BLOB_FOLDER = os.path.abspath(
+    os.path.expanduser(os.getenv('BLOB_FOLDER', join(ROOT_FOLDER, 'blobs'))))
+CODE_CACHE_SIZE = int(os.getenv('CODE_CACHE_SIZE', '1024'))
+FILE_CODEC = os.getenv('FILE_CODEC', 'zlib')
+FILE_RECOMPRESS_INTERVAL = int(os.getenv('FILE_RECOMPRESS_INTERVAL', '3600'))
+UPLOAD_MAX_FILE_SIZE = int(os.getenv('UPLOAD_MAX_FILE_SIZE', '10'))
+UPLOAD_MAX_SIZE = int(os.getenv('UPLOAD_MAX_SIZE', '100'))
+SYNC_MAX_TRANSFERS = int(os.getenv('SYNC_MAX_TRANSFERS', '4'))
+SYNC_BANDWIDTH = float(os.getenv('SYNC_BANDWIDTH', '0'))
+SYNC_LINK_BANDWIDTH = float(os.getenv('SYNC_LINK_BANDWIDTH', '0'))
+SYNC_FANOUT = int(os.getenv('SYNC_FANOUT', '0'))
+TASK_STALE_PENALTY = float(os.getenv('TASK_STALE_PENALTY', '0'))
+TASK_STALE_HOLD = int(os.getenv('TASK_STALE_HOLD', '0'))
 
 REDIS_HOST = os.getenv('REDIS_HOST')
 REDIS_PASSWORD = os.getenv('REDIS_PASSWORD')
@@ -120,5 +147,13 @@ __all__ = [
     'FILE_LOG_LEVEL', 'DB_TYPE', 'SA_CONNECTION_STRING', 'FLASK_ENV',
     'DOCKER_MAIN', 'IP', 'PORT', 'LOG_NAME', 'WORKER_USAGE_INTERVAL',
     'FILE_SYNC_INTERVAL', 'INSTALL_DEPENDENCIES', 'SYNC_WITH_THIS_COMPUTER',
-    'CAN_PROCESS_TASKS', 'TMP_FOLDER', 'CONTOUR_FILE', 'REPORT_FOLDER'
+    'CAN_PROCESS_TASKS', 'TMP_FOLDER', 'CONTOUR_FILE', 'REPORT_FOLDER',
+    'WORKER_WARM_POOL', 'BLOB_STORE', 'BLOB_FOLDER', 'CODE_CACHE_FOLDER',
+    'CODE_CACHE_SIZE', 'MANIFEST_FOLDER', 'FILE_CODEC',
+    'FILE_RECOMPRESS_INTERVAL', 'UPLOAD_MAX_FILE_SIZE', 'UPLOAD_MAX_SIZE',
+    'ENV_CACHE_FOLDER',
+    'WHEEL_FOLDER', 'SYNC_MAX_TRANSFERS', 'SYNC_BANDWIDTH',
+    'SYNC_LINK_BANDWIDTH', 'SYNC_FANOUT', 'TASK_STALE_PENALTY',
+    'TASK_STALE_HOLD', 'WORKER_SCALE', 'WORKER_MIN', 'WORKER_IDLE_TIMEOUT',
+    'WORKER_MAX_MEMORY'
 ]
@@ -20,16 +20,17 @@ from mlcomp.db.providers import \
     ComputerProvider, \
     TaskProvider, \
     StepProvider, \
-    ProjectProvider, DockerProvider
+    ProjectProvider, DockerProvider, FileProvider
 from mlcomp.report import create_report, check_statuses
 from mlcomp.utils.config import merge_dicts_smart, dict_from_list_str
 from mlcomp.utils.logging import create_logger
 from mlcomp.worker.executors.kaggle import Submit
-from mlcomp.worker.sync import sync_directed, correct_folders
+from mlcomp.worker.sync import sync_directed, project_folders
 from mlcomp.worker.tasks import execute_by_id
+from mlcomp.worker.storage import Storage
 from mlcomp.utils.misc import memory, disk, get_username, \
     get_default_network_interface, now
-from mlcomp.server.back.create_dags import dag_standard, dag_pipe
+from mlcomp.server.back.create_dags import dag_standard_grid, dag_pipe
 
 _session = Session.create_session(key=__name__)
 
@@ -51,20 +52,17 @@ def _dag(config: str, debug: bool = False, control_reqs=True,
     if type_name == DagType.Standard.name.lower():
         cells = grid_cells(
             config_parsed['grid']) if 'grid' in config_parsed else [None]
-        dags = []
-        for cell in cells:
-            dag = dag_standard(
-                session=_session,
-                config=config_parsed,
-                debug=debug,
-                config_text=config_text,
-                config_path=config,
-                control_reqs=control_reqs,
-                logger=logger,
-                component=ComponentType.Client,
-                grid_cell=cell
-            )
-            dags.append(dag)
+        dags = dag_standard_grid(
+            session=_session,
+            config=config_parsed,
+            debug=debug,
+            cells=cells,
+            config_text=config_text,
+            config_path=config,
+            control_reqs=control_reqs,
+            logger=logger,
+            component=ComponentType.Client
+        )
 
         return dags
 
@@ -204,18 +202,7 @@ def sync(project: str, computer: str, only_from: bool, only_to: bool,
     p = project_provider.by_name(project)
     assert p, f'Project={project} is not found'
 
-    sync_folders = yaml_load(p.sync_folders)
-    ignore_folders = yaml_load(p.ignore_folders)
-
-    sync_folders = correct_folders(sync_folders, p.name)
-    ignore_folders = correct_folders(ignore_folders, p.name)
-
-    if not isinstance(sync_folders, list):
-        sync_folders = []
-    if not isinstance(ignore_folders, list):
-        ignore_folders = []
-
-    folders = [[s, ignore_folders] for s in sync_folders]
+    folders = project_folders(p)
 
     for c in computers:
         if c.name != computer.name:
@@ -228,6 +215,61 @@ def sync(project: str, computer: str, only_from: bool, only_to: bool,
                 sync_directed(_session, c, computer, folders)
 
 
+@main.command()
+@click.option('--batch_size', type=int, default=100)
+def blob_migrate(batch_size: int):
+    """
+    Moves the contents of the uploaded files from the DB to the blob store
+    """
+    logger = create_logger(_session, name='blob_migrate')
+    storage = Storage(
+        _session, logger=logger, component=ComponentType.Client
+    )
+    count = storage.migrate_blobs(batch_size=batch_size)
+    print(f'{count} files moved to the blob store')
+
+
+@main.command()
+@click.option('--min_age', type=int, default=3600,
+              help='keep blobs younger than min_age seconds')
+def blob_gc(min_age: int):
+    """
+    Removes the blobs which are not referenced by any file
+    """
+    logger = create_logger(_session, name='blob_gc')
+    storage = Storage(
+        _session, logger=logger, component=ComponentType.Client
+    )
+    count = storage.collect_garbage(min_age=min_age)
+    print(f'{count} blobs removed')
+
+
+@main.command()
+@click.option('--batch_size', type=int, default=100)
+def file_recompress(batch_size: int):
+    """
+    Rewrites the uploaded files with the codec set by FILE_CODEC
+    """
+    logger = create_logger(_session, name='file_recompress')
+    storage = Storage(
+        _session, logger=logger, component=ComponentType.Client
+    )
+    count = storage.recompress(batch_size=batch_size)
+    print(f'{count} files rewritten')
+
+
+@main.command()
+def file_stats():
+    """
+    Prints the logical and physical size of the files per project
+    """
+    for row in FileProvider(_session).stats():
+        print(f'{row["project"]}: files = {row["count"]}, '
+              f'size = {row["size"]}, '
+              f'physical size = {row["physical_size"]}, '
+              f'saved = {row["saved"]}')
+
+
 @main.command()
 def init():
     env_path = join(CONFIG_FOLDER, '.env')
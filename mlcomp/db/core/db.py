@@ -62,6 +62,21 @@ class Session(session.Session):
 
             del cls.__session[key]
 
+    @classmethod
+    def dispose_all(cls):
+        """
+        Closes all the sessions and disposes their connection pools.
+        The sessions stay usable, connections are reopened on demand.
+        Must be called before os.fork
+        """
+        for s, engine in cls.__session.values():
+            try:
+                s.close()
+            except Exception:
+                pass
+
+            engine.dispose()
+
     def query(self, *entities, **kwargs):
         try:
             return super().query(*entities, **kwargs)
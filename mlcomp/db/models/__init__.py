@@ -1,8 +1,9 @@
 from .project import Project
-from .task import Task, TaskDependence, TaskSynced
-from .file import File
-from .dag_storage import DagStorage, DagLibrary
-from .computer import Computer, ComputerUsage
+from .task import Task, TaskDependence, TaskSynced, TaskProgress, \
+    TaskUsage
+from .file import File, FileChunk
+from .dag_storage import CodeSnapshot, DagStorage, DagLibrary
+from .computer import Computer, ComputerUsage, SyncManifest
 from .log import Log
 from .step import Step
 from .dag import Dag, DagTag
@@ -17,5 +18,6 @@ __all__ = [
     'Project', 'Task', 'TaskDependence', 'File', 'DagStorage', 'DagLibrary',
     'Computer', 'ComputerUsage', 'Log', 'Step', 'Dag', 'ReportSeries',
     'ReportImg', 'ReportTasks', 'Report', 'ReportLayout', 'Docker', 'Model',
-    'Auxiliary', 'TaskSynced', 'Memory', 'Space', 'DagTag'
+    'Auxiliary', 'TaskSynced', 'Memory', 'Space', 'DagTag', 'TaskProgress',
+    'CodeSnapshot', 'FileChunk', 'SyncManifest', 'TaskUsage'
 ]
@@ -34,4 +34,23 @@ class ComputerUsage(Base):
     time = sa.Column(sa.DateTime, default=now())
 
 
-__all__ = ['Computer', 'ComputerUsage']
+class SyncManifest(Base):
+    """
+    Change manifest of a sync folder on a computer.
+    It is published by the computer, so the others compare the hashes
+    before running rsync
+    """
+    __tablename__ = 'sync_manifest'
+
+    computer = sa.Column(sa.String, ForeignKey('computer.name'),
+                         primary_key=True)
+    folder = sa.Column(sa.String, primary_key=True)
+    hash = sa.Column(sa.String)
+    # json list of the excluded paths
+    excluded = sa.Column(sa.String)
+    # json dict: top-level entry -> hash
+    children = sa.Column(sa.String)
+    updated = sa.Column(sa.DateTime)
+
+
+__all__ = ['Computer', 'ComputerUsage', 'SyncManifest']
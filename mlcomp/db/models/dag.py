@@ -1,6 +1,6 @@
 import sqlalchemy as sa
 from sqlalchemy import ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 
 from mlcomp.db.models.base import Base
 from mlcomp.utils.misc import now
@@ -19,9 +19,12 @@ class Dag(Base):
     docker_img = sa.Column(sa.String)
     img_size = sa.Column(sa.BigInteger, nullable=False, default=0)
     file_size = sa.Column(sa.BigInteger, nullable=False, default=0)
+    file_physical_size = sa.Column(sa.BigInteger, nullable=False, default=0)
     type = sa.Column(sa.Integer, default=0)
     report = sa.Column(sa.Integer, ForeignKey('report.id'))
     report_rel = relationship('Report', lazy='noload')
+    executor_index = deferred(sa.Column(sa.String))
+    snapshot = sa.Column(sa.Integer, ForeignKey('code_snapshot.id'))
 
 
 class DagTag(Base):
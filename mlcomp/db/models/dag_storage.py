@@ -2,6 +2,19 @@ import sqlalchemy as sa
 from sqlalchemy import ForeignKey
 
 from mlcomp.db.models.base import Base
+from mlcomp.utils.misc import now
+
+
+class CodeSnapshot(Base):
+    """
+    Immutable set of the storage entries shared by the dags.
+    The entries of a dag itself override the ones of its snapshot
+    """
+    __tablename__ = 'code_snapshot'
+
+    id = sa.Column(sa.Integer, primary_key=True)
+    project = sa.Column(sa.Integer, ForeignKey('project.id'))
+    created = sa.Column(sa.DateTime, default=now())
 
 
 class DagStorage(Base):
@@ -9,6 +22,7 @@ class DagStorage(Base):
 
     id = sa.Column(sa.Integer, primary_key=True)
     dag = sa.Column(sa.Integer, ForeignKey('dag.id'))
+    snapshot = sa.Column(sa.Integer, ForeignKey('code_snapshot.id'))
     file = sa.Column(sa.Integer, ForeignKey('file.id'))
     path = sa.Column(sa.String)
     is_dir = sa.Column(sa.Boolean)
@@ -23,4 +37,4 @@ class DagLibrary(Base):
     version = sa.Column(sa.String)
 
 
-__all__ = ['DagStorage', 'DagLibrary']
+__all__ = ['CodeSnapshot', 'DagStorage', 'DagLibrary']
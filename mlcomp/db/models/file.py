@@ -16,10 +16,29 @@ class File(Base):
     project = sa.Column(sa.Integer, ForeignKey('project.id'))
     dag = sa.Column(sa.Integer, ForeignKey('dag.id'))
     size = sa.Column(sa.BigInteger, nullable=False, default=0)
+    # None for the raw content
+    codec = sa.Column(sa.String)
+    # codec the content has been compressed with last.
+    # The content stays raw if it has not shrunk
+    codec_checked = sa.Column(sa.String)
+    physical_size = sa.Column(sa.BigInteger)
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.size = sys.getsizeof(self.content)
+        if self.content is not None:
+            self.size = sys.getsizeof(self.content)
 
 
-__all__ = ['File']
+class FileChunk(Base):
+    """
+    Chunk of a large file. Chunks are files themselves,
+    so they are deduplicated by md5
+    """
+    __tablename__ = 'file_chunk'
+
+    file = sa.Column(sa.Integer, ForeignKey('file.id'), primary_key=True)
+    index = sa.Column(sa.Integer, primary_key=True)
+    chunk = sa.Column(sa.Integer, ForeignKey('file.id'))
+
+
+__all__ = ['File', 'FileChunk']
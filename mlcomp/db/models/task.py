@@ -38,17 +38,14 @@ class Task(Base):
     report = sa.Column(sa.Integer, ForeignKey('report.id'))
     report_rel = relationship('Report', lazy='noload')
     gpu_assigned = sa.Column(sa.String)
+    cpu_assigned = sa.Column(sa.String)
     parent = sa.Column(sa.Integer, ForeignKey('task.id'))
     parent_rel = relationship('Task', lazy='noload')
     loss = sa.Column(sa.Float)
 
     continued = sa.Column(sa.Boolean, default=False)
-
-    batch_index = sa.Column(sa.Integer)
-    batch_total = sa.Column(sa.Integer)
-    loader_name = sa.Column(sa.String)
-    epoch_duration = sa.Column(sa.Integer)
-    epoch_time_remaining = sa.Column(sa.Integer)
+    priority = sa.Column(sa.Integer, default=0)
+    preempt = sa.Column(sa.Boolean, default=False)
 
     result = deferred(sa.Column(sa.String))
     additional_info = deferred(sa.Column(sa.String))
@@ -69,4 +66,39 @@ class TaskSynced(Base):
     task = sa.Column(sa.Integer, ForeignKey('task.id'), primary_key=True)
 
 
-__all__ = ['Task', 'TaskDependence', 'TaskSynced']
+class TaskProgress(Base):
+    __tablename__ = 'task_progress'
+
+    task = sa.Column(sa.Integer, ForeignKey('task.id'), primary_key=True)
+    batch_index = sa.Column(sa.Integer)
+    batch_total = sa.Column(sa.Integer)
+    loader_name = sa.Column(sa.String)
+    epoch_duration = sa.Column(sa.Integer)
+    epoch_time_remaining = sa.Column(sa.Integer)
+    loss = sa.Column(sa.Float)
+    time = sa.Column(sa.DateTime)
+
+
+class TaskUsage(Base):
+    """
+    Resources used by the process tree of a task,
+    sampled by the worker supervisor
+    """
+    __tablename__ = 'task_usage'
+
+    task = sa.Column(sa.Integer, ForeignKey('task.id'), primary_key=True)
+    # json list of [seconds since the start, cpu %, rss MB, read MB,
+    # written MB, threads]
+    timeline = sa.Column(sa.String)
+    samples = sa.Column(sa.Integer)
+    cpu_mean = sa.Column(sa.Float)
+    cpu_peak = sa.Column(sa.Float)
+    memory_mean = sa.Column(sa.Float)
+    memory_peak = sa.Column(sa.Float)
+    read = sa.Column(sa.Float)
+    write = sa.Column(sa.Float)
+    threads_peak = sa.Column(sa.Integer)
+    time = sa.Column(sa.DateTime)
+
+
+__all__ = ['Task', 'TaskDependence', 'TaskSynced', 'TaskProgress', 'TaskUsage']
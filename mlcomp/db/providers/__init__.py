@@ -18,6 +18,9 @@ from .auxiliary import AuxiliaryProvider
 from .task_synced import TaskSyncedProvider
 from .memory import MemoryProvider
 from .space import SpaceProvider
+from .task_progress import TaskProgressProvider
+from .sync_manifest import SyncManifestProvider
+from .task_usage import TaskUsageProvider
 
 __all__ = [
     'ProjectProvider', 'TaskProvider', 'FileProvider', 'DagStorageProvider',
@@ -25,5 +28,6 @@ __all__ = [
     'DagProvider', 'ReportImgProvider', 'ReportProvider',
     'ReportLayoutProvider', 'ReportSeriesProvider', 'ReportTasksProvider',
     'DockerProvider', 'ModelProvider', 'AuxiliaryProvider',
-    'TaskSyncedProvider', 'MemoryProvider', 'SpaceProvider'
+    'TaskSyncedProvider', 'MemoryProvider', 'SpaceProvider',
+    'TaskProgressProvider', 'SyncManifestProvider', 'TaskUsageProvider'
 ]
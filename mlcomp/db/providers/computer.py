@@ -9,6 +9,7 @@ from mlcomp.db.core import PaginatorOptions
 from mlcomp.db.enums import TaskStatus
 from mlcomp.db.providers.base import BaseDataProvider
 from mlcomp.db.models import Computer, ComputerUsage, Task, Docker, Project
+from mlcomp.utils.io import yaml_load
 from mlcomp.utils.misc import now, parse_time
 
 
@@ -57,6 +58,8 @@ class ComputerProvider(BaseDataProvider):
 
             item['sync_status'] = sync_status
             item['sync_date'] = sync_date
+            meta = yaml_load(c.meta) if c.meta else dict()
+            item['sync_transfers'] = meta.get('sync', [])
 
             item['usage'] = json.loads(item['usage']) \
                 if item['usage'] else default_usage
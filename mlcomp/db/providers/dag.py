@@ -1,11 +1,11 @@
 from typing import List
 
-from sqlalchemy import func, or_, case
+from sqlalchemy import func, or_, case, exists
 
 from mlcomp.db.core import PaginatorOptions
 from mlcomp.db.enums import TaskStatus, TaskType
 from mlcomp.db.models import Project, Dag, Task, ReportTasks, TaskDependence, \
-    DagTag
+    DagTag, DagStorage, CodeSnapshot, File, FileChunk
 from mlcomp.db.providers.base import BaseDataProvider
 from mlcomp.utils.misc import to_snake, duration_format, now, parse_time
 
@@ -85,7 +85,7 @@ class DagProvider(BaseDataProvider):
         total = query.count()
         paginator = self.paginator(query, options) if options else query
         res = []
-        rules = ('-tasks.dag_rel',)
+        rules = ('-tasks.dag_rel', '-executor_index')
 
         for dag, \
             project_name, \
@@ -225,9 +225,50 @@ class DagProvider(BaseDataProvider):
     def by_project(self, id: int):
         return self.query(Dag).filter(Dag.project == id).all()
 
+    def remove(self, key_value, key_column: str = 'id'):
+        ids = [
+            id for id, in self.query(Dag.id).filter(
+                getattr(Dag, key_column) == key_value)
+        ]
+        self.remove_all(ids)
+
+    def _remove_unused_files(self, projects: List[int]):
+        """
+        Files of the removed dags which are not used by other dags.
+        The files of the existing dags are kept, they may belong
+        to an upload in progress. Chunks go after the files made of them
+        """
+        for _ in range(2):
+            used = or_(
+                exists().where(DagStorage.file == File.id),
+                exists().where(FileChunk.chunk == File.id),
+                exists().where(Dag.id == File.dag)
+            )
+            self.query(File). \
+                filter(File.project.in_(projects)). \
+                filter(~used). \
+                delete(synchronize_session=False)
+
     def remove_all(self, ids: List[int]):
+        projects = [
+            p for p, in self.query(Dag.project).filter(
+                Dag.id.in_(ids)).distinct()
+        ]
         self.query(Dag).filter(Dag.id.in_(ids)).delete(
             synchronize_session=False)
+
+        # snapshots which are not used anymore
+        used = exists().where(Dag.snapshot == CodeSnapshot.id)
+        snapshots = [s for s, in self.query(CodeSnapshot.id).filter(~used)]
+        if snapshots:
+            self.query(DagStorage). \
+                filter(DagStorage.snapshot.in_(snapshots)). \
+                delete(synchronize_session=False)
+            self.query(CodeSnapshot). \
+                filter(CodeSnapshot.id.in_(snapshots)). \
+                delete(synchronize_session=False)
+        if projects:
+            self._remove_unused_files(projects)
         self.commit()
 
     def count(self):
@@ -1,15 +1,100 @@
-from mlcomp.db.models import DagStorage, File, DagLibrary
+from collections import OrderedDict
+
+from sqlalchemy import insert, literal, select, or_
+
+from mlcomp.db.models import DagStorage, File, DagLibrary, Dag, CodeSnapshot
 from mlcomp.db.providers.base import BaseDataProvider
+from mlcomp.utils.misc import now
 
 
 class DagStorageProvider(BaseDataProvider):
     model = DagStorage
 
-    def by_dag(self, dag: int):
-        query = self.query(DagStorage, File).join(File, isouter=True). \
-            filter(DagStorage.dag == dag). \
+    def _entries(self, dag: int, *columns):
+        """
+        Entries of the dag snapshot overridden by the entries of the dag
+        """
+        snapshot = self.query(Dag.snapshot).filter(Dag.id == dag).scalar()
+        criterion = DagStorage.dag == dag
+        if snapshot is not None:
+            criterion = or_(criterion, DagStorage.snapshot == snapshot)
+
+        query = self.query(DagStorage, *columns). \
+            join(File, isouter=True). \
+            filter(criterion). \
             order_by(DagStorage.path)
-        return query.all()
+
+        res = OrderedDict()
+        for row in query.all():
+            path = row[0].path
+            if path not in res or row[0].dag is not None:
+                res[path] = row
+        return list(res.values())
+
+    def by_dag(self, dag: int):
+        return self._entries(dag, File)
+
+    def hashes_by_dag(self, dag: int):
+        """
+        Same as by_dag, but the files are represented by id and md5 only
+        """
+        return self._entries(dag, File.id, File.md5)
+
+    def tree(self, dag: int):
+        """
+        Same as by_dag, but the files are represented by id, md5 and size
+        """
+        return self._entries(dag, File.id, File.md5, File.size)
+
+    def freeze(self, dag: Dag):
+        """
+        Moves the entries of a dag without a snapshot to a new snapshot
+        :return: snapshot id
+        """
+        if dag.snapshot is not None:
+            return dag.snapshot
+
+        snapshot = CodeSnapshot(project=dag.project, created=now())
+        self.add(snapshot, commit=False)
+        self.session.flush()
+
+        self.query(DagStorage). \
+            filter(DagStorage.dag == dag.id). \
+            update({'snapshot': snapshot.id, 'dag': None},
+                   synchronize_session=False)
+        dag.snapshot = snapshot.id
+        self.commit()
+        return snapshot.id
+
+    def override(self, dag: int, storage: int, file: int):
+        """
+        Points the entry of a dag to another file.
+        Snapshot entries are immutable, so they get an override
+        """
+        item = self.by_id(storage)
+        if item.dag == dag:
+            item.file = file
+        else:
+            self.add(
+                DagStorage(dag=dag, path=item.path, file=file, is_dir=False),
+                commit=False
+            )
+        self.commit()
+
+    def copy(self, src: int, dst: int, commit: bool = True):
+        """
+        Copies the own entries of a dag (the ones overriding its snapshot)
+        to another one by a single INSERT SELECT
+        """
+        table = DagStorage.__table__
+        query = select([literal(dst), table.c.file, table.c.path,
+                        table.c.is_dir]).where(table.c.dag == src)
+        self.session.execute(
+            insert(table).from_select(['dag', 'file', 'path', 'is_dir'],
+                                      query)
+        )
+        if commit:
+            self.session.commit()
 
 
 class DagLibraryProvider(BaseDataProvider):
@@ -19,5 +104,18 @@ class DagLibraryProvider(BaseDataProvider):
         return self.query(DagLibrary.library, DagLibrary.version). \
             filter(DagLibrary.dag == dag).all()
 
+    def copy(self, src: int, dst: int, commit: bool = True):
+        """
+        Copies the libraries of a dag to another one by a single INSERT SELECT
+        """
+        table = DagLibrary.__table__
+        query = select([literal(dst), table.c.library,
+                        table.c.version]).where(table.c.dag == src)
+        self.session.execute(
+            insert(table).from_select(['dag', 'library', 'version'], query)
+        )
+        if commit:
+            self.session.commit()
+
 
 __all__ = ['DagStorageProvider', 'DagLibraryProvider']
@@ -1,5 +1,18 @@
-from mlcomp.db.models import File, Dag, Project
+from typing import List
+
+from sqlalchemy import func, or_, case, exists, select
+from sqlalchemy.orm import aliased
+
+from mlcomp.db.models import File, Dag, Project, FileChunk
 from mlcomp.db.providers.base import BaseDataProvider
+from mlcomp.utils.codec import CHUNKED
+
+
+def blob_key(md5: str, codec: str = None):
+    """
+    Key of a file content in the blob store
+    """
+    return f'{md5}.{codec}' if codec else md5
 
 
 class FileProvider(BaseDataProvider):
@@ -12,7 +25,93 @@ class FileProvider(BaseDataProvider):
                                   ).filter(File.project == project).all()
         }
 
+    def existing(self, project: int, hashes: List[str],
+                 batch_size: int = 500):
+        """
+        :return: md5 -> id of the project files having one of the hashes
+        """
+        res = dict()
+        for i in range(0, len(hashes), batch_size):
+            query = self.query(File.md5, File.id). \
+                filter(File.project == project). \
+                filter(File.md5.in_(hashes[i:i + batch_size]))
+            res.update(query.all())
+        return res
+
+    def blob_keys(self):
+        """
+        Keys of the files which contents are in the blob store
+        """
+        query = self.query(File.md5, File.codec). \
+            filter(File.content.is_(None)). \
+            filter(or_(File.codec.is_(None), File.codec != CHUNKED)). \
+            distinct()
+        return {blob_key(md5, codec) for md5, codec in query.all()}
+
+    def contents(self, ids: List[int]):
+        """
+        :return: (id, md5, content, codec) of the files
+        """
+        return self.query(File.id, File.md5, File.content, File.codec). \
+            filter(File.id.in_(ids)). \
+            all()
+
+    def chunks(self, file: int):
+        """
+        :return: ids of the chunks of a file in order
+        """
+        query = self.query(FileChunk.chunk). \
+            filter(FileChunk.file == file). \
+            order_by(FileChunk.index)
+        return [chunk for chunk, in query.all()]
+
+    def stats(self):
+        """
+        Logical and physical size of the files per project
+        """
+        physical = func.coalesce(File.physical_size, File.size)
+        # chunks are the parts of other files
+        is_chunk = exists().where(FileChunk.chunk == File.id)
+        logical = case([(is_chunk, 0)], else_=File.size)
+        query = self.query(Project.name, func.count(File.id),
+                           func.sum(logical), func.sum(physical)). \
+            join(File, File.project == Project.id). \
+            group_by(Project.name). \
+            order_by(Project.name)
+        return [
+            {
+                'project': name,
+                'count': count,
+                'size': int(size or 0),
+                'physical_size': int(physical_size or 0),
+                'saved': int((size or 0) - (physical_size or 0))
+            } for name, count, size, physical_size in query.all()
+        ]
+
+    def _keep_shared_chunks(self, dag: int):
+        """
+        Chunks are shared by the files of a project.
+        The ones created by the dag and used by the files of other dags
+        are passed to one of those dags instead of being removed
+        """
+        owner = aliased(File)
+        other_dag = select([func.min(owner.dag)]). \
+            where(FileChunk.chunk == File.id). \
+            where(FileChunk.file == owner.id). \
+            where(owner.dag != dag). \
+            as_scalar()
+        shared = self.query(FileChunk.chunk). \
+            join(owner, owner.id == FileChunk.file). \
+            filter(owner.dag != dag)
+        self.query(File). \
+            filter(File.dag == dag). \
+            filter(File.id.in_(shared.subquery())). \
+            update({'dag': other_dag}, synchronize_session=False)
+
     def remove(self, filter: dict):
+        if filter.get('dag'):
+            self._keep_shared_chunks(filter['dag'])
+
         query = self.query(File)
         if filter.get('dag'):
             query = query.filter(File.dag == filter['dag'])
@@ -23,16 +122,20 @@ class FileProvider(BaseDataProvider):
 
         query = self.query(Dag)
         if filter.get('dag'):
-            query.filter(Dag.id == filter['dag']).update({'file_size': 0})
+            query.filter(Dag.id == filter['dag']). \
+                update({'file_size': 0, 'file_physical_size': 0})
 
         if filter.get('project'):
             query.filter(Dag.project == filter['project']). \
-                update({'file_size': 0})
+                update({'file_size': 0, 'file_physical_size': 0})
 
         self.session.commit()
 
-    def by_md5(self, md5):
-        return self.query(File).filter(File.md5 == md5).first()
+    def by_md5(self, md5, project: int = None):
+        query = self.query(File).filter(File.md5 == md5)
+        if project is not None:
+            query = query.filter(File.project == project)
+        return query.first()
 
 
 __all__ = ['FileProvider']
@@ -77,9 +77,10 @@ class ProjectProvider(BaseDataProvider):
             last_activity = self.serializer.serialize_datetime(last_activity) \
                 if last_activity else None
 
-            file_size, img_size = self.query(func.sum(Dag.file_size),
-                                             func.sum(Dag.img_size)).filter(
-                Dag.project == p.id).one()
+            file_size, file_physical_size, img_size = self.query(
+                func.sum(Dag.file_size),
+                func.sum(Dag.file_physical_size),
+                func.sum(Dag.img_size)).filter(Dag.project == p.id).one()
 
             res.append(
                 {
@@ -87,6 +88,7 @@ class ProjectProvider(BaseDataProvider):
                     'last_activity': last_activity,
                     'img_size': int(img_size or 0),
                     'file_size': int(file_size or 0),
+                    'file_physical_size': int(file_physical_size or 0),
                     'id': p.id,
                     'name': p.name,
                     'sync_folders': p.sync_folders,
@@ -2,17 +2,14 @@ import base64
 import pickle
 from collections import defaultdict
 
-from itertools import groupby
-from typing import List
-
 from sqlalchemy import func, case
-from sqlalchemy.orm import joinedload
 
 from mlcomp.db.core import PaginatorOptions, Session
 from mlcomp.db.enums import TaskStatus, TaskType
-from mlcomp.db.models import Report, ReportTasks, Task, ReportSeries, \
-    ReportImg, ReportLayout
+from mlcomp.db.models import Report, ReportTasks, Task, ReportImg, \
+    ReportLayout
 from mlcomp.db.providers.base import BaseDataProvider
+from mlcomp.db.providers.report.series import ReportSeriesProvider
 from mlcomp.db.report_info import ReportLayoutSeries, ReportLayoutInfo
 from mlcomp.db.report_info.item import ReportLayoutItem
 from mlcomp.utils.io import yaml_load, yaml_dump
@@ -60,35 +57,27 @@ class ReportProvider(BaseDataProvider):
         return {'total': total, 'data': data}
 
     def _detail_series(
-            self, series: List[ReportSeries], name: str, result_key: str
+            self, series: list, task_names: dict, name: str, result_key: str
     ):
-        series = [s for s in series if s.name == name]
         res = []
-
-        series = sorted(series, key=lambda x: x.part)
-        series_group = groupby(series, key=lambda x: x.part)
-        for key, group in series_group:
-            group = list(group)
-            group = sorted(group, key=lambda x: x.task)
-            for task_key, group_task in groupby(group, key=lambda x: x.task):
-                group_task = list(group_task)
-                res.append(
-                    {
-                        'x': [item.epoch for item in group_task],
-                        'y': [item.value for item in group_task],
-                        'stage': [item.stage for item in group_task],
-                        'color': 'orange' if key == 'valid' else 'blue',
-                        'time': [
-                            self.serialize_datetime(item.time)
-                            for item in group_task
-                        ],
-                        'group': key,
-                        'task_name': group_task[0].task_rel.name,
-                        'task_id': task_key,
-                        'source': name,
-                        'name': result_key
-                    }
-                )
+        for part, task, columns in series:
+            res.append(
+                {
+                    'x': columns['epoch'],
+                    'y': columns['value'],
+                    'stage': columns['stage'],
+                    'color': 'orange' if part == 'valid' else 'blue',
+                    'time': [
+                        self.serialize_datetime(time)
+                        for time in columns['time']
+                    ],
+                    'group': part,
+                    'task_name': task_names[task],
+                    'task_id': task,
+                    'source': name,
+                    'name': result_key
+                }
+            )
 
         return res
 
@@ -153,23 +142,29 @@ class ReportProvider(BaseDataProvider):
         config = yaml_load(report_obj.config)
         report = ReportLayoutInfo(config)
 
-        series = self.query(ReportSeries). \
-            filter(ReportSeries.task.in_(tasks)). \
-            order_by(ReportSeries.epoch). \
-            options(joinedload(ReportSeries.task_rel, innerjoin=True)).all()
+        task_names = dict(
+            self.query(Task.id, Task.name).filter(Task.id.in_(tasks)).all()
+        )
+
+        series = defaultdict(list)
+        series_columns = ReportSeriesProvider(self.session).columns(tasks)
+        for (task, part, name), columns in series_columns.items():
+            series[name].append((part, task, columns))
 
         items = dict()
-        series_names = set([s.name for s in series])
         series_map = defaultdict(list)
         for s in report.series:
             series_map[s.key].append(s)
 
-        for name in series_names:
+        for name, name_series in series.items():
+            name_series.sort(key=lambda x: (x[0], x[1]))
             report_series = series_map.get(name, [
                 ReportLayoutSeries(name=name, key=name)])
 
             for s in report_series:
-                items[s.name] = self._detail_series(series, s.key, s.name)
+                items[s.name] = self._detail_series(
+                    name_series, task_names, s.key, s.name
+                )
 
         for element in report.precision_recall + report.f1:
             items[element.name] = self._detail_single_img(id, element)
@@ -1,41 +1,99 @@
+from collections import OrderedDict
 from typing import List
 from itertools import groupby
 
 from mlcomp.db.models import ReportSeries, Task
 from mlcomp.db.providers.base import BaseDataProvider
+from mlcomp.utils.misc import adapt_db_types
 
 
 class ReportSeriesProvider(BaseDataProvider):
     model = ReportSeries
 
+    def add_epoch(
+            self, series: List[ReportSeries], task: int, fields: dict = None
+    ):
+        """
+        Inserts the series of an epoch with one bulk insert and
+        updates the task fields (score, loss) in the same transaction
+        """
+        try:
+            for s in series:
+                adapt_db_types(s)
+            self.session.bulk_save_objects(series)
+
+            if fields:
+                adapt_db_types(fields)
+                self.query(Task).filter(Task.id == task). \
+                    update(fields, synchronize_session=False)
+        except Exception as e:
+            self.rollback()
+            raise e
+
+        self.commit()
+
+    def columns(self, tasks: List[int], names: List[str] = None):
+        """
+        Fetches the series of the tasks as plain rows sorted by the database
+        and groups them in a single pass.
+
+        :return: OrderedDict (task, part, name) -> dict of columns
+            (epoch, value, stage, time), ordered by task, name, part
+        """
+        query = self.query(
+            ReportSeries.task, ReportSeries.name, ReportSeries.part,
+            ReportSeries.epoch, ReportSeries.value, ReportSeries.stage,
+            ReportSeries.time
+        ).filter(ReportSeries.task.in_(tasks))
+
+        if names is not None:
+            query = query.filter(ReportSeries.name.in_(names))
+
+        query = query.order_by(
+            ReportSeries.task, ReportSeries.name, ReportSeries.part,
+            ReportSeries.epoch, ReportSeries.id
+        )
+
+        res = OrderedDict()
+        key = None
+        group = None
+        for task, name, part, epoch, value, stage, time in query:
+            if key != (task, part, name):
+                key = (task, part, name)
+                group = res.setdefault(
+                    key, {
+                        'epoch': [],
+                        'value': [],
+                        'stage': [],
+                        'time': []
+                    }
+                )
+
+            group['epoch'].append(epoch)
+            group['value'].append(value)
+            group['stage'].append(stage)
+            group['time'].append(time)
+
+        return res
+
     def by_dag(self, dag: int, metrics: List[str]):
-        tasks = self.query(Task.id, Task.name).filter(Task.dag == dag).all()
-        ids = [id for id, _ in tasks]
+        tasks = self.query(Task.id).filter(Task.dag == dag).all()
+        ids = [id for id, in tasks]
 
-        series = self.query(ReportSeries).filter(
-            ReportSeries.task.in_(ids)).filter(
-            ReportSeries.name.in_(metrics)).order_by(ReportSeries.task).all()
+        series = self.columns(ids, metrics)
 
         res = []
-        for task_id, task_series in groupby(series, key=lambda x: x.task):
-            task_series = list(task_series)
-            task_series = sorted(task_series, key=lambda x: x.name)
-
-            for name, name_series in groupby(task_series,
-                                             key=lambda x: x.name):
-                name_series = list(name_series)
-                name_series = sorted(name_series, key=lambda x: x.part)
-                groups = []
-                for group, part_series in groupby(name_series,
-                                                  key=lambda x: x.part):
-                    part_series = list(part_series)
-                    part_series = sorted(part_series, key=lambda x: x.epoch)
-                    group = {'name': group,
-                             'epoch': [s.epoch for s in part_series],
-                             'value': [s.value for s in part_series]
-                             }
-                    groups.append(group)
-                res.append((task_id, name, groups))
+        for (task_id, name), items in groupby(
+                series.items(), key=lambda x: (x[0][0], x[0][2])
+        ):
+            groups = [
+                {
+                    'name': part,
+                    'epoch': columns['epoch'],
+                    'value': columns['value']
+                } for (_, part, _), columns in items
+            ]
+            res.append((task_id, name, groups))
         return res
 
 
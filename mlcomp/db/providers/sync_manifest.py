@@ -0,0 +1,52 @@
+import json
+
+from mlcomp.db.models import SyncManifest
+from mlcomp.db.providers.base import BaseDataProvider
+from mlcomp.utils.misc import now
+
+
+class SyncManifestProvider(BaseDataProvider):
+    model = SyncManifest
+
+    def get(self, computer: str, folder: str):
+        """
+        :return: manifest dict or None if the computer has not published it
+        """
+        item = self.query(SyncManifest). \
+            filter(SyncManifest.computer == computer). \
+            filter(SyncManifest.folder == folder). \
+            first()
+        if item is None:
+            return None
+        return {
+            'hash': item.hash,
+            'excluded': json.loads(item.excluded),
+            'children': json.loads(item.children),
+            'updated': item.updated
+        }
+
+    def save(self, computer: str, folder: str, manifest: dict):
+        fields = {
+            'hash': manifest['hash'],
+            'excluded': json.dumps(manifest['excluded']),
+            'children': json.dumps(manifest['children']),
+            'updated': now()
+        }
+        try:
+            updated = self.query(SyncManifest). \
+                filter(SyncManifest.computer == computer). \
+                filter(SyncManifest.folder == folder). \
+                update(fields, synchronize_session=False)
+            if not updated:
+                self.add(
+                    SyncManifest(computer=computer, folder=folder, **fields),
+                    commit=False
+                )
+        except Exception as e:
+            self.rollback()
+            raise e
+
+        self.commit()
+
+
+__all__ = ['SyncManifestProvider']
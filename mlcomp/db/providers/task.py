@@ -6,6 +6,7 @@ from sqlalchemy.orm import joinedload, aliased
 
 from mlcomp.db.core import PaginatorOptions
 from mlcomp.db.providers.base import BaseDataProvider
+from mlcomp.db.providers.task_progress import TaskProgressProvider
 from mlcomp.db.enums import TaskType, DagType, TaskStatus
 from mlcomp.utils.misc import to_snake, duration_format, now, parse_time
 from mlcomp.db.models import Task, Project, Dag, TaskDependence, ReportTasks
@@ -80,7 +81,7 @@ class TaskProvider(BaseDataProvider):
             item = {**self.to_dict(p, rules=('-additional_info',))}
             item['status'] = to_snake(TaskStatus(item['status']).name)
             item['type'] = to_snake(TaskType(item['type']).name)
-            item['dag_rel'] = self.to_dict(d)
+            item['dag_rel'] = self.to_dict(d, rules=('-executor_index',))
             item['dag_rel']['project'] = {
                 'id': item['dag_rel']['project'],
                 'name': project_name
@@ -95,6 +96,8 @@ class TaskProvider(BaseDataProvider):
             item['duration'] = duration_format(delta)
             res.append(item)
 
+        TaskProgressProvider(self.session).merge(res)
+
         if filter.get('report'):
             tasks_within_report = self.query(
                 ReportTasks.task
@@ -239,6 +242,10 @@ class TaskProvider(BaseDataProvider):
             self.change_status_all(tasks=[t.id for t in tasks],
                                    status=TaskStatus.Stopped)
 
+    def preempt_requested(self, id: int):
+        res = self.query(Task.preempt).filter(Task.id == id).one_or_none()
+        return bool(res and res[0])
+
     def last_succeed_time(self):
         res = self.query(Task.finished). \
             filter(Task.status == TaskStatus.Success.value). \
@@ -323,5 +330,20 @@ class TaskProvider(BaseDataProvider):
 
         return res
 
+    def queued_projects(self, computer: str):
+        """
+        Number of the waiting tasks by projects,
+        which are assigned to the computer or not assigned yet
+        """
+        statuses = [TaskStatus.NotRan.value, TaskStatus.Queued.value]
+        res = self.query(Dag.project, func.count(Task.id)). \
+            join(Dag, Dag.id == Task.dag). \
+            filter(Task.status.in_(statuses)). \
+            filter((Task.computer_assigned == computer) |
+                   Task.computer_assigned.is_(None)). \
+            group_by(Dag.project). \
+            all()
+        return dict(res)
+
 
 __all__ = ['TaskProvider']
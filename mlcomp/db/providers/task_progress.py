@@ -0,0 +1,59 @@
+from typing import List
+
+from mlcomp.db.models import TaskProgress
+from mlcomp.db.providers.base import BaseDataProvider
+from mlcomp.utils.misc import now, adapt_db_types
+
+
+class TaskProgressProvider(BaseDataProvider):
+    model = TaskProgress
+
+    fields = [
+        'batch_index', 'batch_total', 'loader_name', 'epoch_duration',
+        'epoch_time_remaining', 'loss'
+    ]
+
+    def set(self, task: int, **fields):
+        """
+        Writes the progress of the task.
+        Touches only the narrow task_progress row, never the task row
+        """
+        fields['time'] = now()
+        adapt_db_types(fields)
+        try:
+            updated = self.query(TaskProgress). \
+                filter(TaskProgress.task == task). \
+                update(fields, synchronize_session=False)
+            if not updated:
+                self.add(TaskProgress(task=task, **fields), commit=False)
+        except Exception as e:
+            self.rollback()
+            raise e
+
+        self.commit()
+
+    def by_tasks(self, tasks: List[int]):
+        res = dict()
+        if len(tasks) == 0:
+            return res
+
+        query = self.query(TaskProgress).filter(TaskProgress.task.in_(tasks))
+        for p in query.all():
+            res[p.task] = {f: getattr(p, f) for f in self.fields}
+        return res
+
+    def merge(self, items: List[dict]):
+        """
+        Merges the progress into serialized tasks
+        """
+        progress = self.by_tasks([item['id'] for item in items])
+        for item in items:
+            task_progress = progress.get(item['id'], {})
+            for f in self.fields:
+                value = task_progress.get(f)
+                if value is not None or f not in item:
+                    item[f] = value
+        return items
+
+
+__all__ = ['TaskProgressProvider']
@@ -1,6 +1,7 @@
 from collections import defaultdict
 
 from sqlalchemy import and_
+from sqlalchemy.orm import aliased
 
 from mlcomp.db.enums import TaskStatus, TaskType
 from mlcomp.db.models import TaskSynced, Task, Dag, Project, Computer
@@ -35,5 +36,29 @@ class TaskSyncedProvider(BaseDataProvider):
             res.append((c, p, tasks))
         return res
 
+    def pending(self, project: int, computer: str):
+        """
+        Number of the succeeded tasks of the project,
+        which results are not synced to the computer yet.
+        Only the tasks finished after the last sync of the computer
+        are counted, a computer which does not sync has none
+        """
+        target = aliased(Computer)
+        return self.query(Task). \
+            join(Dag, Dag.id == Task.dag). \
+            join(Computer, Computer.name == Task.computer_assigned). \
+            join(target, target.name == computer). \
+            filter(Task.finished > target.last_synced). \
+            join(TaskSynced, and_(TaskSynced.task == Task.id,
+                                  TaskSynced.computer == computer),
+                 isouter=True). \
+            filter(Dag.project == project). \
+            filter(Task.status == TaskStatus.Success.value). \
+            filter(Task.type <= TaskType.Train.value). \
+            filter(Task.computer_assigned != computer). \
+            filter(Computer.sync_with_this_computer.is_(True)). \
+            filter(TaskSynced.task.__eq__(None)). \
+            count()
+
 
 __all__ = ['TaskSyncedProvider']
@@ -0,0 +1,107 @@
+import json
+import datetime
+
+from mlcomp.db.enums import TaskStatus
+from mlcomp.db.models import TaskUsage, Task, Dag
+from mlcomp.db.providers.base import BaseDataProvider
+from mlcomp.utils.misc import now
+
+
+class TaskUsageProvider(BaseDataProvider):
+    model = TaskUsage
+
+    # the timeline is halved when it gets longer
+    timeline_size = 512
+
+    fields = [
+        'samples', 'cpu_mean', 'cpu_peak', 'memory_mean', 'memory_peak',
+        'read', 'write', 'threads_peak'
+    ]
+
+    @staticmethod
+    def _compact(timeline: list):
+        """
+        Merges the neighbour samples: the mean of cpu,
+        the max of memory, io and threads
+        """
+        res = []
+        for i in range(0, len(timeline) - 1, 2):
+            a, b = timeline[i], timeline[i + 1]
+            res.append([
+                a[0], round((a[1] + b[1]) / 2, 1), max(a[2], b[2]),
+                max(a[3], b[3]), max(a[4], b[4]), max(a[5], b[5])
+            ])
+        if len(timeline) % 2 == 1:
+            res.append(timeline[-1])
+        return res
+
+    def add_sample(self, task: int, started: datetime.datetime,
+                   sample: dict):
+        """
+        Appends a sample of the task processes to its timeline.
+        The peaks and the means are updated with each sample, so they
+        are final when the task finishes
+        :param sample: cpu (%), memory (rss MB), read, write (MB), threads
+        """
+        item = self.query(TaskUsage).filter(TaskUsage.task == task).first()
+        if item is None:
+            item = TaskUsage(task=task, timeline='[]', samples=0, cpu_mean=0,
+                             cpu_peak=0, memory_mean=0, memory_peak=0,
+                             read=0, write=0, threads_peak=0)
+            self.add(item, commit=False)
+
+        seconds = int((now() - started).total_seconds()) if started else 0
+        timeline = json.loads(item.timeline)
+        timeline.append([
+            seconds, round(sample['cpu'], 1), round(sample['memory'], 1),
+            round(sample['read'], 1), round(sample['write'], 1),
+            sample['threads']
+        ])
+        if len(timeline) > self.timeline_size:
+            timeline = self._compact(timeline)
+        item.timeline = json.dumps(timeline)
+
+        item.samples += 1
+        item.cpu_mean += (sample['cpu'] - item.cpu_mean) / item.samples
+        item.memory_mean += (sample['memory'] - item.memory_mean) / \
+            item.samples
+        item.cpu_peak = max(item.cpu_peak, sample['cpu'])
+        item.memory_peak = max(item.memory_peak, sample['memory'])
+        # the counters of the exited processes are lost
+        item.read = max(item.read, sample['read'])
+        item.write = max(item.write, sample['write'])
+        item.threads_peak = max(item.threads_peak, sample['threads'])
+        item.time = now()
+
+        self.commit()
+
+    def by_task(self, task: int, timeline: bool = False):
+        item = self.query(TaskUsage).filter(TaskUsage.task == task).first()
+        if item is None:
+            return None
+        res = {f: getattr(item, f) for f in self.fields}
+        if timeline:
+            res['timeline'] = json.loads(item.timeline)
+        return res
+
+    def peak_memory(self, project: int, executor: str, count: int = 5):
+        """
+        Max memory (MB) of the last finished tasks of the executor
+        """
+        statuses = [
+            TaskStatus.Failed.value, TaskStatus.Stopped.value,
+            TaskStatus.Success.value
+        ]
+        res = self.query(TaskUsage.memory_peak). \
+            join(Task, Task.id == TaskUsage.task). \
+            join(Dag, Dag.id == Task.dag). \
+            filter(Dag.project == project). \
+            filter(Task.executor == executor). \
+            filter(Task.status.in_(statuses)). \
+            order_by(Task.id.desc()). \
+            limit(count). \
+            all()
+        return max([r[0] for r in res], default=None)
+
+
+__all__ = ['TaskUsageProvider']
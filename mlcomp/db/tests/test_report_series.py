@@ -0,0 +1,92 @@
+# flake8: noqa
+# noinspection PyUnresolvedReferences
+from mlcomp.utils.tests import session
+from mlcomp.db.core import Session
+from mlcomp.db.enums import TaskType
+from mlcomp.db.models import Dag, Task, ReportSeries
+from mlcomp.db.providers import ProjectProvider, DagProvider, \
+    TaskProvider, ReportSeriesProvider
+from mlcomp.utils.misc import now
+
+
+class TestReportSeries(object):
+
+    def _configure(self, session):
+        project = ProjectProvider(session).add_project(name='test')
+        dag = DagProvider(session).add(Dag(name='test', project=project.id, config=''))
+        task_provider = TaskProvider(session)
+        tasks = [
+            task_provider.add(
+                Task(
+                    name=f'task{i}',
+                    dag=dag.id,
+                    executor='train',
+                    type=TaskType.Train.value,
+                    additional_info=''
+                )
+            ) for i in range(2)
+        ]
+
+        provider = ReportSeriesProvider(session)
+        series = []
+        for task in tasks:
+            for name in ['loss', 'dice']:
+                for part in ['train', 'valid']:
+                    for epoch in reversed(range(3)):
+                        series.append(
+                            ReportSeries(
+                                task=task.id,
+                                name=name,
+                                part=part,
+                                epoch=epoch,
+                                value=epoch * 0.1,
+                                stage='stage1',
+                                time=now()
+                            )
+                        )
+        provider.add_all(series)
+        return provider, dag, tasks
+
+    def test_columns(self, session: Session):
+        provider, _, tasks = self._configure(session)
+        res = provider.columns([t.id for t in tasks], ['loss'])
+
+        assert len(res) == 4
+        columns = res[(tasks[0].id, 'train', 'loss')]
+        assert columns['epoch'] == [0, 1, 2]
+        assert columns['stage'] == ['stage1'] * 3
+
+    def test_by_dag(self, session: Session):
+        provider, dag, tasks = self._configure(session)
+        res = provider.by_dag(dag.id, ['loss', 'dice'])
+
+        assert [(task, name) for task, name, _ in res] == [
+            (tasks[0].id, 'dice'), (tasks[0].id, 'loss'),
+            (tasks[1].id, 'dice'), (tasks[1].id, 'loss')
+        ]
+        groups = res[0][2]
+        assert [g['name'] for g in groups] == ['train', 'valid']
+        assert groups[0]['epoch'] == [0, 1, 2]
+
+    def test_add_epoch(self, session: Session):
+        provider, dag, tasks = self._configure(session)
+        series = [
+            ReportSeries(
+                task=tasks[0].id,
+                name='loss',
+                part=part,
+                epoch=3,
+                value=0.5,
+                stage='stage1',
+                time=now()
+            ) for part in ['train', 'valid']
+        ]
+        provider.add_epoch(series, tasks[0].id, {'score': 0.9, 'loss': 0.5})
+
+        res = provider.columns([tasks[0].id], ['loss'])
+        assert res[(tasks[0].id, 'valid', 'loss')]['epoch'] == [0, 1, 2, 3]
+
+        task = TaskProvider(session).by_id(tasks[0].id)
+        session.refresh(task)
+        assert task.score == 0.9
+        assert task.loss == 0.5
@@ -0,0 +1,52 @@
+# flake8: noqa
+# noinspection PyUnresolvedReferences
+from mlcomp.utils.tests import session
+from mlcomp.db.core import Session, PaginatorOptions
+from mlcomp.db.enums import TaskType
+from mlcomp.db.models import Dag, Task
+from mlcomp.db.providers import ProjectProvider, DagProvider, \
+    TaskProvider, TaskProgressProvider
+
+
+class TestTaskProgress(object):
+
+    def _configure(self, session):
+        project = ProjectProvider(session).add_project(name='test')
+        dag = DagProvider(session).add(
+            Dag(name='test', project=project.id, config=''))
+        return TaskProvider(session).add(
+            Task(
+                name='task',
+                dag=dag.id,
+                executor='train',
+                type=TaskType.Train.value,
+                additional_info='',
+                loss=0.7
+            )
+        )
+
+    def test_set(self, session: Session):
+        task = self._configure(session)
+        provider = TaskProgressProvider(session)
+
+        provider.set(task.id, batch_index=1, batch_total=10)
+        provider.set(task.id, batch_index=2, loss=0.5)
+
+        res = provider.by_tasks([task.id])[task.id]
+        assert res['batch_index'] == 2
+        assert res['batch_total'] == 10
+        assert res['loss'] == 0.5
+
+    def test_merge(self, session: Session):
+        task = self._configure(session)
+        options = PaginatorOptions(page_number=0, page_size=10)
+        task_provider = TaskProvider(session)
+
+        item = task_provider.get({}, options)['data'][0]
+        assert item['batch_index'] is None
+        assert item['loss'] == 0.7
+
+        TaskProgressProvider(session).set(task.id, batch_index=3, loss=0.5)
+        item = task_provider.get({}, options)['data'][0]
+        assert item['batch_index'] == 3
+        assert item['loss'] == 0.5
@@ -0,0 +1,46 @@
+# flake8: noqa
+import datetime
+
+# noinspection PyUnresolvedReferences
+from mlcomp.utils.tests import session
+from mlcomp.db.core import Session
+from mlcomp.db.enums import TaskType, TaskStatus
+from mlcomp.db.models import Dag, Task, Computer, TaskSynced
+from mlcomp.db.providers import ProjectProvider, DagProvider, \
+    TaskProvider, ComputerProvider, TaskSyncedProvider
+from mlcomp.utils.misc import now
+
+
+class TestTaskSynced(object):
+    def test_pending(self, session: Session):
+        for name in ['a', 'b']:
+            ComputerProvider(session).add(
+                Computer(name=name, ip='localhost', port=22, user='user',
+                         disk=0, root_folder='/', sync_with_this_computer=True,
+                         last_synced=now() - datetime.timedelta(hours=1))
+            )
+        project = ProjectProvider(session).add_project(name='test')
+        dag = DagProvider(session).add(
+            Dag(name='test', project=project.id, config=''))
+        task_provider = TaskProvider(session)
+        for hours in [0, 0, 2]:
+            task_provider.add(
+                Task(name='task', dag=dag.id, executor='train',
+                     type=TaskType.Train.value, additional_info='',
+                     status=TaskStatus.Success.value, computer_assigned='a',
+                     finished=now() - datetime.timedelta(hours=hours))
+            )
+
+        provider = TaskSyncedProvider(session)
+        assert provider.pending(project.id, 'a') == 0
+        assert provider.pending(project.id, 'b') == 2
+
+        provider.add(TaskSynced(computer='b', task=1))
+        assert provider.pending(project.id, 'b') == 1
+
+        # a computer which has never synced
+        ComputerProvider(session).add(
+            Computer(name='c', ip='localhost', port=22, user='user',
+                     disk=0, root_folder='/')
+        )
+        assert provider.pending(project.id, 'c') == 0
@@ -0,0 +1,50 @@
+# flake8: noqa
+import os
+
+# noinspection PyUnresolvedReferences
+from mlcomp.utils.tests import session
+from mlcomp.db.core import Session
+from mlcomp.db.enums import TaskType, TaskStatus
+from mlcomp.db.models import Dag, Task
+from mlcomp.db.providers import ProjectProvider, DagProvider, \
+    TaskProvider, TaskUsageProvider
+from mlcomp.utils.misc import now
+from mlcomp.worker.usage import TaskUsageSampler
+
+
+class TestTaskUsage(object):
+    def test_add_sample(self, session: Session, monkeypatch):
+        project = ProjectProvider(session).add_project(name='test')
+        dag = DagProvider(session).add(
+            Dag(name='test', project=project.id, config=''))
+        task = TaskProvider(session).add(
+            Task(name='task', dag=dag.id, executor='train',
+                 type=TaskType.Train.value, additional_info='',
+                 status=TaskStatus.Success.value)
+        )
+
+        provider = TaskUsageProvider(session)
+        monkeypatch.setattr(provider, 'timeline_size', 2)
+        for cpu, memory in [(100, 10), (50, 30), (0, 20)]:
+            provider.add_sample(task.id, now(), {
+                'cpu': cpu, 'memory': memory, 'read': 1, 'write': 2,
+                'threads': 4
+            })
+
+        usage = provider.by_task(task.id, timeline=True)
+        assert usage['samples'] == 3
+        assert usage['cpu_mean'] == 50 and usage['cpu_peak'] == 100
+        assert usage['memory_peak'] == 30
+        assert [s[1:3] for s in usage['timeline']] == [[75, 30], [0, 20]]
+
+        assert provider.peak_memory(project.id, 'train') == 30
+        assert provider.peak_memory(project.id, 'other') is None
+
+    def test_sampler(self):
+        sampler = TaskUsageSampler()
+        task = Task(pid=os.getpid(), additional_info='')
+        processes = sampler.tree(task)
+        assert [p.pid for p in processes] == [os.getpid()]
+
+        usage = sampler.measure(processes)
+        assert usage['memory'] > 0 and usage['threads'] > 0
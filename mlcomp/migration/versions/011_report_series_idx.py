@@ -0,0 +1,41 @@
+from sqlalchemy import Table, MetaData, Index
+
+meta = MetaData()
+
+
+def upgrade(migrate_engine):
+    conn = migrate_engine.connect()
+    trans = conn.begin()
+
+    try:
+        meta.bind = conn
+
+        table = Table('report_series', meta, autoload=True)
+        Index(
+            'report_series_task_name_idx', table.c.task, table.c.name,
+            table.c.part, table.c.epoch
+        ).create()
+    except Exception:
+        trans.rollback()
+        raise
+    else:
+        trans.commit()
+
+
+def downgrade(migrate_engine):
+    conn = migrate_engine.connect()
+    trans = conn.begin()
+
+    try:
+        meta.bind = conn
+
+        table = Table('report_series', meta, autoload=True)
+        Index(
+            'report_series_task_name_idx', table.c.task, table.c.name,
+            table.c.part, table.c.epoch
+        ).drop()
+    except Exception:
+        trans.rollback()
+        raise
+    else:
+        trans.commit()
@@ -0,0 +1,65 @@
+from migrate import ForeignKeyConstraint
+from sqlalchemy import Table, Column, MetaData, String, Integer, Float, \
+    TIMESTAMP
+
+meta = MetaData()
+
+table = Table(
+    'task_progress', meta,
+    Column('task', Integer, primary_key=True),
+    Column('batch_index', Integer),
+    Column('batch_total', Integer),
+    Column('loader_name', String(100)),
+    Column('epoch_duration', Integer),
+    Column('epoch_time_remaining', Integer),
+    Column('loss', Float),
+    Column('time', TIMESTAMP),
+)
+
+task_columns = [
+    Column('batch_index', Integer),
+    Column('batch_total', Integer),
+    Column('loader_name', String(100)),
+    Column('epoch_duration', Integer),
+    Column('epoch_time_remaining', Integer),
+]
+
+
+def upgrade(migrate_engine):
+    conn = migrate_engine.connect()
+    trans = conn.begin()
+
+    try:
+        meta.bind = conn
+        table.create()
+
+        task = Table('task', meta, autoload=True)
+        ForeignKeyConstraint([table.c.task], [task.c.id],
+                             ondelete='CASCADE').create()
+
+        for col in task_columns:
+            task.c[col.name].drop()
+    except Exception:
+        trans.rollback()
+        raise
+    else:
+        trans.commit()
+
+
+def downgrade(migrate_engine):
+    conn = migrate_engine.connect()
+    trans = conn.begin()
+
+    try:
+        meta.bind = conn
+
+        task = Table('task', meta, autoload=True)
+        for col in task_columns:
+            col.create(task)
+
+        table.drop()
+    except Exception:
+        trans.rollback()
+        raise
+    else:
+        trans.commit()
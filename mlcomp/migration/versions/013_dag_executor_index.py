@@ -0,0 +1,36 @@
+from sqlalchemy import Table, Column, MetaData, Text
+
+meta = MetaData()
+
+
+def upgrade(migrate_engine):
+    conn = migrate_engine.connect()
+    trans = conn.begin()
+
+    try:
+        meta.bind = conn
+
+        table = Table('dag', meta, autoload=True)
+        col = Column('executor_index', Text)
+        col.create(table)
+    except Exception:
+        trans.rollback()
+        raise
+    else:
+        trans.commit()
+
+
+def downgrade(migrate_engine):
+    conn = migrate_engine.connect()
+    trans = conn.begin()
+
+    try:
+        meta.bind = conn
+
+        table = Table('dag', meta, autoload=True)
+        table.c.executor_index.drop()
+    except Exception:
+        trans.rollback()
+        raise
+    else:
+        trans.commit()
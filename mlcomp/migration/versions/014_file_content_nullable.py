@@ -0,0 +1,35 @@
+from sqlalchemy import Table, MetaData
+
+meta = MetaData()
+
+
+def upgrade(migrate_engine):
+    conn = migrate_engine.connect()
+    trans = conn.begin()
+
+    try:
+        meta.bind = conn
+
+        table = Table('file', meta, autoload=True)
+        table.c.content.alter(nullable=True)
+    except Exception:
+        trans.rollback()
+        raise
+    else:
+        trans.commit()
+
+
+def downgrade(migrate_engine):
+    conn = migrate_engine.connect()
+    trans = conn.begin()
+
+    try:
+        meta.bind = conn
+
+        table = Table('file', meta, autoload=True)
+        table.c.content.alter(nullable=False)
+    except Exception:
+        trans.rollback()
+        raise
+    else:
+        trans.commit()
@@ -0,0 +1,63 @@
+from migrate import ForeignKeyConstraint
+from sqlalchemy import Table, Column, MetaData, Integer, TIMESTAMP, Index
+
+meta = MetaData()
+
+table = Table(
+    'code_snapshot', meta,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('project', Integer, nullable=False),
+    Column('created', TIMESTAMP, nullable=False),
+)
+
+
+def upgrade(migrate_engine):
+    conn = migrate_engine.connect()
+    trans = conn.begin()
+
+    try:
+        meta.bind = conn
+        table.create()
+
+        project = Table('project', meta, autoload=True)
+        ForeignKeyConstraint([table.c.project], [project.c.id],
+                             ondelete='CASCADE').create()
+
+        dag = Table('dag', meta, autoload=True)
+        Column('snapshot', Integer).create(dag)
+        ForeignKeyConstraint([dag.c.snapshot], [table.c.id]).create()
+
+        dag_storage = Table('dag_storage', meta, autoload=True)
+        dag_storage.c.dag.alter(nullable=True)
+        Column('snapshot', Integer).create(dag_storage)
+        ForeignKeyConstraint([dag_storage.c.snapshot], [table.c.id],
+                             ondelete='CASCADE').create()
+        Index('dag_storage_snapshot_idx',
+              dag_storage.c.snapshot.desc()).create()
+    except Exception:
+        trans.rollback()
+        raise
+    else:
+        trans.commit()
+
+
+def downgrade(migrate_engine):
+    conn = migrate_engine.connect()
+    trans = conn.begin()
+
+    try:
+        meta.bind = conn
+
+        dag_storage = Table('dag_storage', meta, autoload=True)
+        dag_storage.c.snapshot.drop()
+        dag_storage.c.dag.alter(nullable=False)
+
+        dag = Table('dag', meta, autoload=True)
+        dag.c.snapshot.drop()
+
+        table.drop()
+    except Exception:
+        trans.rollback()
+        raise
+    else:
+        trans.commit()
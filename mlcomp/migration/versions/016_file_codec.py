@@ -0,0 +1,46 @@
+from sqlalchemy import Table, Column, MetaData, String, BigInteger
+
+meta = MetaData()
+
+
+def upgrade(migrate_engine):
+    conn = migrate_engine.connect()
+    trans = conn.begin()
+
+    try:
+        meta.bind = conn
+
+        file = Table('file', meta, autoload=True)
+        Column('codec', String(10)).create(file)
+        Column('physical_size', BigInteger).create(file)
+
+        dag = Table('dag', meta, autoload=True)
+        Column('file_physical_size', BigInteger, nullable=False,
+               server_default='0').create(dag)
+        # all the contents are raw so far
+        conn.execute(dag.update().values(file_physical_size=dag.c.file_size))
+    except Exception:
+        trans.rollback()
+        raise
+    else:
+        trans.commit()
+
+
+def downgrade(migrate_engine):
+    conn = migrate_engine.connect()
+    trans = conn.begin()
+
+    try:
+        meta.bind = conn
+
+        dag = Table('dag', meta, autoload=True)
+        dag.c.file_physical_size.drop()
+
+        file = Table('file', meta, autoload=True)
+        file.c.physical_size.drop()
+        file.c.codec.drop()
+    except Exception:
+        trans.rollback()
+        raise
+    else:
+        trans.commit()
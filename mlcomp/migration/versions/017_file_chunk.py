@@ -0,0 +1,45 @@
+from migrate import ForeignKeyConstraint
+from sqlalchemy import Table, Column, MetaData, Integer
+
+meta = MetaData()
+
+table = Table(
+    'file_chunk', meta,
+    Column('file', Integer, primary_key=True),
+    Column('index', Integer, primary_key=True),
+    Column('chunk', Integer, nullable=False),
+)
+
+
+def upgrade(migrate_engine):
+    conn = migrate_engine.connect()
+    trans = conn.begin()
+
+    try:
+        meta.bind = conn
+        table.create()
+
+        file = Table('file', meta, autoload=True)
+        ForeignKeyConstraint([table.c.file], [file.c.id],
+                             ondelete='CASCADE').create()
+        ForeignKeyConstraint([table.c.chunk], [file.c.id],
+                             ondelete='CASCADE').create()
+    except Exception:
+        trans.rollback()
+        raise
+    else:
+        trans.commit()
+
+
+def downgrade(migrate_engine):
+    conn = migrate_engine.connect()
+    trans = conn.begin()
+
+    try:
+        meta.bind = conn
+        table.drop()
+    except Exception:
+        trans.rollback()
+        raise
+    else:
+        trans.commit()
@@ -0,0 +1,46 @@
+from migrate import ForeignKeyConstraint
+from sqlalchemy import Table, Column, MetaData, String, TIMESTAMP
+
+meta = MetaData()
+
+table = Table(
+    'sync_manifest', meta,
+    Column('computer', String(100), primary_key=True),
+    Column('folder', String(1000), primary_key=True),
+    Column('hash', String(32)),
+    Column('excluded', String),
+    Column('children', String),
+    Column('updated', TIMESTAMP),
+)
+
+
+def upgrade(migrate_engine):
+    conn = migrate_engine.connect()
+    trans = conn.begin()
+
+    try:
+        meta.bind = conn
+        table.create()
+
+        computer = Table('computer', meta, autoload=True)
+        ForeignKeyConstraint([table.c.computer], [computer.c.name],
+                             ondelete='CASCADE').create()
+    except Exception:
+        trans.rollback()
+        raise
+    else:
+        trans.commit()
+
+
+def downgrade(migrate_engine):
+    conn = migrate_engine.connect()
+    trans = conn.begin()
+
+    try:
+        meta.bind = conn
+        table.drop()
+    except Exception:
+        trans.rollback()
+        raise
+    else:
+        trans.commit()
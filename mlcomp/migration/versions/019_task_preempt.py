@@ -0,0 +1,39 @@
+from sqlalchemy import Table, Column, MetaData, Boolean, Integer
+
+meta = MetaData()
+
+
+def upgrade(migrate_engine):
+    conn = migrate_engine.connect()
+    trans = conn.begin()
+
+    try:
+        meta.bind = conn
+
+        task = Table('task', meta, autoload=True)
+        col = Column('priority', Integer)
+        col.create(task)
+        col = Column('preempt', Boolean)
+        col.create(task)
+    except Exception:
+        trans.rollback()
+        raise
+    else:
+        trans.commit()
+
+
+def downgrade(migrate_engine):
+    conn = migrate_engine.connect()
+    trans = conn.begin()
+
+    try:
+        meta.bind = conn
+
+        task = Table('task', meta, autoload=True)
+        task.c.preempt.drop()
+        task.c.priority.drop()
+    except Exception:
+        trans.rollback()
+        raise
+    else:
+        trans.commit()
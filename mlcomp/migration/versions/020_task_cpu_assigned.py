@@ -0,0 +1,36 @@
+from sqlalchemy import Table, Column, MetaData, String
+
+meta = MetaData()
+
+
+def upgrade(migrate_engine):
+    conn = migrate_engine.connect()
+    trans = conn.begin()
+
+    try:
+        meta.bind = conn
+
+        task = Table('task', meta, autoload=True)
+        col = Column('cpu_assigned', String(200))
+        col.create(task)
+    except Exception:
+        trans.rollback()
+        raise
+    else:
+        trans.commit()
+
+
+def downgrade(migrate_engine):
+    conn = migrate_engine.connect()
+    trans = conn.begin()
+
+    try:
+        meta.bind = conn
+
+        task = Table('task', meta, autoload=True)
+        task.c.cpu_assigned.drop()
+    except Exception:
+        trans.rollback()
+        raise
+    else:
+        trans.commit()
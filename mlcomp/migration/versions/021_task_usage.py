@@ -0,0 +1,52 @@
+from migrate import ForeignKeyConstraint
+from sqlalchemy import Table, Column, MetaData, String, Integer, Float, \
+    TIMESTAMP
+
+meta = MetaData()
+
+table = Table(
+    'task_usage', meta,
+    Column('task', Integer, primary_key=True),
+    Column('timeline', String),
+    Column('samples', Integer),
+    Column('cpu_mean', Float),
+    Column('cpu_peak', Float),
+    Column('memory_mean', Float),
+    Column('memory_peak', Float),
+    Column('read', Float),
+    Column('write', Float),
+    Column('threads_peak', Integer),
+    Column('time', TIMESTAMP),
+)
+
+
+def upgrade(migrate_engine):
+    conn = migrate_engine.connect()
+    trans = conn.begin()
+
+    try:
+        meta.bind = conn
+        table.create()
+
+        task = Table('task', meta, autoload=True)
+        ForeignKeyConstraint([table.c.task], [task.c.id],
+                             ondelete='CASCADE').create()
+    except Exception:
+        trans.rollback()
+        raise
+    else:
+        trans.commit()
+
+
+def downgrade(migrate_engine):
+    conn = migrate_engine.connect()
+    trans = conn.begin()
+
+    try:
+        meta.bind = conn
+        table.drop()
+    except Exception:
+        trans.rollback()
+        raise
+    else:
+        trans.commit()
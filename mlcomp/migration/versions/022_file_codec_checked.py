@@ -0,0 +1,36 @@
+from sqlalchemy import Table, Column, MetaData, String
+
+meta = MetaData()
+
+
+def upgrade(migrate_engine):
+    conn = migrate_engine.connect()
+    trans = conn.begin()
+
+    try:
+        meta.bind = conn
+
+        file = Table('file', meta, autoload=True)
+        col = Column('codec_checked', String(20))
+        col.create(file)
+    except Exception:
+        trans.rollback()
+        raise
+    else:
+        trans.commit()
+
+
+def downgrade(migrate_engine):
+    conn = migrate_engine.connect()
+    trans = conn.begin()
+
+    try:
+        meta.bind = conn
+
+        file = Table('file', meta, autoload=True)
+        file.c.codec_checked.drop()
+    except Exception:
+        trans.rollback()
+        raise
+    else:
+        trans.commit()
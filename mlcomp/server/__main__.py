@@ -11,6 +11,7 @@ from mlcomp.report import check_statuses
 from mlcomp.server.back.app import start_server as _start_server
 from mlcomp.server.back.app import stop_server as _stop_server
 from mlcomp.utils.misc import kill_child_processes
+from mlcomp.worker.scaling import supervisord_workers, SUPERVISORD_CONF
 
 
 @click.group()
@@ -85,7 +86,8 @@ def start(daemon: bool, debug: bool, workers: int, log_level: str):
     text = [
         '[supervisord]', f'nodaemon={daemon_text}', '',
         '[program:supervisor]',
-        f'command={supervisor_command}', 'autostart=true', 'autorestart=true',
+        f'command={supervisor_command} --workers {workers}',
+        'autostart=true', 'autorestart=true',
         '',
         '[program:server]',
         f'command={server_command}',
@@ -93,14 +95,9 @@ def start(daemon: bool, debug: bool, workers: int, log_level: str):
         'autorestart=true', ''
     ]
 
-    for p in range(workers):
-        text.append(f'[program:worker{p}]')
-        text.append(f'command={worker_command} {p}')
-        text.append('autostart=true')
-        text.append('autorestart=true')
-        text.append('')
+    text.extend(supervisord_workers(worker_command, workers))
 
-    conf = os.path.join(CONFIG_FOLDER, 'supervisord.conf')
+    conf = SUPERVISORD_CONF
     with open(conf, 'w') as f:
         f.writelines('\n'.join(text))
 
@@ -1,5 +1,4 @@
 import hashlib
-import shutil
 import traceback
 import requests
 import os
@@ -19,15 +18,16 @@ from mlcomp.db.models.dag import DagTag
 from mlcomp.db.providers import ComputerProvider, ProjectProvider, \
     ReportLayoutProvider, ReportProvider, ModelProvider, ReportImgProvider, \
     DagProvider, DagStorageProvider, TaskProvider, LogProvider, StepProvider, \
-    FileProvider, AuxiliaryProvider, MemoryProvider, SpaceProvider
+    FileProvider, AuxiliaryProvider, MemoryProvider, SpaceProvider, \
+    TaskUsageProvider
 from mlcomp.db.report_info import ReportLayoutInfo
 from mlcomp.server.back.create_dags.copy import dag_copy
 from mlcomp.server.back.supervisor import register_supervisor
 from mlcomp.utils.logging import create_logger
-from mlcomp.utils.io import from_module_path, zip_folder
+from mlcomp.utils.io import from_module_path
 from mlcomp.server.back.create_dags import dag_model_add, dag_model_start
 from mlcomp.utils.misc import now
-from mlcomp.db.models import Model, Report, ReportLayout, Task, File, Memory, \
+from mlcomp.db.models import Model, Report, ReportLayout, Task, Memory, \
     Space, SpaceTag
 from mlcomp.utils.io import yaml_load, yaml_dump
 from mlcomp.worker.storage import Storage
@@ -682,7 +682,7 @@ def code():
     res = OrderedDict()
     parents = dict()
 
-    for s, f in DagStorageProvider(_read_session).by_dag(id):
+    for s, file, md5, size in DagStorageProvider(_read_session).tree(id):
         s.path = s.path.strip()
         parent = os.path.dirname(s.path)
         name = os.path.basename(s.path)
@@ -700,12 +700,8 @@ def code():
                 parents[parent]['children'].append(node)
                 parents[os.path.join(parent, name)] = node
         else:
-            node = {'name': name, 'id': f.id, 'dag': id, 'storage': s.id}
-
-            try:
-                node['content'] = f.content.decode('utf-8')
-            except UnicodeDecodeError:
-                node['content'] = ''
+            node = {'name': name, 'id': file, 'dag': id, 'storage': s.id,
+                    'md5': md5, 'size': size}
 
             if not parent:
                 res[name] = node
@@ -732,6 +728,31 @@ def code():
     return {'items': res}
 
 
+@app.route('/api/code_file', methods=['GET'])
+@requires_auth
+@error_handler
+def code_file():
+    md5 = request.args['md5']
+    headers = {
+        'ETag': f'"{md5}"',
+        # the content of a md5 never changes
+        'Cache-Control': 'private, max-age=31536000, immutable'
+    }
+    if request.if_none_match.contains(md5):
+        return Response(status=304, headers=headers)
+
+    file = FileProvider(_read_session).by_md5(md5)
+    if file is None:
+        return Response(status=404)
+
+    content = Storage(_read_session).file_content(file)
+    try:
+        content = content.decode('utf-8')
+    except UnicodeDecodeError:
+        content = ''
+    return Response(content, mimetype='text/plain', headers=headers)
+
+
 @app.route('/api/update_code', methods=['POST'])
 @requires_auth
 @error_handler
@@ -743,22 +764,30 @@ def update_code():
     md5 = hashlib.md5(content).hexdigest()
 
     if md5 == file.md5:
-        return
-
-    if file.dag != data['dag']:
-        new_file = File(md5=md5, content=content, project=file.project,
-                        dag=data['dag'])
-        provider.add(new_file)
+        return {'file': file.id, 'md5': md5}
+
+    storage = Storage(_write_session)
+    dag_storage_provider = DagStorageProvider(_write_session)
+    dag_storage = dag_storage_provider.by_id(data['storage'])
+    # snapshot entries are shared by the dags, they are never edited
+    if file.dag != data['dag'] or dag_storage.dag != data['dag']:
+        new_file = provider.by_md5(md5, project=file.project)
+        if not new_file:
+            new_file = storage.create_file(
+                content, md5, project=file.project, dag=data['dag']
+            )
+            provider.add(new_file)
 
-        storage = DagStorageProvider(_write_session).by_id(data['storage'])
-        storage.file = new_file.id
-        provider.commit()
-        return {'file': new_file.id}
+        dag_storage_provider.override(data['dag'], dag_storage.id,
+                                      new_file.id)
+        res = {'file': new_file.id, 'md5': md5}
     else:
-        file.content = content
-        file.md5 = md5
-        provider.commit()
-        return {'file': file.id}
+        storage.set_content(file, content, md5)
+        res = {'file': file.id, 'md5': md5}
+
+    storage.update_executor_index(data['dag'], dag_storage.path, content)
+    provider.commit()
+    return res
 
 
 @app.route('/api/code_download', methods=['GET'])
@@ -767,20 +796,17 @@ def update_code():
 def code_download():
     id = int(request.args['id'])
     storage = Storage(_read_session)
-    dag = DagProvider().by_id(id)
-    folder = os.path.join(TMP_FOLDER, f'{dag.id}({dag.name})')
-
-    try:
-        storage.download_dag(id, folder)
+    dag = DagProvider(_read_session).by_id(id)
+    chunks = storage.zip_dag(
+        id, cache_folder=os.path.join(TMP_FOLDER, 'code_zip')
+    )
 
-        file_name = f'{dag.id}({dag.name}).zip'
-        dst = os.path.join(TMP_FOLDER, file_name)
-        zip_folder(folder, dst)
-        res = send_from_directory(TMP_FOLDER, file_name)
-        os.remove(dst)
-        return res
-    finally:
-        shutil.rmtree(folder, ignore_errors=True)
+    file_name = f'{dag.id}({dag.name}).zip'
+    return Response(
+        chunks,
+        mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment; filename="{file_name}"'}
+    )
 
 
 @app.route('/api/tasks', methods=['POST'])
@@ -818,6 +844,8 @@ def task_info():
         'pid': task.pid,
         'worker_index': task.worker_index,
         'gpu_assigned': task.gpu_assigned,
+        'cpu_assigned': task.cpu_assigned,
+        'usage': TaskUsageProvider(_read_session).by_task(task.id),
         'celery_id': task.celery_id,
         'additional_info': task.additional_info or '',
         'result': task.result or '',
@@ -1,5 +1,5 @@
 # flake8: noqa
-from .standard import dag_standard
+from .standard import dag_standard, dag_standard_grid
 from .pipe import dag_pipe
 from .model_add import dag_model_add
 from .model_start import dag_model_start
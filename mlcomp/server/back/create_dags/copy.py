@@ -7,10 +7,11 @@ from mlcomp.utils.io import yaml_load, yaml_dump
 
 from mlcomp.db.core import Session
 from mlcomp.db.enums import ComponentType, TaskStatus
-from mlcomp.db.models import Dag, Task, TaskDependence, DagStorage, File
+from mlcomp.db.models import Dag, Task, TaskDependence, DagStorage
 from mlcomp.db.providers import DagProvider, TaskProvider, DagStorageProvider, \
     FileProvider
 from mlcomp.utils.misc import now
+from mlcomp.worker.storage import Storage
 
 
 class DagCopyBuilder:
@@ -36,6 +37,7 @@ class DagCopyBuilder:
         self.task_provider = None
         self.file_provider = None
         self.dag_storage_provider = None
+        self.storage = None
 
     def log_info(self, message: str):
         if self.logger:
@@ -48,6 +50,7 @@ class DagCopyBuilder:
         self.task_provider = TaskProvider(self.session)
         self.file_provider = FileProvider(self.session)
         self.dag_storage_provider = DagStorageProvider(self.session)
+        self.storage = Storage(self.session)
 
     def create_dag(self):
         dag = self.dag_provider.by_id(self.dag)
@@ -56,7 +59,9 @@ class DagCopyBuilder:
             name += ' ' + self.dag_suffix
         dag_new = Dag(name=name, created=now(), config=dag.config,
                       project=dag.project, docker_img=dag.docker_img,
-                      img_size=0, file_size=0, type=dag.type)
+                      img_size=0, file_size=0, type=dag.type,
+                      executor_index=dag.executor_index,
+                      snapshot=self.dag_storage_provider.freeze(dag))
         self.dag_provider.add(dag_new)
         self.dag_db = dag_new
 
@@ -79,7 +84,7 @@ class DagCopyBuilder:
                         computer=t.computer, gpu=t.gpu, gpu_max=t.gpu_max,
                         cpu=t.cpu, executor=t.executor, memory=t.memory,
                         steps=t.steps, dag=self.dag_db.id, debug=t.debug,
-                        type=t.type,
+                        type=t.type, priority=t.priority,
                         )
             task.additional_info = t.additional_info
             tasks_new.append(task)
@@ -98,38 +103,48 @@ class DagCopyBuilder:
         self.task_provider.bulk_save_objects(dependencies_new,
                                              return_defaults=False)
 
+        # the new dag shares the snapshot, only the changed files
+        # are stored as its own entries
+        self.dag_storage_provider.copy(self.dag, self.dag_db.id)
+
         changes = yaml_load(self.file_changes)
+        if not isinstance(changes, dict):
+            return
+
         storages = self.dag_storage_provider.by_dag(self.dag)
         storages_new = []
 
         for s, f in storages:
-            if not isinstance(changes, dict):
+            replace = self.find_replace(changes, s.path)
+            if replace is None or not f:
                 continue
 
-            replace = self.find_replace(changes, s.path)
-            if replace is not None and f:
-                content = f.content.decode('utf-8')
-                if s.path.endswith('.yml'):
-                    data = yaml_load(content)
-                    data = merge_dicts_smart(data, replace)
-                    content = yaml_dump(data)
-                else:
-                    for k, v in replace:
-                        if k not in content:
-                            raise Exception(f'{k} is not in the content')
-                        content = content.replace(k, v)
-                content = content.encode('utf-8')
-                md5 = hashlib.md5(content).hexdigest()
-                f = self.file_provider.by_md5(md5)
-                if not f:
-                    f = File(
-                        content=content,
-                        created=now(),
-                        project=self.dag_db.project,
-                        md5=md5,
-                        dag=self.dag_db.id
-                    )
-                self.file_provider.add(f)
+            content = self.storage.file_content(f).decode('utf-8')
+            if s.path.endswith('.yml'):
+                data = yaml_load(content)
+                data = merge_dicts_smart(data, replace)
+                content = yaml_dump(data)
+            else:
+                for k, v in replace:
+                    if k not in content:
+                        raise Exception(f'{k} is not in the content')
+                    content = content.replace(k, v)
+            content = content.encode('utf-8')
+            md5 = hashlib.md5(content).hexdigest()
+            f = self.file_provider.by_md5(md5)
+            if not f:
+                f = self.storage.create_file(
+                    content,
+                    md5,
+                    project=self.dag_db.project,
+                    dag=self.dag_db.id
+                )
+            self.file_provider.add(f)
+
+            self.dag_storage_provider.query(DagStorage). \
+                filter(DagStorage.dag == self.dag_db.id). \
+                filter(DagStorage.path == s.path). \
+                delete(synchronize_session=False)
 
             s_new = DagStorage(dag=self.dag_db.id, file=f.id, path=s.path,
                                is_dir=s.is_dir)
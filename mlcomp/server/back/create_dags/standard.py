@@ -170,7 +170,8 @@ class DagStandardBuilder:
             dag=self.dag.id,
             debug=self.debug,
             steps=int(v.get('steps', '1')),
-            type=task_type
+            type=task_type,
+            priority=int(v.get('priority', 0))
         )
 
         if cell is not None:
@@ -297,7 +298,8 @@ class DagStandardBuilder:
     def build(self):
         self.create_providers()
 
-        self.load_base()
+        if self.project is None:
+            self.load_base()
 
         self.create_report()
 
@@ -341,4 +343,45 @@ def dag_standard(
     return builder.build()
 
 
-__all__ = ['dag_standard']
+def dag_standard_grid(
+        session: Session,
+        config: dict,
+        debug: bool,
+        cells: list,
+        config_text: str = None,
+        config_path: str = None,
+        control_reqs: bool = True,
+        logger=None,
+        component: ComponentType = None
+):
+    """
+    Creates a dag per grid cell.
+    The folder is uploaded only for the first cell,
+    the others copy its storage
+    """
+    res = []
+    first = None
+    for cell in cells:
+        builder = DagStandardBuilder(
+            session=session,
+            config=config,
+            debug=debug,
+            config_text=config_text,
+            upload_files=first is None,
+            copy_files_from=first.dag.id if first else None,
+            config_path=config_path,
+            control_reqs=control_reqs,
+            logger=logger,
+            component=component,
+            grid_cell=cell
+        )
+        if first is not None:
+            builder.project = first.project
+            builder.layouts = first.layouts
+
+        res.append(builder.build())
+        first = first or builder
+    return res
+
+
+__all__ = ['dag_standard', 'dag_standard_grid']
@@ -5,6 +5,8 @@ from typing import List
 
 from sqlalchemy.orm.exc import ObjectDeletedError
 
+from mlcomp import TASK_STALE_PENALTY, TASK_STALE_HOLD, \
+    FILE_RECOMPRESS_INTERVAL, FILE_SYNC_INTERVAL
 from mlcomp.db.core import Session
 from mlcomp.db.enums import ComponentType, TaskStatus, TaskType
 from mlcomp.db.models import Task, Auxiliary
@@ -12,12 +14,15 @@ from mlcomp.db.providers import \
     ComputerProvider, \
     TaskProvider, \
     DockerProvider, \
-    AuxiliaryProvider, DagProvider, LogProvider
+    AuxiliaryProvider, DagProvider, LogProvider, TaskSyncedProvider, \
+    TaskUsageProvider
 from mlcomp.utils.io import yaml_dump, yaml_load
 from mlcomp.utils.logging import create_logger
 from mlcomp.utils.misc import now
 from mlcomp.worker.tasks import execute
 from mlcomp.utils.schedule import start_schedule
+from mlcomp.worker.executors import Executor
+from mlcomp.worker.storage import Storage
 import mlcomp.worker.tasks as celery_tasks
 
 
@@ -37,6 +42,19 @@ class SupervisorBuilder:
         self.computers = None
         self.auxiliary = {}
 
+        self.task_synced_provider = None
+        self.task_usage_provider = None
+        # (project, executor) -> peak memory of the last runs, MB
+        self.peak_memory = dict()
+        # preempted tasks still needed by a waiting task
+        self.preempt_kept = set()
+        # (project, computer) -> tasks not synced
+        self.pending_sync = dict()
+        # task -> time since it waits for a computer with the synced data
+        self.hold_since = dict()
+        # task -> memory reserved by the measures of the last runs, GB
+        self.memory_reserved = dict()
+
         self.tasks = []
         self.tasks_stop = []
         self.dags_start = []
@@ -51,6 +69,11 @@ class SupervisorBuilder:
         self.auxiliary_provider = AuxiliaryProvider(self.session)
         self.dag_provider = DagProvider(self.session)
         self.log_provider = LogProvider(self.session)
+        self.task_synced_provider = TaskSyncedProvider(self.session)
+        self.task_usage_provider = TaskUsageProvider(self.session)
+        self.pending_sync = dict()
+        self.peak_memory = dict()
+        self.preempt_kept = set()
 
         self.queues = [
             f'{d.computer}_{d.name}' for d in self.docker_provider.all()
@@ -68,8 +91,16 @@ class SupervisorBuilder:
                          t.status == TaskStatus.NotRan.value]
 
         self.not_ran_tasks = [task for task in not_ran_tasks if not task.debug]
+        not_ran_ids = {t.id for t in self.not_ran_tasks}
+        self.hold_since = {
+            k: v for k, v in self.hold_since.items() if k in not_ran_ids
+        }
+        task_ids = {t.id for t in self.tasks}
+        self.memory_reserved = {
+            k: v for k, v in self.memory_reserved.items() if k in task_ids
+        }
         self.not_ran_tasks = sorted(
-            self.not_ran_tasks, key=lambda x: x.gpu or 0,
+            self.not_ran_tasks, key=lambda x: (x.priority or 0, x.gpu or 0),
             reverse=True)
 
         self.logger.debug(
@@ -94,6 +125,8 @@ class SupervisorBuilder:
         computers = self.computer_provider.computers()
         for computer in computers.values():
             computer['gpu'] = [0] * computer['gpu']
+            # task ids by cpu cores, like gpu
+            computer['cpu_cores'] = [0] * computer['cpu']
             computer['ports'] = set()
             computer['cpu_total'] = computer['cpu']
             computer['memory_total'] = computer['memory']
@@ -116,7 +149,11 @@ class SupervisorBuilder:
             if task.gpu_assigned is not None:
                 for g in task.gpu_assigned.split(','):
                     comp_assigned['gpu'][int(g)] = task.id
-            comp_assigned['memory'] -= task.memory * 1024
+            if task.cpu_assigned:
+                for c in map(int, task.cpu_assigned.split(',')):
+                    if c < len(comp_assigned['cpu_cores']):
+                        comp_assigned['cpu_cores'][c] = task.id
+            comp_assigned['memory'] -= self._task_memory(task) * 1024
 
             info = yaml_load(task.additional_info)
             if 'distr_info' in info:
@@ -132,7 +169,29 @@ class SupervisorBuilder:
 
         self.auxiliary['computers'] = self.computers
 
+    @staticmethod
+    def _process_task_cpu_cores(task: Task, computer: dict):
+        """
+        Assigns the free cores of the computer to the task.
+        The worker pins the task to them and runs that many threads
+        """
+        cores = computer.get('cpu_cores', [])
+        free = [i for i, t in enumerate(cores) if not t]
+        if task.cpu < 1 or len(free) < task.cpu:
+            task.cpu_assigned = None
+            return
+
+        free = free[:task.cpu]
+        for c in free:
+            cores[c] = task.id
+        task.cpu_assigned = ','.join(map(str, free))
+
     def process_to_celery(self, task: Task, queue: str, computer: dict):
+        # an idle worker takes the task at once, the cores are committed
+        # before sending as the gpus are
+        self._process_task_cpu_cores(task, computer)
+        self.provider.commit()
+
         r = execute.apply_async((task.id,), queue=queue, retry=False)
         task.status = TaskStatus.Queued.value
         task.computer_assigned = computer['name']
@@ -144,7 +203,7 @@ class SupervisorBuilder:
                 for g in map(int, task.gpu_assigned.split(',')):
                     computer['gpu'][g] = task.id
             computer['cpu'] -= task.cpu
-            computer['memory'] -= task.memory * 1024
+            computer['memory'] -= self._task_memory(task) * 1024
 
         self.logger.info(
             f'Sent task={task.id} to celery. Queue = {queue} '
@@ -204,7 +263,7 @@ class SupervisorBuilder:
             return f'task cpu = {task.cpu} > computer' \
                    f' free cpu = {c["cpu"]}'
 
-        if task.memory > c['memory']:
+        if self._task_memory(task) > c['memory']:
             return f'task cpu = {task.cpu} > computer ' \
                    f'free memory = {c["memory"]}'
 
@@ -221,6 +280,70 @@ class SupervisorBuilder:
             return f'task requires {task.gpu} ' \
                    f'but there are only {free_gpu} free'
 
+    def _process_task_locality(
+            self, task: Task, computers: List[dict], auxiliary: dict
+    ):
+        """
+        Prefers the computers which have synced the data of the task project.
+        If all of them have not, the task can wait for the sync.
+        Skipped when the file sync is off
+        """
+        if len(computers) == 0 or TASK_STALE_PENALTY <= 0 or \
+                FILE_SYNC_INTERVAL <= 0:
+            return computers
+
+        project = task.dag_rel.project
+        stale = dict()
+        for c in computers:
+            key = (project, c['name'])
+            if key not in self.pending_sync:
+                self.pending_sync[key] = self.task_synced_provider.pending(
+                    project, c['name'])
+            stale[c['name']] = self.pending_sync[key]
+        auxiliary['stale'] = stale
+
+        if TASK_STALE_HOLD > 0 and all(stale.values()):
+            since = self.hold_since.setdefault(task.id, time.time())
+            if time.time() - since < TASK_STALE_HOLD:
+                auxiliary['not_valid'] = 'waiting for the data sync'
+                return []
+        self.hold_since.pop(task.id, None)
+
+        def score(c: dict):
+            free = c['cpu'] / max(c['cpu_total'], 1)
+            return TASK_STALE_PENALTY * stale[c['name']] - free
+
+        return sorted(computers, key=score)
+
+    def _task_memory(self, task: Task):
+        """
+        Memory reserved for the task, GB
+        """
+        return self.memory_reserved.get(task.id, task.memory)
+
+    def _process_task_memory(self, task: Task, auxiliary: dict):
+        """
+        Reserves the memory measured on the last runs of the executor,
+        if it is more than the configured one.
+        The reservation is not more than the memory of the largest computer
+        """
+        key = (task.dag_rel.project, task.executor)
+        if key not in self.peak_memory:
+            self.peak_memory[key] = self.task_usage_provider.peak_memory(
+                *key)
+
+        peak = self.peak_memory[key]
+        if peak is None or peak / 1024 <= task.memory:
+            return
+
+        largest = max(
+            [c['memory_total'] for c in self.computers], default=peak
+        )
+        auxiliary['memory_measured'] = peak / 1024
+        self.memory_reserved[task.id] = round(
+            max(min(peak, largest) / 1024, task.memory), 3
+        )
+
     def _process_task_get_computers(
             self, executor: dict, task: Task, auxiliary: dict
     ):
@@ -233,6 +356,8 @@ class SupervisorBuilder:
             if not error:
                 computers.append(c)
 
+        computers = self._process_task_locality(task, computers, auxiliary)
+
         if task.gpu > 0 and single_node and len(computers) > 0:
             computers = sorted(
                 computers,
@@ -249,6 +374,91 @@ class SupervisorBuilder:
             return []
         return computers
 
+    def _process_task_preempt(
+            self, executor: dict, task: Task, auxiliary: dict
+    ):
+        """
+        Frees the gpus for a task with a higher priority.
+        The running train tasks with a lower priority are asked to stop
+        at their next checkpoint, they are requeued with resume then
+        """
+        if not task.priority or task.gpu == 0 or \
+                not executor.get('single_node', True) or \
+                auxiliary.get('not_valid') == 'waiting for the data sync':
+            return
+
+        running = [
+            t for t in self.tasks
+            if t.status == TaskStatus.InProgress.value
+            and t.type == TaskType.Train.value and t.parent is None
+            and t.gpu_assigned and (t.priority or 0) < task.priority
+            and self._process_task_preemptible(t)
+        ]
+
+        best = None
+        best_chosen = []
+        for c in self.computers:
+            victims = [t for t in running if t.computer_assigned == c['name']]
+            # the ones already preempted go first, then the lowest priority
+            victims = sorted(
+                victims, key=lambda t: (not t.preempt, t.priority or 0)
+            )
+
+            freed = {**c, 'gpu': list(c['gpu'])}
+            chosen = []
+            for victim in victims:
+                if not self._process_task_valid_computer(task, freed, True):
+                    break
+                chosen.append(victim)
+                freed['cpu'] += victim.cpu
+                freed['memory'] += self._task_memory(victim) * 1024
+                freed['gpu'] = [
+                    0 if g == victim.id else g for g in freed['gpu']
+                ]
+
+            if self._process_task_valid_computer(task, freed, True):
+                continue
+            new = [t for t in chosen if not t.preempt]
+            if best is None or len(new) < len(best):
+                best = new
+                best_chosen = chosen
+
+        if best is None:
+            return
+
+        self.preempt_kept.update(t.id for t in best_chosen)
+
+        for victim in best:
+            victim.preempt = True
+            self.logger.info(
+                f'Preempt task={victim.id} for task={task.id} '
+                f'priority = {task.priority}',
+                ComponentType.Supervisor
+            )
+        self.provider.commit()
+        auxiliary['preempt'] = [t.id for t in best]
+
+    def _process_task_preemptible(self, task: Task):
+        if task.dag_rel is None:
+            task.dag_rel = self.dag_provider.by_id(task.dag)
+        config = yaml_load(task.dag_rel.config)
+        executor = config['executors'].get(task.executor, {})
+        return Executor.is_preemptible(executor.get('type'))
+
+    def process_preempt_reset(self):
+        """
+        Withdraws the preemption of the tasks
+        which are not needed by a waiting task anymore
+        """
+        for task in self.tasks:
+            if not task.preempt or task.id in self.preempt_kept or \
+                    task.status != TaskStatus.InProgress.value:
+                continue
+            task.preempt = False
+            self.logger.info(f'Preemption of task={task.id} is withdrawn',
+                             ComponentType.Supervisor)
+        self.provider.commit()
+
     def _process_task_to_send(
             self, executor: dict, task: Task, computers: List[dict]
     ):
@@ -295,8 +505,10 @@ class SupervisorBuilder:
         config = yaml_load(task.dag_rel.config)
         executor = config['executors'][task.executor]
 
+        self._process_task_memory(task, auxiliary)
         computers = self._process_task_get_computers(executor, task, auxiliary)
         if len(computers) == 0:
+            self._process_task_preempt(executor, task, auxiliary)
             return
 
         to_send = self._process_task_to_send(executor, task, computers)
@@ -646,6 +858,7 @@ class SupervisorBuilder:
                 t.celery_id = None
                 t.worker_index = None
                 t.docker_assigned = None
+                t.preempt = False
 
         self.provider.commit()
         self.dags_start = []
@@ -671,6 +884,8 @@ class SupervisorBuilder:
 
             self.process_tasks()
 
+            self.process_preempt_reset()
+
             self.write_auxiliary()
 
         except ObjectDeletedError:
@@ -684,10 +899,33 @@ class SupervisorBuilder:
             self.logger.error(traceback.format_exc(), ComponentType.Supervisor)
 
 
+def recompress_files():
+    """
+    Rewrites the files stored with another codec than FILE_CODEC,
+    e.g. the ones uploaded before it has changed
+    """
+    session = Session.create_session(key='recompress_files')
+    logger = create_logger(session, 'recompress_files')
+    try:
+        storage = Storage(session, logger=logger,
+                          component=ComponentType.Supervisor)
+        storage.recompress()
+    except Exception as e:
+        if Session.sqlalchemy_error(e):
+            Session.cleanup(key='recompress_files')
+            session = Session.create_session(key='recompress_files')
+            logger = create_logger(session, 'recompress_files')
+
+        logger.error(traceback.format_exc(), ComponentType.Supervisor)
+
+
 def register_supervisor():
     builder = SupervisorBuilder()
-    start_schedule([(builder.build, 1)])
+    jobs = [(builder.build, 1)]
+    if FILE_RECOMPRESS_INTERVAL > 0:
+        jobs.append((recompress_files, FILE_RECOMPRESS_INTERVAL))
+    start_schedule(jobs)
     return builder
 
 
-__all__ = ['SupervisorBuilder', 'register_supervisor']
+__all__ = ['SupervisorBuilder', 'register_supervisor', 'recompress_files']
@@ -28,7 +28,9 @@ export class CodeComponent implements AfterViewInit {
             content: node.content,
             id: node.id,
             dag: node.dag,
-            storage: node.storage
+            storage: node.storage,
+            md5: node.md5,
+            size: node.size
         };
     };
 
@@ -78,6 +80,14 @@ export class CodeComponent implements AfterViewInit {
     }
 
     node_click(node: FlatNode) {
+        if (node.content == null) {
+            this.service.get_code_file(node.md5).subscribe(content => {
+                node.content = content;
+                this.node_click(node);
+            });
+            return;
+        }
+
         let pre = document.createElement('pre');
         pre.textContent = node.content;
         let ext = node.name.indexOf('.') != -1 ?
@@ -145,7 +155,8 @@ export class CodeComponent implements AfterViewInit {
                     this.current_node.dag,
                     this.current_node.storage
                 ).subscribe(x => {
-                    this.current_node.id = x.file
+                    this.current_node.id = x.file;
+                    this.current_node.md5 = x.md5;
                 });
                 this.node_click(this.current_node);
                 this.edit_mode = false;
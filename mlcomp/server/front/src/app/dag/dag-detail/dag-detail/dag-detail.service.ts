@@ -44,6 +44,17 @@ export class DagDetailService extends BaseService {
             );
     }
 
+    get_code_file(md5: string): Observable<string> {
+        let url = `${this.url}code_file`;
+        let params = new HttpParams().set('md5', md5);
+
+        return this.http.get(url, {params: params, responseType: 'text'})
+            .pipe(
+                tap(_ => this.log('fetched code file')),
+                catchError(this.handleError<string>('code_file', ''))
+            );
+    }
+
     code_download(dag_id: number): any {
         let url = `${this.url}code_download`;
         let params = new HttpParams().set('id', String(dag_id));
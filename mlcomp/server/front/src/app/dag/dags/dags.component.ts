@@ -291,6 +291,7 @@ export class DagsComponent extends Paginator<Dag> {
         }
         this.service.remove_files(element.id).subscribe(data => {
             element.file_size = 0
+            element.file_physical_size = 0
         });
     }
 
@@ -5,6 +5,7 @@ export class BaseResult {
 
 export class UpdateCodeResult extends BaseResult{
     file: number;
+    md5: string;
 }
 
 export class Project {
@@ -13,6 +14,7 @@ export class Project {
   last_activity: Date;
   img_size: number;
   file_size: number;
+  file_physical_size: number;
 }
 
 export class NameCount {
@@ -31,6 +33,7 @@ export class Dag {
   task_statuses: NameCount;
   img_size: number;
   file_size: number;
+  file_physical_size: number;
   report: number;
   tags: string[];
 }
@@ -60,6 +63,8 @@ export interface FlatNode {
   id: number;
   dag: number;
   storage: number;
+  md5: string;
+  size: number;
 }
 
 export class CodeNode {
@@ -69,6 +74,8 @@ export class CodeNode {
     children?: CodeNode[];
     dag: number;
     storage: number;
+    md5: string;
+    size: number;
 }
 
 export class CodeResult {
@@ -100,6 +107,15 @@ export class Computer {
     dockers: any[];
     sync_status: string;
     sync_date: Date;
+    sync_transfers: SyncTransfer[];
+}
+
+export class SyncTransfer {
+    source: string;
+    folder: string;
+    bytes: number;
+    percent: number;
+    speed: number;
 }
 
 export class SyncProject {
@@ -424,11 +440,24 @@ export class Auxiliary {
     supervisor: AuxiliarySupervisor;
 }
 
+export class TaskUsage {
+    samples: number;
+    cpu_mean: number;
+    cpu_peak: number;
+    memory_mean: number;
+    memory_peak: number;
+    read: number;
+    write: number;
+    threads_peak: number;
+}
+
 export class TaskInfo {
     id: number;
     pid: number;
     worker_index: number;
     gpu_assigned: number;
+    cpu_assigned: string;
+    usage: TaskUsage;
     celery_id: string;
     additional_info: string;
     result: string;
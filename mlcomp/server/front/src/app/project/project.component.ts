@@ -92,6 +92,7 @@ export class ProjectComponent extends Paginator<Project> {
     remove_files(element) {
         this.service.remove_files(element.id).subscribe(data => {
             element.file_size = 0
+            element.file_physical_size = 0
         });
     }
 
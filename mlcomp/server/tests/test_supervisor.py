@@ -0,0 +1,159 @@
+# flake8: noqa
+# noinspection PyUnresolvedReferences
+from mlcomp.utils.tests import session
+from mlcomp.db.core import Session
+from mlcomp.db.enums import TaskType, TaskStatus
+from mlcomp.db.models import Dag, Task, Computer
+from mlcomp.db.providers import ProjectProvider, DagProvider, \
+    TaskProvider, ComputerProvider, TaskUsageProvider
+from mlcomp.server.back import supervisor
+from mlcomp.server.back.supervisor import SupervisorBuilder
+from mlcomp.utils.io import yaml_dump
+
+
+class TestSupervisor(object):
+    def test_preempt(self, session: Session):
+        ComputerProvider(session).add(
+            Computer(name='a', gpu=2, cpu=8, memory=16000, ip='localhost',
+                     port=22, user='user', disk=0, root_folder='/',
+                     can_process_tasks=True)
+        )
+        project = ProjectProvider(session).add_project(name='test')
+        config = yaml_dump({
+            'executors': {'train': {'type': 'catalyst'},
+                          'split': {'type': 'split'}}
+        })
+        dag = DagProvider(session).add(
+            Dag(name='test', project=project.id, config=config))
+        provider = TaskProvider(session)
+
+        def add(priority, gpu=1, executor='train', **kwargs):
+            task = provider.add(
+                Task(name='task', dag=dag.id, executor=executor,
+                     type=TaskType.Train.value, additional_info='',
+                     priority=priority, gpu=gpu, gpu_max=gpu, **kwargs)
+            )
+            task.dag_rel = dag
+            return task
+
+        low = add(0, status=TaskStatus.InProgress.value,
+                  computer_assigned='a', gpu_assigned='0')
+        middle = add(1, status=TaskStatus.InProgress.value,
+                     computer_assigned='a', gpu_assigned='1')
+        high = add(2)
+
+        builder = SupervisorBuilder()
+        builder.create_base()
+        builder.queues = ['a_default']
+
+        def preempt(task):
+            builder.load_tasks()
+            builder.load_computers()
+            auxiliary = {}
+            builder._process_task_preempt({}, task, auxiliary)
+            return auxiliary.get('preempt')
+
+        assert preempt(high) == [low.id]
+        # the task waits for the preempted one
+        assert preempt(high) == []
+
+        high.gpu = 2
+        assert preempt(high) == [middle.id]
+        assert provider.preempt_requested(middle.id)
+
+        assert preempt(add(0)) is None
+
+        # the next tick, the task is not waiting anymore
+        builder.create_base()
+        builder.queues = ['a_default']
+        builder.load_tasks()
+        builder.process_preempt_reset()
+        assert not provider.preempt_requested(low.id)
+        assert not provider.preempt_requested(middle.id)
+
+        # the executor does not check the preemption
+        for t in [low, middle]:
+            t.executor = 'split'
+        provider.commit()
+        for t in [low, middle, high]:
+            t.dag_rel = dag
+        assert preempt(high) is None
+
+    def test_memory(self, session: Session):
+        ComputerProvider(session).add(
+            Computer(name='a', gpu=0, cpu=8, memory=16000, ip='localhost',
+                     port=22, user='user', disk=0, root_folder='/',
+                     can_process_tasks=True)
+        )
+        project = ProjectProvider(session).add_project(name='test')
+        dag = DagProvider(session).add(
+            Dag(name='test', project=project.id, config=''))
+        provider = TaskProvider(session)
+        finished = provider.add(
+            Task(name='task', dag=dag.id, executor='train',
+                 type=TaskType.Train.value, additional_info='',
+                 status=TaskStatus.Success.value, memory=1)
+        )
+        TaskUsageProvider(session).add_sample(
+            finished.id, None,
+            {'cpu': 0, 'memory': 100000, 'read': 0, 'write': 0, 'threads': 1}
+        )
+        task = provider.add(
+            Task(name='task', dag=dag.id, executor='train',
+                 type=TaskType.Train.value, additional_info='', memory=1)
+        )
+        task.dag_rel = dag
+
+        builder = SupervisorBuilder()
+        builder.create_base()
+        builder.load_tasks()
+        builder.load_computers()
+        auxiliary = {}
+        builder._process_task_memory(task, auxiliary)
+
+        assert auxiliary['memory_measured'] == 100000 / 1024
+        # the computer memory is the limit
+        assert builder._task_memory(task) == round(16000 / 1024, 3)
+        assert task.memory == 1
+
+    def test_send_cpu_cores(self, session: Session, monkeypatch):
+        project = ProjectProvider(session).add_project(name='test')
+        dag = DagProvider(session).add(
+            Dag(name='test', project=project.id, config=''))
+        provider = TaskProvider(session)
+        task = provider.add(
+            Task(name='task', dag=dag.id, executor='train',
+                 type=TaskType.Train.value, additional_info='', cpu=2)
+        )
+
+        sent = []
+
+        class Result:
+            id = 'celery'
+
+        def apply_async(args, **kwargs):
+            # the state the worker loads
+            sent.append((task.cpu_assigned, len(session.dirty)))
+            return Result()
+
+        monkeypatch.setattr(supervisor.execute, 'apply_async', apply_async)
+        builder = SupervisorBuilder()
+        builder.create_base()
+        task = builder.provider.by_id(task.id)
+        session = builder.session
+        computer = {'name': 'a', 'cpu': 8, 'memory': 16000, 'gpu': [],
+                    'cpu_cores': [0] * 8}
+        builder.process_to_celery(task, 'a_default', computer)
+        assert sent == [('0,1', 0)]
+        assert computer['cpu'] == 6
+
+    def test_cpu_cores(self):
+        computer = {'cpu_cores': [0, 5, 0, 0]}
+        task = Task(id=1, cpu=2)
+        SupervisorBuilder._process_task_cpu_cores(task, computer)
+        assert task.cpu_assigned == '0,2'
+        assert computer['cpu_cores'] == [1, 5, 1, 0]
+
+        task = Task(id=2, cpu=2)
+        SupervisorBuilder._process_task_cpu_cores(task, computer)
+        assert task.cpu_assigned is None
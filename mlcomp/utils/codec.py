@@ -0,0 +1,47 @@
+import zlib
+
+# codec marker of a file stored by chunks
+CHUNKED = 'chunked'
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise Exception('zstd codec requires zstandard. '
+                        'pip install zstandard')
+    return zstandard
+
+
+def compress(content: bytes, codec: str = None):
+    """
+    Compresses the content with the codec.
+    The content is kept raw if it does not shrink
+    :return: codec (None for the raw content), data
+    """
+    if not codec or codec == 'none':
+        return None, content
+
+    if codec == 'zlib':
+        data = zlib.compress(content, 6)
+    elif codec == 'zstd':
+        data = _zstd().ZstdCompressor(level=10).compress(content)
+    else:
+        raise Exception(f'Unknown codec = {codec}')
+
+    if len(data) >= len(content):
+        return None, content
+    return codec, data
+
+
+def decompress(data: bytes, codec: str = None):
+    if codec is None:
+        return data
+    if codec == 'zlib':
+        return zlib.decompress(data)
+    if codec == 'zstd':
+        return _zstd().ZstdDecompressor().decompress(data)
+    raise Exception(f'Unknown codec = {codec}')
+
+
+__all__ = ['CHUNKED', 'compress', 'decompress']
@@ -3,8 +3,9 @@ from os.path import join
 
 from typing import List
 
+import time
 from io import BytesIO
-from zipfile import ZipFile
+from zipfile import ZipFile, ZipInfo, ZIP_DEFLATED, ZIP_STORED
 
 import pandas as pd
 import yaml
@@ -79,5 +80,61 @@ def zip_folder(
     return dst
 
 
+# extensions of the files which are not compressed again
+COMPRESSED_EXTENSIONS = {
+    '.zip', '.gz', '.tgz', '.bz2', '.xz', '.7z', '.rar', '.npz', '.pth',
+    '.png', '.jpg', '.jpeg', '.gif', '.webp', '.mp3', '.mp4', '.avi',
+    '.parquet'
+}
+
+
+class _ZipBuffer:
+    """
+    Write-only file object accumulating the zip output between chunks
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        res = b''.join(self.chunks)
+        self.chunks = []
+        return res
+
+
+def zip_stream(entries):
+    """
+    Zips files on the fly, yielding the archive chunk by chunk
+    :param entries: iterable of (path in the archive, iterable of bytes)
+    """
+    buffer = _ZipBuffer()
+    with ZipFile(buffer, 'w') as zip_obj:
+        for path, chunks in entries:
+            info = ZipInfo(path, date_time=time.localtime()[:6])
+            ext = os.path.splitext(path)[1].lower()
+            info.compress_type = ZIP_STORED \
+                if ext in COMPRESSED_EXTENSIONS else ZIP_DEFLATED
+
+            with zip_obj.open(info, 'w') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    data = buffer.pop()
+                    if data:
+                        yield data
+
+            data = buffer.pop()
+            if data:
+                yield data
+
+    yield buffer.pop()
+
+
 __all__ = ['read_lines', 'from_module_path', 'yaml_load', 'yaml_dump',
-           'zip_folder']
+           'zip_folder', 'zip_stream']
@@ -1,4 +1,8 @@
-from typing import List
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+import hashlib
+from multiprocessing import current_process
+from typing import List, Dict
 import os
 import ast
 from glob import glob
@@ -15,17 +19,79 @@ _mapping = {
     'migrate': 'sqlalchemy-migrate'
 }
 
+# files are parsed in a process pool when there are more of them
+PARSE_POOL_MIN_FILES = 64
+
+# import names of the parsed files by md5
+_imports_cache = dict()
+
+
+def import_names(tree: ast.AST) -> List[str]:
+    """
+    Top-level names of the absolute imports of a parsed module.
+    Relative imports can not be distributions
+    """
+    res = dict()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for subnode in node.names:
+                res[subnode.name.split('.')[0]] = True
+        elif isinstance(node, ast.ImportFrom):
+            if node.module and not node.level:
+                res[node.module.split('.')[0]] = True
+    return list(res)
+
+
+def _parse_imports(content: bytes, encoding: str):
+    """
+    Runs in a worker of parse_executor
+    :return: import names, exception
+    """
+    try:
+        return import_names(ast.parse(content.decode(encoding))), None
+    except Exception as exc:
+        return None, exc
+
+
+def parse_executor(count: int):
+    """
+    Process pool for a lot of files, the parsing is CPU bound.
+    Daemon processes (celery workers) can not have children
+    """
+    if count >= PARSE_POOL_MIN_FILES and not current_process().daemon:
+        return ProcessPoolExecutor()
+    return ThreadPoolExecutor()
+
+
+@lru_cache(maxsize=None)
+def distribution(name: str):
+    """
+    Installed distribution of an import name.
+    Cached for the lifetime of the process
+    :return: distribution name, version or None
+    """
+    name = _mapping.get(name, name)
+    try:
+        return name, pkg_resources.get_distribution(name).version
+    except Exception:
+        return None
+
 
 def find_imports(
     path: str,
     files: List[str] = None,
     exclude_patterns: List[str] = None,
-    encoding='utf-8'
+    encoding='utf-8',
+    imports: Dict[str, List[str]] = None
 ):
-    res = []
-    raw_imports = []
+    """
+    :param imports: file -> import names, computed before
+    (e.g. by the upload manifest). Other files are parsed,
+    their import names are cached by md5
+    """
     files = files if files is not None \
         else glob(os.path.join(path, '**', '*.py'), recursive=True)
+    imports = imports or dict()
 
     exclude_patterns = exclude_patterns \
         if exclude_patterns is not None else []
@@ -33,6 +99,8 @@ def find_imports(
         pathspec.patterns.GitWildMatchPattern, exclude_patterns
     )
 
+    names = dict()
+    to_parse = []
     for file in files:
         if not file.endswith('.py'):
             continue
@@ -40,33 +108,41 @@ def find_imports(
         if spec.match_file(file_rel):
             continue
 
-        with open(file, 'r', encoding=encoding) as f:
+        if file in imports:
+            names[file_rel] = imports[file]
+            continue
+
+        with open(file, 'rb') as f:
             content = f.read()
-            try:
-                tree = ast.parse(content)
-                for node in ast.walk(tree):
-                    if isinstance(node, ast.Import):
-                        for subnode in node.names:
-                            raw_imports.append((subnode.name, file_rel))
-                    elif isinstance(node, ast.ImportFrom):
-                        raw_imports.append((node.module, file_rel))
-            except Exception as exc:
+        md5 = hashlib.md5(content).hexdigest()
+        if md5 in _imports_cache:
+            names[file_rel] = _imports_cache[md5]
+        else:
+            # keeps the order of the files
+            names[file_rel] = None
+            to_parse.append((file_rel, md5, content))
+
+    with parse_executor(len(to_parse)) as executor:
+        results = executor.map(
+            _parse_imports,
+            [content for _, _, content in to_parse],
+            [encoding] * len(to_parse)
+        )
+        for (file_rel, md5, _), (file_names, exc) in zip(to_parse, results):
+            if exc is not None:
                 logger = create_logger(Session.create_session(), __name__)
                 logger.error('Failed on file: %s' % file_rel)
                 raise exc
+            names[file_rel] = _imports_cache[md5] = file_names
 
-    for lib, file in raw_imports:
-        name = lib.split('.')[0]
-        try:
-            if name in _mapping:
-                name = _mapping[name]
-
-            version = pkg_resources.get_distribution(name).version
-            res.append((name, version))
-        except Exception:
-            pass
+    res = dict()
+    for file_names in names.values():
+        for name in file_names:
+            dist = distribution(name)
+            if dist:
+                res[dist] = True
 
-    return res
+    return list(res)
 
 
 def _read_requirements(file: str):
@@ -99,7 +175,8 @@ def _write_requirements(file: str, reqs: List):
 
 
 def control_requirements(
-    path: str, files: List[str] = None, exclude_patterns: List[str] = None
+    path: str, files: List[str] = None, exclude_patterns: List[str] = None,
+    imports: Dict[str, List[str]] = None
 ):
     req_file = os.path.join(path, 'requirements.txt')
     if not os.path.exists(req_file):
@@ -111,7 +188,12 @@ def control_requirements(
         with open(req_ignore_file, 'w') as f:
             f.write('')
 
-    libs = find_imports(path, files=files, exclude_patterns=exclude_patterns)
+    libs = find_imports(
+        path,
+        files=files,
+        exclude_patterns=exclude_patterns,
+        imports=imports
+    )
     module_folder = os.path.dirname(__file__)
     stdlib_file = os.path.join(module_folder, 'req_stdlib')
     ignore_libs = set(read_lines(req_ignore_file) + read_lines(stdlib_file))
@@ -14,9 +14,10 @@ import torch
 from mlcomp.report import check_statuses
 from mlcomp.utils.io import yaml_load
 
-from mlcomp import ROOT_FOLDER, MASTER_PORT_RANGE, CONFIG_FOLDER, \
+from mlcomp import ROOT_FOLDER, MASTER_PORT_RANGE, \
     DOCKER_IMG, DOCKER_MAIN, IP, PORT, WORKER_USAGE_INTERVAL, \
-    SYNC_WITH_THIS_COMPUTER, CAN_PROCESS_TASKS
+    SYNC_WITH_THIS_COMPUTER, CAN_PROCESS_TASKS, WORKER_WARM_POOL, \
+    WORKER_SCALE
 from mlcomp.db.core import Session
 from mlcomp.db.enums import ComponentType, TaskStatus
 from mlcomp.utils.logging import create_logger
@@ -29,8 +30,13 @@ from mlcomp.db.providers import ComputerProvider
 from mlcomp.db.models import ComputerUsage, Computer, Docker
 from mlcomp.utils.misc import memory
 from mlcomp.worker.sync import FileSync
+from mlcomp.worker.scaling import supervisord_workers, WorkerScaler, \
+    SUPERVISORD_CONF
+from mlcomp.worker.tasks import preload, execute_by_id
+from mlcomp.worker.usage import TaskUsageSampler
 
 _session = Session.create_session(key='worker')
+_sampler = TaskUsageSampler()
 
 
 @click.group()
@@ -161,6 +167,11 @@ def worker_usage(session: Session, logger):
     provider.add(ComputerUsage(computer=computer, usage=usage, time=now()))
 
 
+@error_handler
+def task_usage(session: Session, logger):
+    _sampler.sample(session)
+
+
 @main.command()
 @click.argument('number', type=int)
 def worker(number):
@@ -175,9 +186,25 @@ def worker(number):
         '-O fair', '-c=1', '--prefetch-multiplier=1', '-Q', f'{name},'
                                                             f'{name}_{number}'
     ]
+    if WORKER_WARM_POOL:
+        preload()
+
     app.worker_main(argv)
 
 
+@main.command()
+@click.argument('id', type=int)
+@click.option('--repeat_count', type=int, default=1)
+def execute(id: int, repeat_count: int):
+    """
+    Execute a task in this process.
+    Used to run a task with the environment of its dag
+
+    :param id: task id
+    """
+    execute_by_id(id, repeat_count=repeat_count, exit=False)
+
+
 @main.command()
 @click.option('--workers', type=int, default=cpu_count(),
               help='count of workers')
@@ -200,6 +227,11 @@ def worker_supervisor(workers: int):
     _create_docker()
 
     start_schedule([(stop_processes_not_exist, 10)])
+    start_schedule([(task_usage, WORKER_USAGE_INTERVAL)])
+
+    if WORKER_SCALE:
+        scaler = WorkerScaler(workers)
+        start_schedule([(scaler.scale, 5)])
 
     if DOCKER_MAIN:
         syncer = FileSync()
@@ -253,14 +285,9 @@ def start(daemon: bool, debug: bool, workers: int, log_level: str):
         'autorestart=true',
         ''
     ]
-    for p in range(workers):
-        text.append(f'[program:worker{p}]')
-        text.append(f'command={worker_command} {p}')
-        text.append('autostart=true')
-        text.append('autorestart=true')
-        text.append('')
-
-    conf = os.path.join(CONFIG_FOLDER, 'supervisord.conf')
+    text.extend(supervisord_workers(worker_command, workers))
+
+    conf = SUPERVISORD_CONF
     with open(conf, 'w') as f:
         f.writelines('\n'.join(text))
 
@@ -0,0 +1,159 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from os.path import join, exists
+
+from mlcomp import BLOB_FOLDER, CODE_CACHE_FOLDER
+
+
+class FolderBlobStore:
+    """
+    Content-addressed store of file contents.
+
+    A blob is kept at <folder>/<md5[:2]>/<md5[2:4]>/<md5>.
+    The folder must be reachable from all the computers
+    (e.g. a network mount) if they execute tasks
+    """
+
+    chunk_size = 2 ** 20
+
+    def __init__(self, folder: str = BLOB_FOLDER):
+        self.folder = folder
+
+    def path(self, md5: str):
+        return join(self.folder, md5[:2], md5[2:4], md5)
+
+    def exists(self, md5: str):
+        return exists(self.path(md5))
+
+    def _commit(self, tmp: str, md5: str):
+        path = self.path(md5)
+        if exists(path):
+            os.remove(tmp)
+            return
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp, path)
+
+    def _tmp(self):
+        os.makedirs(self.folder, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.folder, prefix='.tmp')
+        return os.fdopen(fd, 'wb'), tmp
+
+    def write(self, content: bytes, md5: str = None):
+        md5 = md5 or hashlib.md5(content).hexdigest()
+        if self.exists(md5):
+            return md5
+
+        f, tmp = self._tmp()
+        with f:
+            f.write(content)
+        self._commit(tmp, md5)
+        return md5
+
+    def write_stream(self, stream):
+        """
+        Writes the stream chunk by chunk, hashing it on the fly
+        :return: md5, size
+        """
+        return self.write_chunks(iter(lambda: stream.read(self.chunk_size),
+                                      b''))
+
+    def write_chunks(self, chunks):
+        """
+        Writes the chunks of bytes, hashing them on the fly
+        :return: md5, size
+        """
+        md5 = hashlib.md5()
+        size = 0
+
+        f, tmp = self._tmp()
+        with f:
+            for chunk in chunks:
+                md5.update(chunk)
+                size += len(chunk)
+                f.write(chunk)
+
+        md5 = md5.hexdigest()
+        self._commit(tmp, md5)
+        return md5, size
+
+    def open(self, md5: str):
+        return open(self.path(md5), 'rb')
+
+    def read(self, md5: str):
+        with self.open(md5) as f:
+            return f.read()
+
+    def copy_to(self, md5: str, dst):
+        with self.open(md5) as f:
+            shutil.copyfileobj(f, dst, self.chunk_size)
+
+    def remove(self, md5: str):
+        try:
+            os.remove(self.path(md5))
+        except FileNotFoundError:
+            pass
+
+    def hashes(self):
+        if not exists(self.folder):
+            return
+        for root, _, files in os.walk(self.folder):
+            for file in files:
+                if not file.startswith('.tmp'):
+                    yield file
+
+
+class LocalCache(FolderBlobStore):
+    """
+    Per-computer cache of the DAG files.
+
+    Task folders are assembled from it with copies: a task may rewrite
+    its files, a hardlink would change the cache then.
+    The least recently used files are evicted first
+    """
+
+    def __init__(self, folder: str = CODE_CACHE_FOLDER):
+        super().__init__(folder)
+
+    def _commit(self, tmp: str, md5: str):
+        os.chmod(tmp, 0o444)
+        super()._commit(tmp, md5)
+
+    def copy(self, md5: str, dst: str):
+        path = self.path(md5)
+        # mtime marks the last usage
+        os.utime(path)
+
+        if exists(dst) or os.path.islink(dst):
+            os.remove(dst)
+        # the copy is made by the kernel, the mode of the cache is not copied
+        shutil.copyfile(path, dst)
+
+    def trim(self, size: int):
+        """
+        Evicts the least recently used files until the cache fits the size
+        :return: count of the evicted files
+        """
+        items = []
+        total = 0
+        for md5 in self.hashes():
+            try:
+                stat = os.stat(self.path(md5))
+            except FileNotFoundError:
+                continue
+            items.append((stat.st_mtime, stat.st_size, md5))
+            total += stat.st_size
+
+        count = 0
+        for _, file_size, md5 in sorted(items):
+            if total <= size:
+                break
+            self.remove(md5)
+            total -= file_size
+            count += 1
+        return count
+
+
+__all__ = ['FolderBlobStore', 'LocalCache']
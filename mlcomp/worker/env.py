@@ -0,0 +1,124 @@
+import fcntl
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+from contextlib import contextmanager
+from os.path import join, exists
+from typing import List, Tuple
+
+import pkg_resources
+
+from mlcomp import ENV_CACHE_FOLDER, WHEEL_FOLDER
+
+
+class EnvCache:
+    """
+    Content-addressed cache of the dag environments.
+
+    An environment is a folder with the libraries installed by pip --target.
+    It is kept at <folder>/<key>, where the key is the hash of the
+    library set, so all the tasks with the same set share it.
+    The folder is put in front of site-packages instead of installing
+    into the environment of the worker. The dependencies of the libraries
+    are not installed, so the environment does not shadow the ones
+    of the worker.
+    Wheels are cached in wheel_folder, a library is downloaded once
+    """
+
+    def __init__(self, folder: str = ENV_CACHE_FOLDER,
+                 wheel_folder: str = WHEEL_FOLDER):
+        self.folder = folder
+        self.wheel_folder = wheel_folder
+
+    @staticmethod
+    def requirements(libraries: List[Tuple[str, str]]):
+        return sorted(f'{name}=={version}' for name, version in libraries)
+
+    def key(self, libraries: List[Tuple[str, str]]):
+        text = '\n'.join(self.requirements(libraries))
+        return hashlib.md5(text.encode()).hexdigest()
+
+    def path(self, libraries: List[Tuple[str, str]]):
+        return join(self.folder, self.key(libraries))
+
+    @contextmanager
+    def _lock(self, path: str):
+        """
+        Inter-process lock, workers of the same computer
+        build an environment once
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        with open(f'{path}.lock', 'w') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _pip(*args):
+        subprocess.check_call(
+            [sys.executable, '-m', 'pip', '--disable-pip-version-check',
+             *args]
+        )
+
+    def build(self, libraries: List[Tuple[str, str]]):
+        """
+        Builds the environment of the libraries if it does not exist
+        :return: path of the environment
+        """
+        path = self.path(libraries)
+        if exists(path):
+            return path
+
+        with self._lock(path):
+            if exists(path):
+                return path
+
+            reqs = self.requirements(libraries)
+            self._pip('wheel', '--no-deps', '--wheel-dir',
+                      self.wheel_folder, '--find-links', self.wheel_folder,
+                      *reqs)
+
+            tmp = f'{path}.tmp'
+            shutil.rmtree(tmp, ignore_errors=True)
+            self._pip('install', '--no-index', '--no-deps', '--find-links',
+                      self.wheel_folder, '--target', tmp, *reqs)
+            os.replace(tmp, path)
+
+        return path
+
+    @staticmethod
+    def modules(path: str):
+        """
+        Top-level modules of an environment
+        """
+        res = set()
+        for name in os.listdir(path):
+            if name in ['bin', '__pycache__'] or \
+                    name.endswith(('.dist-info', '.egg-info', '.data')):
+                continue
+            res.add(name.split('.')[0])
+        return res
+
+    def activate(self, path: str):
+        """
+        Puts the environment in front of site-packages.
+        :return: modules of the environment which have already been
+        imported by the process, their versions are not changed
+        """
+        if path not in sys.path:
+            index = 0
+            while index < len(sys.path) and \
+                    'site-packages' not in sys.path[index]:
+                index += 1
+            sys.path.insert(index, path)
+            for dist in pkg_resources.find_distributions(path):
+                pkg_resources.working_set.add(dist, path, replace=True)
+
+        return sorted(m for m in self.modules(path) if m in sys.modules)
+
+
+__all__ = ['EnvCache']
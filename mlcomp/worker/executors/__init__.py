@@ -1,2 +1,2 @@
 # flake8: noqa
-from .base import StepWrap, Executor
+from .base import StepWrap, Executor, TaskPreempted
@@ -1,4 +1,4 @@
 from .step import StepWrap
-from .executor import Executor
+from .executor import Executor, TaskPreempted
 
-__all__ = ['StepWrap', 'Executor']
+__all__ = ['StepWrap', 'Executor', 'TaskPreempted']
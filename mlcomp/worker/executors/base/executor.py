@@ -8,7 +8,8 @@ from mlcomp import FILE_SYNC_INTERVAL
 from mlcomp.db.core import Session
 from mlcomp.db.models import Task, Dag
 from mlcomp.utils.config import Config
-from mlcomp.db.providers import TaskProvider, TaskSyncedProvider
+from mlcomp.db.providers import TaskProvider, TaskSyncedProvider, \
+    TaskProgressProvider
 from mlcomp.utils.misc import to_snake
 from mlcomp.worker.executors.base.step import StepWrap
 
@@ -29,16 +30,20 @@ class TqdmWrapper:
         executor = self.executor
         tqdm = self.tqdm
 
-        executor.task.loader_name = self.desc
-        executor.task.batch_index = tqdm.n
-        executor.task.batch_total = tqdm.total
-        executor.task.epoch_duration = time.time() - tqdm.start_t
+        epoch_duration = time.time() - tqdm.start_t
+        epoch_time_remaining = None
         if tqdm.n > 0:
             frac = (tqdm.total - tqdm.n) / tqdm.n
-            executor.task.epoch_time_remaining = \
-                executor.task.epoch_duration * frac
-
-        executor.task_provider.update()
+            epoch_time_remaining = epoch_duration * frac
+
+        executor.progress_provider.set(
+            executor.task.id,
+            loader_name=self.desc,
+            batch_index=tqdm.n,
+            batch_total=tqdm.total,
+            epoch_duration=epoch_duration,
+            epoch_time_remaining=epoch_time_remaining
+        )
         return time.time()
 
     def set_description(self, desc=None, refresh=True):
@@ -66,11 +71,20 @@ class TqdmWrapper:
         self.refresh()
 
 
+class TaskPreempted(Exception):
+    """
+    Raised by an executor which has stopped at a checkpoint
+    because the supervisor has preempted the task
+    """
+    pass
+
+
 class Executor(ABC):
     _child = dict()
 
     session = None
     task_provider = None
+    progress_provider = None
     logger = None
     logger_db = None
     step = None
@@ -109,6 +123,14 @@ class Executor(ABC):
     def flush(self):
         pass
 
+    def preempt_requested(self):
+        """
+        The supervisor asks the task to free its resources.
+        An executor that can resume checks it at its checkpoints
+        and raises TaskPreempted, the task is requeued then
+        """
+        return self.task_provider.preempt_requested(self.task.id)
+
     def add_child_process(self, pid: int):
         additional_info = yaml_load(self.task.additional_info)
         additional_info['child_processes'] = additional_info.get(
@@ -122,6 +144,7 @@ class Executor(ABC):
         assert dag is not None, 'You must fetch task with dag_rel'
 
         self.task_provider = task_provider
+        self.progress_provider = TaskProgressProvider(self.session)
         self.task = task
         self.dag = dag
         self.step = StepWrap(self.session, self.logger, self.logger_db, task,
@@ -202,6 +225,14 @@ class Executor(ABC):
         variants = ['Catalyst']
         return type in (variants + [v.lower() for v in variants])
 
+    @staticmethod
+    def is_preemptible(type: str):
+        """
+        The executors checking preempt_requested at their checkpoints
+        """
+        variants = ['Catalyst']
+        return type in (variants + [v.lower() for v in variants])
+
     def tqdm(self, iterable=None, desc: str = 'progress', interval: int = 10,
              **kwargs):
         """
@@ -227,4 +258,4 @@ class Executor(ABC):
         return res
 
 
-__all__ = ['Executor']
+__all__ = ['Executor', 'TaskPreempted']
@@ -1,6 +1,7 @@
 import os
 import socket
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from os.path import join
 
@@ -13,6 +14,7 @@ from catalyst.dl import State, Callback, Runner, CheckpointCallback, \
     CallbackNode
 
 from mlcomp import TASK_FOLDER
+from mlcomp.db.core import Session
 from mlcomp.db.providers import ReportSeriesProvider, ComputerProvider, \
     MemoryProvider
 from mlcomp.db.report_info import ReportLayoutInfo
@@ -20,9 +22,9 @@ from mlcomp.utils.io import yaml_load, yaml_dump
 from mlcomp.utils.misc import now
 from mlcomp.db.models import ReportSeries
 from mlcomp.utils.config import Config, merge_dicts_smart
-from mlcomp.worker.executors.base import Executor
+from mlcomp.worker.executors.base import Executor, TaskPreempted
 from mlcomp.worker.executors.model import trace_model_from_checkpoint
-from mlcomp.worker.sync import copy_remote
+from mlcomp.worker.transfer import fetch_remote
 
 
 class Args:
@@ -80,6 +82,9 @@ class Catalyst(Executor, Callback):
         self.loader_started_time = None
         self.parent = None
         self.node = CallbackNode.All
+        self.score = None
+        self.writer = ThreadPoolExecutor(max_workers=1)
+        self.write_future = None
 
     def get_parent_task(self):
         if self.parent:
@@ -97,6 +102,15 @@ class Catalyst(Executor, Callback):
         self.loader_started_time = now()
 
     def on_epoch_start(self, state: State):
+        # the checkpoint of the previous epoch has been saved.
+        # a distributed task is not preempted: the ranks would have to
+        # agree on the epoch
+        if not self.distr_info and self.preempt_requested():
+            raise TaskPreempted(
+                f'preempted at stage = {state.stage_name} '
+                f'epoch = {state.epoch}'
+            )
+
         stage_index = self.experiment.stages.index(state.stage_name)
         self.step.start(1, name=state.stage_name, index=stage_index)
 
@@ -109,31 +123,50 @@ class Catalyst(Executor, Callback):
             if (now() - self.last_batch_logged).total_seconds() < 10:
                 return
 
-        task = self.get_parent_task()
-        task.batch_index = state.loader_step
-        task.batch_total = state.loader_len
-        task.loader_name = state.loader_name
-
         duration = int((now() - self.loader_started_time).total_seconds())
-        task.epoch_duration = duration
-        task.epoch_time_remaining = int(duration * (
-                task.batch_total / task.batch_index)) - task.epoch_duration
+        progress = {
+            'batch_index': state.loader_step,
+            'batch_total': state.loader_len,
+            'loader_name': state.loader_name,
+            'epoch_duration': duration,
+            'epoch_time_remaining': int(
+                duration * (state.loader_len / state.loader_step)
+            ) - duration
+        }
         if state.epoch_metrics.get('train_loss') is not None:
-            task.loss = float(state.epoch_metrics['train_loss'])
+            progress['loss'] = float(state.epoch_metrics['train_loss'])
         if state.epoch_metrics.get('valid_loss') is not None:
-            task.loss = float(state.epoch_metrics['valid_loss'])
+            progress['loss'] = float(state.epoch_metrics['valid_loss'])
 
-        self.task_provider.update()
+        self.progress_provider.set(self.get_parent_task().id, **progress)
         self.last_batch_logged = now()
 
+    @staticmethod
+    def _write_epoch(series: list, task: int, fields: dict):
+        # the writer thread has its own session
+        session = Session.create_session(key='Catalyst.writer')
+        ReportSeriesProvider(session).add_epoch(series, task, fields)
+
+    def _write_wait(self):
+        if self.write_future is not None:
+            future = self.write_future
+            self.write_future = None
+            future.result()
+
     def on_epoch_end(self, state: State):
         self.step.end(2)
 
         values = state.epoch_metrics
+        task_id = self.task.parent or self.task.id
+        if self.score is None:
+            self.score = self.get_parent_task().score
 
+        series = []
+        fields = {}
         for k, v in values.items():
             part = ''
             name = k
+            v = float(v)
 
             for loader in state.loaders:
                 if k.startswith(loader):
@@ -142,35 +175,38 @@ class Catalyst(Executor, Callback):
                     if name.startswith('_'):
                         name = name[1:]
 
-            task_id = self.task.parent or self.task.id
-            series = ReportSeries(
-                part=part,
-                name=name,
-                epoch=state.epoch - 1,
-                task=task_id,
-                value=v,
-                time=now(),
-                stage=state.stage_name
+            series.append(
+                ReportSeries(
+                    part=part,
+                    name=name,
+                    epoch=state.epoch - 1,
+                    task=task_id,
+                    value=v,
+                    time=now(),
+                    stage=state.stage_name
+                )
             )
-            self.series_provider.add(series)
 
-            if name == self.report.metric.name:
-                best = False
-                task = self.task
-                if task.parent:
-                    task = self.task_provider.by_id(task.parent)
+            if name == 'loss' and (part == 'valid' or 'loss' not in fields):
+                fields['loss'] = v
 
+            if name == self.report.metric.name:
                 if self.report.metric.minimize:
-                    if task.score is None or v < task.score:
-                        best = True
+                    best = self.score is None or v < self.score
                 else:
-                    if task.score is None or v > task.score:
-                        best = True
+                    best = self.score is None or v > self.score
                 if best:
-                    task.score = v
-                    self.task_provider.update()
+                    self.score = v
+                    fields['score'] = v
+
+        # the previous epoch write has had a whole epoch to finish
+        self._write_wait()
+        self.write_future = self.writer.submit(
+            self._write_epoch, series, task_id, fields
+        )
 
     def on_stage_end(self, state: State):
+        self._write_wait()
         self.step.end(1)
 
     @classmethod
@@ -282,7 +318,8 @@ class Catalyst(Executor, Callback):
             master_computer = self.computer_provider.by_name(
                 resume['master_computer'])
             path_from = join(
-                master_computer.root_folder, str(resume['master_task_id']),
+                master_computer.root_folder, 'tasks',
+                str(resume['master_task_id']),
                 experiment.logdir,
                 'checkpoints', file
             )
@@ -292,7 +329,7 @@ class Catalyst(Executor, Callback):
                 f'path_to={path}'
             )
 
-            success = copy_remote(
+            success = fetch_remote(
                 session=self.session,
                 computer_from=resume['master_computer'],
                 path_from=path_from,
@@ -420,7 +457,12 @@ class Catalyst(Executor, Callback):
                 if k == experiment.stages[0]
             }
 
-        runner.run_experiment(experiment)
+        try:
+            runner.run_experiment(experiment)
+        finally:
+            self._write_wait()
+            self.writer.shutdown()
+
         if runner.state.exception:
             raise runner.state.exception
 
@@ -0,0 +1,185 @@
+import os
+import socket
+import subprocess
+import time
+import traceback
+from typing import Set
+
+import psutil
+
+from mlcomp import CONFIG_FOLDER, DOCKER_IMG, WORKER_SCALE, WORKER_MIN, \
+    WORKER_IDLE_TIMEOUT, WORKER_MAX_MEMORY
+from mlcomp.db.core import Session
+from mlcomp.db.enums import ComponentType, TaskStatus
+from mlcomp.db.providers import TaskProvider
+from mlcomp.utils.logging import create_logger
+
+SUPERVISORD_CONF = os.path.join(CONFIG_FOLDER, 'supervisord.conf')
+SUPERVISORD_SOCK = os.path.join(CONFIG_FOLDER, 'supervisord.sock')
+
+
+def supervisord_workers(worker_command: str, workers: int):
+    """
+    Sections of the supervisord config for the workers.
+    With WORKER_SCALE, only WORKER_MIN of them start,
+    the worker supervisor starts and stops the others by supervisorctl
+    """
+    text = []
+    if WORKER_SCALE:
+        text.extend([
+            '[unix_http_server]',
+            f'file={SUPERVISORD_SOCK}',
+            '',
+            '[rpcinterface:supervisor]',
+            'supervisor.rpcinterface_factory = '
+            'supervisor.rpcinterface:make_main_rpcinterface',
+            '',
+            '[supervisorctl]',
+            f'serverurl=unix://{SUPERVISORD_SOCK}',
+            ''
+        ])
+
+    for p in range(workers):
+        autostart = not WORKER_SCALE or p < WORKER_MIN
+        text.append(f'[program:worker{p}]')
+        text.append(f'command={worker_command} {p}')
+        text.append(f'autostart={str(autostart).lower()}')
+        text.append('autorestart=true')
+        if WORKER_SCALE:
+            # a stopped worker finishes its task (celery warm shutdown)
+            text.append('stopsignal=TERM')
+            text.append('stopwaitsecs=86400')
+        text.append('')
+    return text
+
+
+class WorkerScaler:
+    """
+    Starts the workers of this computer when the tasks are queued on it
+    and stops the ones which have been idle for WORKER_IDLE_TIMEOUT
+    seconds, keeping WORKER_MIN..workers of them
+    """
+
+    def __init__(self, workers: int, min_workers: int = WORKER_MIN,
+                 idle_timeout: int = WORKER_IDLE_TIMEOUT,
+                 max_memory: float = WORKER_MAX_MEMORY):
+        self.workers = workers
+        self.min_workers = min(min_workers, workers)
+        self.idle_timeout = idle_timeout
+        self.max_memory = max_memory
+        # worker index -> time since it does not have a task
+        self.idle_since = dict()
+
+        self.session = Session.create_session(key='WorkerScaler')
+        self.logger = create_logger(self.session, 'WorkerScaler')
+
+    @staticmethod
+    def _ctl(*args):
+        res = subprocess.run(
+            ['supervisorctl', '-c', SUPERVISORD_CONF, *args],
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+        )
+        return res.stdout.decode()
+
+    def running(self):
+        """
+        Indexes of the workers which are not stopped.
+        An exited worker is restarted by supervisord
+        """
+        res = set()
+        for line in self._ctl('status').splitlines():
+            parts = line.split()
+            if len(parts) < 2 or not parts[0].startswith('worker'):
+                continue
+            if parts[1] not in ['STOPPED', 'STOPPING', 'FATAL']:
+                res.add(int(parts[0][len('worker'):]))
+        return res
+
+    def plan(self, running: Set[int], busy: Set[int], pending: int,
+             memory: float):
+        """
+        :param running: workers which are not stopped
+        :param busy: workers which have a task
+        :param pending: tasks queued on the computer, not taken by a worker
+        :param memory: used memory, percent
+        :return: workers to start, workers to stop
+        """
+        desired = min(max(len(busy) + pending, self.min_workers),
+                      self.workers)
+
+        start = sorted(busy - running)
+        if memory < self.max_memory:
+            free = [
+                i for i in range(self.workers)
+                if i not in running and i not in busy
+            ]
+            count = desired - len(running) - len(start)
+            start.extend(free[:max(count, 0)])
+
+        t = time.time()
+        for i in running | busy:
+            if i in busy:
+                self.idle_since.pop(i, None)
+            else:
+                self.idle_since.setdefault(i, t)
+
+        stop = []
+        count = len(running) - desired
+        for i in sorted(running - busy, reverse=True):
+            if count <= 0:
+                break
+            if t - self.idle_since[i] >= self.idle_timeout:
+                stop.append(i)
+                count -= 1
+
+        for i in stop:
+            self.idle_since.pop(i)
+        return start, stop
+
+    def scale(self):
+        hostname = socket.gethostname()
+        try:
+            self.session.commit()
+            tasks = TaskProvider(self.session).by_status(
+                TaskStatus.InProgress, TaskStatus.Queued,
+                task_docker_assigned=DOCKER_IMG, computer_assigned=hostname
+            )
+            # a task sent to the personal queue of a worker keeps its index
+            busy = {
+                int(t.worker_index) for t in tasks
+                if t.worker_index is not None and
+                0 <= int(t.worker_index) < self.workers
+            }
+            pending = sum(
+                t.status == TaskStatus.Queued.value and t.worker_index is None
+                for t in tasks
+            )
+
+            start, stop = self.plan(
+                self.running(), busy, pending,
+                psutil.virtual_memory().percent
+            )
+            for i in start:
+                self._ctl('start', f'worker{i}')
+            for i in stop:
+                self._ctl('stop', f'worker{i}')
+
+            if start or stop:
+                self.logger.info(
+                    f'workers started: {start}, stopped: {stop}. '
+                    f'busy = {sorted(busy)}, pending = {pending}',
+                    ComponentType.WorkerSupervisor, hostname
+                )
+        except Exception as e:
+            if Session.sqlalchemy_error(e):
+                Session.cleanup('WorkerScaler')
+                self.session = Session.create_session(key='WorkerScaler')
+                self.logger = create_logger(self.session, 'WorkerScaler')
+
+            self.logger.error(
+                traceback.format_exc(), ComponentType.WorkerSupervisor,
+                hostname
+            )
+
+
+__all__ = ['supervisord_workers', 'WorkerScaler', 'SUPERVISORD_CONF']
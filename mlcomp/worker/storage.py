@@ -1,6 +1,11 @@
+import ast
+from collections import defaultdict
 from glob import glob
+import json
 import os
-from os.path import isdir, join
+import time
+import traceback
+from os.path import join
 import hashlib
 from typing import List, Tuple
 import pkgutil
@@ -10,20 +15,34 @@ import pkg_resources
 import pyclbr
 import importlib
 
+from sqlalchemy import or_, func
 from sqlalchemy.orm import joinedload
 
-from mlcomp import TASK_FOLDER, DATA_FOLDER, MODEL_FOLDER, INSTALL_DEPENDENCIES
+from mlcomp import TASK_FOLDER, DATA_FOLDER, MODEL_FOLDER, \
+    INSTALL_DEPENDENCIES, BLOB_STORE, CODE_CACHE_SIZE, MANIFEST_FOLDER, \
+    FILE_CODEC, UPLOAD_MAX_FILE_SIZE, UPLOAD_MAX_SIZE
 from mlcomp.db.core import Session
 from mlcomp.db.enums import ComponentType
-from mlcomp.db.models import DagStorage, Dag, DagLibrary, File, Task
+from mlcomp.db.models import DagStorage, Dag, DagLibrary, File, Task, \
+    CodeSnapshot, FileChunk
 from mlcomp.utils.misc import now, to_snake
 from mlcomp.db.providers import FileProvider, \
     DagStorageProvider, \
     TaskProvider, \
     DagLibraryProvider, DagProvider
+from mlcomp.db.providers.file import blob_key
 
 from mlcomp.utils.config import Config
-from mlcomp.utils.req import control_requirements, read_lines
+from mlcomp.utils.codec import compress, decompress, CHUNKED
+from mlcomp.utils.io import yaml_dump, yaml_load, zip_stream
+from mlcomp.utils.req import control_requirements, read_lines, \
+    import_names, parse_executor
+from mlcomp.worker.blob import FolderBlobStore, LocalCache
+from mlcomp.worker.env import EnvCache
+from mlcomp.worker.executors import Executor
+
+# executor indexes of folders which do not change, e.g. mlcomp executors
+_folder_indexes = dict()
 
 
 def get_super_names(cls: pyclbr.Class):
@@ -43,10 +62,129 @@ def get_super_names(cls: pyclbr.Class):
     return res
 
 
+def analyze_python(path: str, content: bytes):
+    """
+    Top-level classes and import names of a python file
+    :return: classes, import names (None if the file can not be parsed,
+    find_imports parses it again and reports the error)
+    """
+    if not path.endswith('.py'):
+        return [], []
+
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError):
+        return [], None
+
+    classes = [
+        node.name for node in tree.body if isinstance(node, ast.ClassDef)
+    ]
+    return classes, import_names(tree)
+
+
+def class_names(path: str, content: bytes):
+    """
+    Top-level classes of a python file
+    """
+    return analyze_python(path, content)[0]
+
+
+def index_classes(index: dict, path: str, names: List[str]):
+    """
+    Adds the classes of a python file to the executor index.
+
+    The index maps a class name (also lowercased and snake-cased)
+    to [module name, class name]. Modules closer to the root win
+    """
+    module = os.path.splitext(path)[0].replace(os.sep, '.')
+    if module.endswith('.__init__'):
+        module = module[:-len('.__init__')]
+
+    for name in names:
+        for key in {name, name.lower(), to_snake(name)}:
+            current = index.get(key)
+            if current is None or \
+                    current[0].count('.') > module.count('.'):
+                index[key] = [module, name]
+
+
+def hash_file(path: str, chunk_size: int = 2 ** 20):
+    """
+    Streaming md5 of a file. The classes and imports are parsed
+    for python files
+    :return: md5, class names, import names
+    """
+    if path.endswith('.py'):
+        with open(path, 'rb') as f:
+            content = f.read()
+        return (hashlib.md5(content).hexdigest(),
+                *analyze_python(path, content))
+
+    md5 = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            md5.update(chunk)
+    return md5.hexdigest(), [], []
+
+
+class UploadManifest:
+    """
+    Local manifest of an uploaded folder:
+    path -> [size, mtime, md5, classes, imports].
+    Files with the same size and mtime are not reread on the next upload
+    """
+
+    def __init__(self, folder: str):
+        key = hashlib.md5(os.path.abspath(folder).encode()).hexdigest()
+        self.file = join(MANIFEST_FOLDER, f'{key}.json')
+        self.items = dict()
+        self.changed = False
+
+    def load(self):
+        try:
+            with open(self.file) as f:
+                self.items = json.load(f)
+        except (OSError, ValueError):
+            self.items = dict()
+        return self
+
+    def get(self, path: str, stat: os.stat_result):
+        item = self.items.get(path)
+        if item and len(item) == 5 and item[0] == stat.st_size \
+                and item[1] == stat.st_mtime_ns:
+            return tuple(item[2:])
+        return None
+
+    def set(self, path: str, stat: os.stat_result, md5: str,
+            classes: List[str], imports: List[str]):
+        self.items[path] = [
+            stat.st_size, stat.st_mtime_ns, md5, classes, imports
+        ]
+        self.changed = True
+
+    def save(self, paths: set):
+        removed = set(self.items) - paths
+        if not self.changed and not removed:
+            return
+        for path in removed:
+            del self.items[path]
+
+        os.makedirs(MANIFEST_FOLDER, exist_ok=True)
+        tmp = f'{self.file}.tmp{os.getpid()}'
+        with open(tmp, 'w') as f:
+            json.dump(self.items, f)
+        os.replace(tmp, self.file)
+
+
 class Storage:
+    # files larger than that are stored by chunks
+    chunk_size = 2 ** 20
+
     def __init__(self, session: Session, logger=None,
                  component: ComponentType = None,
-                 max_file_size: int = 10 ** 5, max_count=10 ** 3):
+                 max_file_size: int = UPLOAD_MAX_FILE_SIZE * 2 ** 20,
+                 max_size: int = UPLOAD_MAX_SIZE * 2 ** 20,
+                 max_count: int = None):
         self.file_provider = FileProvider(session)
         self.provider = DagStorageProvider(session)
         self.task_provider = TaskProvider(session)
@@ -56,35 +194,191 @@ class Storage:
         self.logger = logger
         self.component = component
         self.max_file_size = max_file_size
+        self.max_size = max_size
         self.max_count = max_count
 
+        # files with empty content are always read from the blob store.
+        # New contents go there only if BLOB_STORE = FOLDER
+        self.blobs = FolderBlobStore()
+        self.use_blobs = BLOB_STORE == 'FOLDER'
+        self.codec = FILE_CODEC
+        self.cache = LocalCache() if CODE_CACHE_SIZE > 0 else None
+        self.env_cache = EnvCache()
+
     def log_info(self, message: str):
         if self.logger:
             self.logger.info(message, self.component)
 
-    def copy_from(self, src: int, dag: Dag):
-        storages = self.provider.query(DagStorage). \
-            filter(DagStorage.dag == src). \
-            all()
-        libraries = self.library_provider.query(DagLibrary). \
-            filter(DagLibrary.dag == src). \
-            all()
-
-        s_news = []
-        for s in storages:
-            s_new = DagStorage(
-                dag=dag.id, file=s.file, path=s.path, is_dir=s.is_dir
-            )
-            s_news.append(s_new)
-        l_news = []
-        for l in libraries:
-            l_new = DagLibrary(
-                dag=dag.id, library=l.library, version=l.version
+    def log_warning(self, message: str):
+        if self.logger:
+            self.logger.warning(message, self.component)
+
+    def create_file(self, content: bytes, md5: str, project: int, dag: int):
+        file = File(md5=md5, project=project, dag=dag, created=now(),
+                    size=sys.getsizeof(content))
+        self.set_content(file, content, md5)
+        return file
+
+    def set_content(self, file: File, content: bytes, md5: str,
+                    use_blobs: bool = None):
+        file.md5 = md5
+        file.size = sys.getsizeof(content)
+        file.codec, data = compress(content, self.codec)
+        file.codec_checked = self.codec or 'none'
+        file.physical_size = sys.getsizeof(data)
+        if use_blobs is None:
+            use_blobs = self.use_blobs
+        if use_blobs:
+            self.blobs.write(data, blob_key(md5, file.codec))
+            file.content = None
+        else:
+            file.content = data
+
+    def _decompress(self, md5: str, content: bytes, codec: str):
+        if content is None:
+            content = self.blobs.read(blob_key(md5, codec))
+        return decompress(content, codec)
+
+    def iter_content(self, id: int, md5: str, content: bytes, codec: str,
+                     size: int = None):
+        """
+        Yields the content of a file, chunk by chunk for the large files
+        :param size: size of the file, checked for the chunked ones
+        """
+        if codec != CHUNKED:
+            yield self._decompress(md5, content, codec)
+            return
+
+        chunks = self.file_provider.chunks(id)
+        if len(chunks) == 0:
+            raise Exception(f'File {id} has no chunks')
+
+        if size is None:
+            size = self.file_provider.by_id(id).size
+        # File.size is sys.getsizeof of the content
+        size -= sys.getsizeof(b'')
+
+        total = 0
+        for chunk in chunks:
+            _, md5, content, codec = self.file_provider.contents([chunk])[0]
+            data = self._decompress(md5, content, codec)
+            total += len(data)
+            if total > size:
+                break
+            yield data
+
+        if total != size:
+            raise Exception(
+                f'File {id} is broken: {total} bytes read '
+                f'from {len(chunks)} chunks, expected {size} bytes'
             )
-            l_news.append(l_new)
 
-        self.provider.add_all(s_news)
-        self.library_provider.add_all(l_news)
+    def file_content(self, file: File):
+        return b''.join(
+            self.iter_content(file.id, file.md5, file.content, file.codec,
+                              file.size)
+        )
+
+    def copy_content(self, file: File, dst):
+        for chunk in self.iter_content(file.id, file.md5, file.content,
+                                       file.codec, file.size):
+            dst.write(chunk)
+
+    def migrate_blobs(self, batch_size: int = 100):
+        """
+        Moves the contents of the files from the DB to the blob store
+        :return: count of the moved files
+        """
+        count = 0
+        while True:
+            files = self.file_provider.query(File). \
+                filter(File.content.isnot(None)). \
+                limit(batch_size). \
+                all()
+            if len(files) == 0:
+                break
+
+            for file in files:
+                self.blobs.write(file.content, blob_key(file.md5, file.codec))
+                file.content = None
+
+            self.file_provider.commit()
+            count += len(files)
+            self.log_info(f'migrate_blobs. {count} files moved')
+
+        return count
+
+    def recompress(self, batch_size: int = 100):
+        """
+        Rewrites the contents of the files with the current codec.
+        The physical size of the dags is corrected
+        :return: count of the rewritten files
+        """
+        count = 0
+        last_id = 0
+        while True:
+            # the raw contents which have not shrunk are not checked again
+            checked = func.coalesce(File.codec_checked, File.codec, 'none')
+            query = self.file_provider.query(File). \
+                filter(File.id > last_id). \
+                filter(checked != (self.codec or 'none')). \
+                filter(or_(File.codec.is_(None), File.codec != CHUNKED))
+            files = query.order_by(File.id).limit(batch_size).all()
+            if len(files) == 0:
+                break
+
+            deltas = defaultdict(int)
+            for file in files:
+                physical_size = file.physical_size or file.size
+                self.set_content(file, self.file_content(file), file.md5,
+                                 use_blobs=file.content is None)
+                deltas[file.dag] += file.physical_size - physical_size
+
+            for dag, delta in deltas.items():
+                self.dag_provider.query(Dag). \
+                    filter(Dag.id == dag). \
+                    update({'file_physical_size':
+                            Dag.file_physical_size + delta},
+                           synchronize_session=False)
+
+            self.file_provider.commit()
+            last_id = files[-1].id
+            count += len(files)
+            self.log_info(f'recompress. {count} files rewritten')
+
+        return count
+
+    def collect_garbage(self, min_age: int = 3600):
+        """
+        Removes the blobs which are not referenced by any file.
+        The blobs younger than min_age seconds are kept,
+        they may belong to an upload in progress
+        :return: count of the removed blobs
+        """
+        referenced = self.file_provider.blob_keys()
+        count = 0
+        for key in list(self.blobs.hashes()):
+            if key in referenced:
+                continue
+
+            path = self.blobs.path(key)
+            if time.time() - os.path.getmtime(path) < min_age:
+                continue
+
+            self.blobs.remove(key)
+            count += 1
+
+        self.log_info(f'collect_garbage. {count} blobs removed')
+        return count
+
+    def copy_from(self, src: int, dag: Dag):
+        src = self.dag_provider.by_id(src)
+        dag.snapshot = self.provider.freeze(src)
+        self.provider.copy(src.id, dag.id, commit=False)
+        self.library_provider.copy(src.id, dag.id, commit=False)
+
+        dag.executor_index = src.executor_index
+        self.dag_provider.update()
 
     def _build_spec(self, folder: str):
         ignore_file = os.path.join(folder, '.ignore')
@@ -99,69 +393,132 @@ class Storage:
             pathspec.patterns.GitWildMatchPattern, ignore_patterns
         )
 
+    def _walk(self, folder: str, spec, base: str = ''):
+        """
+        Yields path, is_dir, stat of the entries which are not ignored
+        """
+        with os.scandir(join(folder, base)) as it:
+            entries = sorted(it, key=lambda e: e.name)
+
+        for entry in entries:
+            path = join(base, entry.name)
+            if entry.is_dir():
+                if spec.match_file(path) or spec.match_file(path + '/'):
+                    continue
+                yield path, True, None
+                yield from self._walk(folder, spec, path)
+            elif not spec.match_file(path):
+                yield path, False, entry.stat()
+
     def upload(self, folder: str, dag: Dag, control_reqs: bool = True):
         self.log_info('upload started')
-        hashs = self.file_provider.hashs(dag.project)
-        self.log_info('hashes are retrieved')
 
-        all_files = []
         spec = self._build_spec(folder)
+        entries = list(self._walk(folder, spec))
 
-        files = glob(os.path.join(folder, '**'))
-        for file in files[:]:
-            path = os.path.relpath(file, folder)
-            if spec.match_file(path) or path == '.':
-                continue
-            if os.path.isdir(file):
-                child_files = glob(os.path.join(folder, file, '**'),
-                                   recursive=True)
-                files.extend(child_files)
-
-        if self.max_count and len(files) > self.max_count:
-            raise Exception(f'files count = {len(files)} '
+        if self.max_count and len(entries) > self.max_count:
+            raise Exception(f'files count = {len(entries)} '
                             f'But max count = {self.max_count}')
 
         self.log_info('list of files formed')
 
+        total_size = 0
+        for path, is_dir, stat in entries:
+            if is_dir:
+                continue
+            if self.max_file_size and stat.st_size > self.max_file_size:
+                raise Exception(
+                    f'file = {join(folder, path)} has size {stat.st_size}.'
+                    f' But max size is set to {self.max_file_size}')
+            total_size += stat.st_size
+
+        if self.max_size and total_size > self.max_size:
+            raise Exception(f'files size = {total_size}. '
+                            f'But max size is set to {self.max_size}')
+
+        manifest = UploadManifest(folder).load()
+        hashes = dict()
+        to_hash = []
+        for path, is_dir, stat in entries:
+            if is_dir:
+                continue
+            item = manifest.get(path, stat)
+            if item:
+                hashes[path] = item
+            else:
+                to_hash.append((path, stat))
+
+        py_count = sum(path.endswith('.py') for path, _ in to_hash)
+        with parse_executor(py_count) as executor:
+            results = executor.map(
+                hash_file, [join(folder, path) for path, _ in to_hash]
+            )
+            for (path, stat), item in zip(to_hash, results):
+                hashes[path] = item
+                manifest.set(path, stat, *item)
+
+        self.log_info(f'hashes are computed. {len(to_hash)} files reread')
+
+        for path, item in hashes.items():
+            if item[2] is None:
+                self.log_warning(f'{path} can not be parsed, '
+                                 f'its classes are not indexed')
+
+        existing = self.file_provider.existing(
+            dag.project, list({item[0] for item in hashes.values()})
+        )
+
+        self.log_info('hashes are retrieved')
+
+        # the snapshot is committed with the dag referring to it,
+        # DagProvider.remove_all never sees it unused
+        snapshot = CodeSnapshot(project=dag.project, created=now())
+        self.provider.add(snapshot, commit=False)
+        self.provider.session.flush()
+        dag.snapshot = snapshot.id
+        self.dag_provider.commit()
+
         folders_to_add = []
         files_to_add = []
         files_storage_to_add = []
+        chunks_to_add = []
 
         total_size_added = 0
+        total_physical_size_added = 0
+        index = dict()
 
-        for o in files:
-            path = os.path.relpath(o, folder)
-            if spec.match_file(path) or path == '.':
-                continue
-
-            if isdir(o):
-                folder_to_add = DagStorage(dag=dag.id, path=path, is_dir=True)
+        for path, is_dir, stat in entries:
+            if is_dir:
+                folder_to_add = DagStorage(snapshot=snapshot.id, path=path,
+                                           is_dir=True)
                 folders_to_add.append(folder_to_add)
                 continue
-            content = open(o, 'rb').read()
-            size = sys.getsizeof(content)
-            if self.max_file_size and size > self.max_file_size:
-                raise Exception(
-                    f'file = {o} has size {size}.'
-                    f' But max size is set to {self.max_file_size}')
-            md5 = hashlib.md5(content).hexdigest()
 
-            all_files.append(o)
+            md5, classes, _ = hashes[path]
+            index_classes(index, path, classes)
 
-            if md5 not in hashs:
-                file = File(
-                    md5=md5,
-                    content=content,
-                    project=dag.project,
-                    dag=dag.id,
-                    created=now()
+            if md5 not in existing and stat.st_size > self.chunk_size:
+                file, chunks, physical_size = self.create_chunked(
+                    join(folder, path), md5, dag, existing
                 )
-                hashs[md5] = file
+                existing[md5] = file
                 files_to_add.append(file)
-                total_size_added += size
+                chunks_to_add.extend(chunks)
+                total_size_added += file.size
+                total_physical_size_added += physical_size
+            elif md5 not in existing:
+                with open(join(folder, path), 'rb') as f:
+                    content = f.read()
+                file = self.create_file(
+                    content, md5, project=dag.project, dag=dag.id
+                )
+                existing[md5] = file
+                files_to_add.append(file)
+                total_size_added += file.size
+                total_physical_size_added += file.physical_size
 
             file_storage = DagStorage(
-                dag=dag.id, path=path, file=hashs[md5],
+                snapshot=snapshot.id, path=path, file=existing[md5],
                 is_dir=False)
             files_storage_to_add.append(file_storage)
 
@@ -176,6 +533,15 @@ class Storage:
             self.file_provider.bulk_save_objects(files_to_add,
                                                  return_defaults=True)
 
+        if len(chunks_to_add) > 0:
+            for chunk in chunks_to_add:
+                for key in ['file', 'chunk']:
+                    value = getattr(chunk, key)
+                    if isinstance(value, File):
+                        setattr(chunk, key, value.id)
+
+            self.file_provider.bulk_save_objects(chunks_to_add)
+
         self.log_info('inserting DagStorage Files')
 
         if len(files_storage_to_add) > 0:
@@ -187,28 +553,185 @@ class Storage:
             self.provider.bulk_save_objects(files_storage_to_add)
 
         dag.file_size += total_size_added
+        dag.file_physical_size += total_physical_size_added
+        dag.executor_index = yaml_dump(index)
 
         self.dag_provider.update()
 
+        manifest.save(set(hashes))
+
         if INSTALL_DEPENDENCIES and control_reqs:
-            reqs = control_requirements(folder, files=all_files)
+            all_files = [
+                join(folder, path) for path, is_dir, _ in entries
+                if not is_dir
+            ]
+            imports = {
+                join(folder, path): item[2] for path, item in hashes.items()
+                if item[2] is not None
+            }
+            reqs = control_requirements(
+                folder, files=all_files, imports=imports
+            )
             for name, rel, version in reqs:
                 self.library_provider.add(
                     DagLibrary(dag=dag.id, library=name, version=version)
                 )
 
+    def create_chunked(self, path: str, md5: str, dag: Dag, existing: dict,
+                       batch_size: int = 16):
+        """
+        Creates a file stored by chunks. New chunks are inserted at once,
+        so only batch_size chunks are kept in memory
+        :param existing: md5 -> file (or its id) of the project.
+        New chunks are added there
+        :return: file, its FileChunk items, physical size of the new chunks
+        """
+        def read():
+            with open(path, 'rb') as f:
+                yield from iter(lambda: f.read(self.chunk_size), b'')
+
+        hashes = [hashlib.md5(chunk).hexdigest() for chunk in read()]
+        missing = {h for h in hashes if h not in existing}
+        existing.update(self.file_provider.existing(dag.project,
+                                                    list(missing)))
+
+        physical_size = 0
+        batch = []
+        for i, chunk in enumerate(read()):
+            if hashes[i] in existing:
+                continue
+            file = self.create_file(chunk, hashes[i], project=dag.project,
+                                    dag=dag.id)
+            existing[hashes[i]] = file
+            batch.append(file)
+            physical_size += file.physical_size
+
+            if len(batch) >= batch_size:
+                self.file_provider.bulk_save_objects(batch,
+                                                     return_defaults=True)
+                batch = []
+
+        if len(batch) > 0:
+            self.file_provider.bulk_save_objects(batch, return_defaults=True)
+
+        file = File(md5=md5, project=dag.project, dag=dag.id, created=now(),
+                    size=os.path.getsize(path) + sys.getsizeof(b''),
+                    codec=CHUNKED, physical_size=0)
+        chunks = [
+            FileChunk(file=file, index=i, chunk=existing[h])
+            for i, h in enumerate(hashes)
+        ]
+        return file, chunks, physical_size
+
     def download_dag(self, dag: int, folder: str):
         os.makedirs(folder, exist_ok=True)
 
-        items = self.provider.by_dag(dag)
+        if self.cache is None:
+            items = self.provider.by_dag(dag)
+            items = sorted(items, key=lambda x: x[1] is not None)
+            for item, file in items:
+                path = os.path.join(folder, item.path)
+                if item.is_dir:
+                    os.makedirs(path, exist_ok=True)
+                else:
+                    with open(path, 'wb') as f:
+                        self.copy_content(file, f)
+            return
+
+        items = self.provider.hashes_by_dag(dag)
         items = sorted(items, key=lambda x: x[1] is not None)
-        for item, file in items:
+
+        missing = {
+            file: md5
+            for item, file, md5 in items
+            if not item.is_dir and not self.cache.exists(md5)
+        }
+        self.fill_cache(list(missing))
+
+        for item, file, md5 in items:
             path = os.path.join(folder, item.path)
             if item.is_dir:
                 os.makedirs(path, exist_ok=True)
-            else:
-                with open(path, 'wb') as f:
-                    f.write(file.content)
+                continue
+
+            try:
+                self.cache.copy(md5, path)
+            except FileNotFoundError:
+                # evicted by a concurrent download
+                self.fill_cache([file])
+                self.cache.copy(md5, path)
+
+        self.cache.trim(CODE_CACHE_SIZE * 2 ** 20)
+
+    def fill_cache(self, files: List[int], batch_size: int = 500):
+        """
+        Puts the contents of the files into the local cache
+        """
+        for i in range(0, len(files), batch_size):
+            batch = files[i:i + batch_size]
+            for id, md5, content, codec in self.file_provider.contents(batch):
+                self.cache.write_chunks(
+                    self.iter_content(id, md5, content, codec)
+                )
+
+    def zip_dag(self, dag: int, cache_folder: str = None,
+                cache_time: int = 600, batch_size: int = 100):
+        """
+        Zip archive of the dag files, produced chunk by chunk.
+
+        If cache_folder is set, the archive is kept there for cache_time
+        seconds under the hash of the dag files
+        """
+        items = [
+            (item.path, file, md5)
+            for item, file, md5 in self.provider.hashes_by_dag(dag)
+            if not item.is_dir
+        ]
+
+        def entries():
+            for i in range(0, len(items), batch_size):
+                batch = items[i:i + batch_size]
+                contents = {
+                    id: (md5, content, codec)
+                    for id, md5, content, codec in
+                    self.file_provider.contents([f for _, f, _ in batch])
+                }
+                for path, file, md5 in batch:
+                    yield path, self.iter_content(file, *contents[file])
+
+        if not cache_folder:
+            return zip_stream(entries())
+
+        os.makedirs(cache_folder, exist_ok=True)
+        for name in os.listdir(cache_folder):
+            path = join(cache_folder, name)
+            try:
+                if time.time() - os.path.getmtime(path) > cache_time:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+
+        key = hashlib.md5(
+            ''.join(f'{path}:{md5}\n' for path, _, md5 in items).encode()
+        ).hexdigest()
+        path = join(cache_folder, f'{key}.zip')
+        if os.path.exists(path):
+            return self._read_chunks(path)
+        return self._cache_chunks(zip_stream(entries()), path)
+
+    @staticmethod
+    def _read_chunks(path: str, chunk_size: int = 2 ** 20):
+        with open(path, 'rb') as f:
+            yield from iter(lambda: f.read(chunk_size), b'')
+
+    @staticmethod
+    def _cache_chunks(chunks, path: str):
+        tmp = f'{path}.tmp{os.getpid()}_{id(chunks)}'
+        with open(tmp, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                yield chunk
+        os.replace(tmp, path)
 
     def download(self, task: int):
         task = self.task_provider.by_id(
@@ -246,37 +769,113 @@ class Storage:
         sys.path.insert(0, folder)
         return folder
 
+    def folder_index(self, folder: str, base_folder: str):
+        """
+        Builds the executor index of a folder which does not change
+        while the process lives. Built once per process
+        """
+        key = (folder, base_folder)
+        if key not in _folder_indexes:
+            index = dict()
+            for file in glob(join(folder, '**', '*.py'), recursive=True):
+                path = os.path.relpath(file, base_folder)
+                with open(file, 'rb') as f:
+                    index_classes(index, path, class_names(path, f.read()))
+            _folder_indexes[key] = index
+        return _folder_indexes[key]
+
+    def update_executor_index(self, dag: int, path: str, content: bytes):
+        """
+        Replaces the classes of an edited python file
+        in the executor index of the dag
+        """
+        if not path.endswith('.py'):
+            return
+
+        dag = self.dag_provider.by_id(dag)
+        index = yaml_load(dag.executor_index) if dag.executor_index else {}
+        module = os.path.splitext(path)[0].replace(os.sep, '.')
+        if module.endswith('.__init__'):
+            module = module[:-len('.__init__')]
+
+        index = {k: v for k, v in index.items() if v[0] != module}
+        index_classes(index, path, class_names(path, content))
+        dag.executor_index = yaml_dump(index)
+
+    def install_libraries(self, libraries: List[Tuple]):
+        """
+        Activates the cached environment of the libraries
+        which versions differ from the installed ones
+        :return: path of the environment, modules of it which have already
+        been imported. None if there is nothing to install
+        """
+        missing = []
+        for name, version in sorted(set(libraries)):
+            try:
+                if pkg_resources.get_distribution(name).version == version:
+                    continue
+            except Exception:
+                pass
+            missing.append((name, version))
+
+        if not INSTALL_DEPENDENCIES or not missing:
+            return
+
+        try:
+            path = self.env_cache.build(missing)
+        except Exception:
+            self.log_warning(f'install_libraries. {missing} are not '
+                             f'installed:\n{traceback.format_exc()}')
+            return
+
+        imported = self.env_cache.activate(path)
+        if imported:
+            self.log_warning(f'install_libraries. {imported} have already '
+                             f'been imported, their versions are not changed')
+        return path, imported
+
     def import_executor(
             self,
             folder: str,
             base_folder: str,
             executor: str,
-            libraries: List[Tuple] = None
+            libraries: List[Tuple] = None,
+            index: dict = None,
+            scan: bool = True
     ):
+        """
+        Imports the module of the executor.
+
+        If the executor index is passed, the module is resolved directly.
+        Otherwise, or if the index is stale, the modules of the folder
+        are scanned with pyclbr
+        :param scan: scan the folder when the executor is not in the index
+        """
+        if libraries:
+            self.install_libraries(libraries)
 
         sys.path.insert(0, base_folder)
 
         spec = self._build_spec(folder)
-        was_installation = False
 
         folders = [
             p for p in glob(f'{folder}/*', recursive=True)
             if os.path.isdir(p) and not spec.match_file(p)
         ]
         folders += [folder]
-        library_names = set(n for n, v in (libraries or []))
-        library_versions = {n: v for n, v in (libraries or [])}
 
-        for n in library_names:
+        if index is not None and executor in index:
+            module_name, class_name = index[executor]
             try:
-                version = pkg_resources.get_distribution(n).version
-                need_install = library_versions[n] != version
-            except Exception:
-                need_install = True
+                module = importlib.import_module(module_name)
+                cls = getattr(module, class_name, None)
+                if isinstance(cls, type) and issubclass(cls, Executor):
+                    return True
+            except ImportError:
+                pass
 
-            if INSTALL_DEPENDENCIES and need_install:
-                os.system(f'pip install {n}=={library_versions[n]}')
-                was_installation = True
+        if index is not None and not scan:
+            return False
 
         def is_valid_class(cls: pyclbr.Class):
             return cls.name == executor or \
@@ -301,9 +900,9 @@ class Storage:
             for k, v in classes.items():
                 if is_valid_class(v):
                     importlib.import_module(relative_name(module.path))
-                    return True, was_installation
+                    return True
 
-        return False, was_installation
+        return False
 
 
 __all__ = ['Storage']
@@ -1,56 +1,256 @@
+import datetime
+import hashlib
+import json
 import os
+import re
 import socket
+import threading
 import time
 import traceback
 import subprocess
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import partial
 from os.path import join
-from typing import List
+from typing import List, Callable
 
-from mlcomp import FILE_SYNC_INTERVAL
+from mlcomp import FILE_SYNC_INTERVAL, SYNC_MAX_TRANSFERS, SYNC_BANDWIDTH, \
+    SYNC_LINK_BANDWIDTH, SYNC_FANOUT
 from mlcomp.db.core import Session
 from mlcomp.db.enums import ComponentType
-from mlcomp.db.models import Computer, TaskSynced
+from mlcomp.db.models import Computer, TaskSynced, Project
 from mlcomp.db.providers import ComputerProvider, \
-    TaskSyncedProvider, DockerProvider, ProjectProvider
+    TaskSyncedProvider, DockerProvider, ProjectProvider, \
+    SyncManifestProvider, TaskProvider
 from mlcomp.utils.logging import create_logger
 from mlcomp.utils.misc import now
 from mlcomp.utils.io import yaml_load, yaml_dump
 
 
+def excluded_parts(folder: str, excluded: List[str]):
+    """
+    Excluded paths relative to the folder
+    :return: None if the whole folder is excluded
+    """
+    parts = []
+    for e in excluded:
+        if e == folder:
+            return None
+        if not e.startswith(folder):
+            continue
+        parts.append(os.path.relpath(e, folder))
+    return parts
+
+
+def _is_excluded(rel: str, name: str, excluded: List[str]):
+    # rsync matches a pattern without a slash against any name
+    for e in excluded:
+        if rel == e or rel.startswith(e + '/') or \
+                ('/' not in e and name == e):
+            return True
+    return False
+
+
+def _hash_tree(folder: str, rel: str, excluded: List[str], md5):
+    try:
+        entries = sorted(os.scandir(folder), key=lambda x: x.name)
+    except OSError:
+        return
+
+    for entry in entries:
+        entry_rel = f'{rel}/{entry.name}'
+        if _is_excluded(entry_rel, entry.name, excluded):
+            continue
+        if entry.is_dir(follow_symlinks=False):
+            md5.update(f'{entry_rel}/\n'.encode())
+            _hash_tree(entry.path, entry_rel, excluded, md5)
+        elif entry.is_file(follow_symlinks=False):
+            md5.update(f'{entry_rel}\t{entry.stat().st_size}\n'.encode())
+
+
+def folder_manifest(path: str, excluded: List[str]):
+    """
+    Snapshot of a folder by the paths and the sizes of its files,
+    which is what rsync --size-only compares.
+    Files are not read, so it is cheap compared to an rsync run
+    :param excluded: excluded paths relative to the folder
+    :return: hash, excluded, children (top-level entry -> hash)
+    """
+    excluded = sorted(excluded)
+    children = dict()
+    try:
+        entries = list(os.scandir(path))
+    except OSError:
+        entries = []
+
+    for entry in entries:
+        if _is_excluded(entry.name, entry.name, excluded):
+            continue
+        md5 = hashlib.md5()
+        if entry.is_dir(follow_symlinks=False):
+            _hash_tree(entry.path, entry.name, excluded, md5)
+        elif entry.is_file(follow_symlinks=False):
+            md5.update(f'{entry.stat().st_size}'.encode())
+        else:
+            continue
+        children[entry.name] = md5.hexdigest()
+
+    root = json.dumps([excluded, sorted(children.items())])
+    return {
+        'hash': hashlib.md5(root.encode()).hexdigest(),
+        'excluded': excluded,
+        'children': children
+    }
+
+
+def _folder_state(
+        provider: SyncManifestProvider,
+        computer: Computer,
+        folder: str,
+        excluded: List[str],
+        min_time: datetime.datetime = None
+):
+    """
+    Manifest of the folder on the computer.
+    It is computed (and published) for this computer.
+    For another one, the published manifest is used if it is fresh
+    """
+    if computer.name == socket.gethostname():
+        manifest = folder_manifest(join(computer.root_folder, folder),
+                                   excluded)
+        provider.save(computer.name, folder, manifest)
+        return manifest
+
+    if min_time is None:
+        return None
+    manifest = provider.get(computer.name, folder)
+    if manifest is None or manifest['updated'] < min_time:
+        return None
+    return manifest
+
+
+def changed_entries(source: dict, target: dict):
+    """
+    Top-level entries of the source folder which differ on the target.
+    :return: None if the manifests can not be compared
+    """
+    if source['excluded'] != target['excluded']:
+        return None
+    return sorted(
+        name for name, md5 in source['children'].items()
+        if target['children'].get(name) != md5
+    )
+
+
+_progress_re = re.compile(r'^\s*([\d,.]+)([KMGTP]?)\s+(\d+)%')
+_units = {'': 1, 'K': 10 ** 3, 'M': 10 ** 6, 'G': 10 ** 9, 'T': 10 ** 12,
+          'P': 10 ** 15}
+
+
+def _run_rsync(command: str, input: str = None, progress: Callable = None):
+    """
+    :param progress: callback(bytes, percent),
+    parsed from the rsync --info=progress2 output
+    """
+    if progress is None:
+        try:
+            subprocess.check_output(
+                command, shell=True,
+                stderr=subprocess.STDOUT,
+                universal_newlines=True,
+                input=input
+            )
+        except subprocess.CalledProcessError as exc:
+            raise Exception(exc.output)
+        return
+
+    process = subprocess.Popen(
+        command, shell=True,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT
+    )
+    if input:
+        process.stdin.write(input.encode())
+    process.stdin.close()
+
+    output = deque(maxlen=100)
+    buffer = b''
+    for chunk in iter(lambda: process.stdout.read1(4096), b''):
+        *lines, buffer = re.split(rb'[\r\n]', buffer + chunk)
+        for line in lines:
+            line = line.decode(errors='replace')
+            match = _progress_re.match(line)
+            if match:
+                # rsync -h prints the sizes with the units of 1000
+                size = float(match.group(1).replace(',', ''))
+                progress(int(size * _units[match.group(2)]),
+                         int(match.group(3)))
+            elif line:
+                output.append(line)
+
+    if process.wait() != 0:
+        raise Exception('\n'.join(output))
+
+
 def sync_directed(
         session: Session,
         source: Computer,
         target: Computer,
-        folders: List
+        folders: List,
+        min_time: datetime.datetime = None,
+        bwlimit: int = None,
+        progress: Callable = None
 ):
+    """
+    Rsyncs the folders from the source to the target.
+
+    The manifests of the folders are compared first, unchanged folders
+    are skipped and only the changed top-level entries are transferred.
+    :param min_time: the manifests published before that are not trusted.
+    None means the published manifests are not used
+    :param bwlimit: rsync --bwlimit in KB/s
+    :param progress: callback(folder, bytes, percent) of the transfer
+    """
     current_computer = socket.gethostname()
     logger = create_logger(session, __name__)
+    provider = SyncManifestProvider(session)
     for folder, excluded in folders:
-        end = ' --perms  --chmod=777 --size-only'
-        if len(excluded) > 0:
-            parts = []
-            folder_excluded = False
-            for i in range(len(excluded)):
-                if excluded[i] == folder:
-                    folder_excluded = True
-                    break
-                if not excluded[i].startswith(folder):
-                    continue
-
-                part = os.path.relpath(excluded[i], folder)
-                part = f'--exclude {part}'
-                parts.append(part)
+        parts = excluded_parts(folder, excluded)
+        if parts is None:
+            continue
 
-            if folder_excluded:
+        end = ' --perms  --chmod=777 --size-only'
+        if bwlimit:
+            end += f' --bwlimit={bwlimit}'
+        if progress:
+            end += ' --info=progress2'
+        if len(parts) > 0:
+            end += ' ' + ' '.join(f'--exclude {part}' for part in parts)
+
+        source_manifest = _folder_state(provider, source, folder, parts,
+                                        min_time)
+        target_manifest = _folder_state(provider, target, folder, parts,
+                                        min_time)
+        entries = None
+        if source_manifest and target_manifest:
+            if source_manifest['hash'] == target_manifest['hash']:
                 continue
-
-            if len(parts) > 0:
-                end += ' ' + ' '.join(parts)
+            entries = changed_entries(source_manifest, target_manifest)
+            if entries is not None:
+                if len(entries) == 0:
+                    continue
+                end += ' --files-from=-'
 
         source_folder = join(source.root_folder, folder)
         target_folder = join(target.root_folder, folder)
 
-        if current_computer == source.name:
+        if source.ip == target.ip and source.port == target.port and \
+                source.root_folder != target.root_folder and \
+                current_computer in [source.name, target.name]:
+            # computers with different root folders on the same machine
+            command = f'rsync -vhru {source_folder}/ {target_folder}/ {end}'
+        elif current_computer == source.name:
             command = f'rsync -vhru -e ' \
                       f'"ssh -p {target.port} -o StrictHostKeyChecking=no" ' \
                       f'{source_folder}/ ' \
@@ -70,26 +270,34 @@ def sync_directed(
                       f'{source.user}@{source.ip} "{command}"'
 
         logger.info(command, ComponentType.WorkerSupervisor, current_computer)
-        try:
-            subprocess.check_output(command, shell=True,
-                                    stderr=subprocess.STDOUT,
-                                    universal_newlines=True)
-        except subprocess.CalledProcessError as exc:
-            raise Exception(exc.output)
+        _run_rsync(
+            command,
+            '\n'.join(entries) if entries else None,
+            partial(progress, folder) if progress else None
+        )
 
+        if current_computer == target.name:
+            provider.save(
+                target.name, folder,
+                folder_manifest(target_folder, parts)
+            )
 
-def copy_remote(
-        session: Session, computer_from: str, path_from: str, path_to: str
-):
-    provider = ComputerProvider(session)
-    src = provider.by_name(computer_from)
-    host = socket.gethostname()
-    if host != computer_from:
-        c = f'scp -P {src.port} {src.user}@{src.ip}:{path_from} {path_to}'
-    else:
-        f'cp {path_from} {path_to}'
-    subprocess.check_output(c, shell=True)
-    return os.path.exists(path_to)
+
+def project_folders(project: Project):
+    """
+    :return: [sync folder, ignore folders] pairs of the project
+    """
+    sync_folders = yaml_load(project.sync_folders)
+    ignore_folders = yaml_load(project.ignore_folders)
+
+    if not isinstance(sync_folders, list):
+        sync_folders = []
+    if not isinstance(ignore_folders, list):
+        ignore_folders = []
+
+    sync_folders = correct_folders(sync_folders, project.name)
+    ignore_folders = correct_folders(ignore_folders, project.name)
+    return [[s, ignore_folders] for s in sync_folders]
 
 
 def correct_folders(sync_folders: List[str], project_name: str):
@@ -103,9 +311,173 @@ def correct_folders(sync_folders: List[str], project_name: str):
     return sync_folders
 
 
+def serving_loads(computers: List[Computer]):
+    """
+    Number of the transfers served by each computer,
+    by the transfers published in the meta of the computers
+    """
+    res = defaultdict(int)
+    for c in computers:
+        sources = set()
+        if c.meta:
+            sources = {t['source'] for t in
+                       yaml_load(c.meta).get('sync', [])}
+        if c.syncing_computer:
+            sources.add(c.syncing_computer)
+        for source in sources:
+            res[source] += 1
+    return res
+
+
+def choose_source(
+        provider: SyncManifestProvider,
+        origin: Computer,
+        candidates: List[Computer],
+        folders: List,
+        min_time: datetime.datetime,
+        loads: dict,
+        fanout: int
+):
+    """
+    Picks the computer to pull the folders from: either the origin
+    (the computer which created the data) or a computer which already
+    has the same manifests. The least loaded one with less than fanout
+    transfers is taken, so the data spreads over a tree.
+    :param candidates: online computers which can serve
+    :return: computer, min_time of its manifests.
+    None if all the up-to-date computers are busy
+    """
+    hashes = dict()
+    for folder, excluded in folders:
+        if excluded_parts(folder, excluded) is None:
+            continue
+        manifest = provider.get(origin.name, folder)
+        if manifest is None or manifest['updated'] < min_time:
+            # the origin state is unknown
+            return origin, min_time
+        hashes[folder] = manifest['hash']
+
+    options = []
+    if origin.name in {c.name for c in candidates}:
+        options.append((origin, min_time))
+
+    for c in candidates:
+        if c.name == origin.name:
+            continue
+        manifests = [provider.get(c.name, folder) for folder in hashes]
+        if all(m and m['hash'] == hashes[folder]
+               for m, folder in zip(manifests, hashes)):
+            updated = [m['updated'] for m in manifests]
+            options.append((c, min(updated) if updated else min_time))
+
+    options = [o for o in options if loads.get(o[0].name, 0) < fanout]
+    if len(options) == 0:
+        return None
+
+    # the origin goes last among equally loaded
+    return min(
+        options,
+        key=lambda o: (loads.get(o[0].name, 0), o[0].name == origin.name,
+                       o[0].name)
+    )
+
+
+def bandwidth_limit(transfers: int):
+    """
+    rsync --bwlimit (KB/s) of a transfer when the transfers run
+    at the same time
+    :return: None if the bandwidth is unlimited
+    """
+    limits = []
+    if SYNC_LINK_BANDWIDTH > 0:
+        limits.append(SYNC_LINK_BANDWIDTH)
+    if SYNC_BANDWIDTH > 0:
+        limits.append(SYNC_BANDWIDTH / transfers)
+    if len(limits) == 0:
+        return None
+    return max(1, int(min(limits) * 1024))
+
+
+class SyncProgress:
+    """
+    Progress of the transfers by source computers.
+    It is updated by the transfer threads and read by the main one
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.transfers = dict()
+
+    def start(self, source: str):
+        """
+        Registers a pending transfer, so the load of the source is seen
+        by the other computers at once
+        """
+        with self.lock:
+            self.transfers[source] = {
+                'source': source,
+                'folder': None,
+                'started': time.time(),
+                'bytes': 0,
+                'percent': 0,
+                'speed': 0
+            }
+
+    def update(self, source: str, folder: str, size: int, percent: int):
+        with self.lock:
+            item = self.transfers.get(source)
+            if item is None or item['folder'] != folder:
+                item = {
+                    'source': source,
+                    'folder': folder,
+                    'started': time.time()
+                }
+                self.transfers[source] = item
+
+            elapsed = max(time.time() - item['started'], 1e-3)
+            item['bytes'] = size
+            item['percent'] = percent
+            item['speed'] = int(size / elapsed)
+
+    def finish(self, source: str):
+        with self.lock:
+            self.transfers.pop(source, None)
+
+    def items(self):
+        with self.lock:
+            return [
+                {k: v for k, v in item.items() if k != 'started'}
+                for item in self.transfers.values()
+            ]
+
+
 class FileSync:
     session = Session.create_session(key='FileSync')
     logger = create_logger(session, 'FileSync')
+    # the manifests of this computer are published once in that seconds
+    manifest_interval = 30
+    published = 0
+    # the progress of the transfers is written once in that seconds
+    report_interval = 5
+
+    def publish(self, computer: Computer):
+        """
+        Publishes the manifests of the sync folders of all the projects,
+        so the other computers skip the unchanged folders
+        """
+        if time.time() - self.published < self.manifest_interval:
+            return
+
+        provider = SyncManifestProvider(self.session)
+        for project in ProjectProvider(self.session).all():
+            for folder, excluded in project_folders(project):
+                parts = excluded_parts(folder, excluded)
+                path = join(computer.root_folder, folder)
+                if parts is None or not os.path.exists(path):
+                    continue
+                provider.save(computer.name, folder,
+                              folder_manifest(path, parts))
+        self.published = time.time()
 
     def process_error(self, e: Exception):
         if Session.sqlalchemy_error(e):
@@ -171,6 +543,93 @@ class FileSync:
         computer.meta = yaml_dump(meta)
         provider.update()
 
+    def sync_link(self, target: str, source: str, items: List,
+                  bwlimit: int, progress: SyncProgress):
+        """
+        Runs the transfers from a source computer one by one.
+        Works in a thread, so it has its own session
+        """
+        key = f'FileSync_{source}'
+        session = Session.create_session(key=key)
+        try:
+            provider = ComputerProvider(session)
+            task_synced_provider = TaskSyncedProvider(session)
+            source_computer = provider.by_name(source)
+            target_computer = provider.by_name(target)
+
+            for _, folders, tasks, min_time in items:
+                sync_directed(
+                    session, source_computer, target_computer, folders,
+                    min_time=min_time,
+                    bwlimit=bwlimit,
+                    progress=partial(progress.update, source)
+                )
+                for t in tasks:
+                    task_synced_provider.add(
+                        TaskSynced(computer=target, task=t)
+                    )
+        except Exception as e:
+            if Session.sqlalchemy_error(e):
+                Session.cleanup(key)
+                session = Session.create_session(key=key)
+
+            logger = create_logger(session, 'FileSync')
+            logger.error(
+                traceback.format_exc(), ComponentType.WorkerSupervisor,
+                socket.gethostname()
+            )
+        finally:
+            progress.finish(source)
+
+    def report(self, computer: Computer, provider: ComputerProvider,
+               progress: SyncProgress = None):
+        """
+        Writes the progress of the transfers to the computer meta
+        """
+        self.session.refresh(computer)
+        meta = yaml_load(computer.meta) if computer.meta else dict()
+        if progress is not None:
+            meta['sync'] = progress.items()
+        else:
+            meta.pop('sync', None)
+        computer.meta = yaml_dump(meta)
+        provider.update()
+
+    def transfer(self, computer: Computer, provider: ComputerProvider,
+                 links: dict):
+        """
+        Syncs with the source computers at the same time.
+        Projects with more queued tasks go first
+        :param links: source computer -> [(priority, folders, tasks,
+        min_time)]
+        """
+        for items in links.values():
+            items.sort(key=lambda x: -x[0])
+        sources = sorted(links, key=lambda x: -links[x][0][0])
+
+        computer.syncing_computer = sources[0]
+        provider.update()
+
+        workers = max(1, min(SYNC_MAX_TRANSFERS, len(sources)))
+        bwlimit = bandwidth_limit(workers)
+        progress = SyncProgress()
+        for source in sources:
+            progress.start(source)
+        self.report(computer, provider, progress)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(self.sync_link, computer.name, source,
+                                links[source], bwlimit, progress)
+                for source in sources
+            ]
+            not_done = futures
+            while not_done:
+                _, not_done = wait(not_done, timeout=self.report_interval)
+                self.report(computer, provider, progress)
+
+        self.report(computer, provider)
+
     def sync(self):
         hostname = socket.gethostname()
         try:
@@ -184,6 +643,7 @@ class FileSync:
                 time.sleep(1)
             else:
                 self.sync_manual(computer, provider)
+                self.publish(computer)
 
                 computers = provider.all_with_last_activtiy()
                 computers = [
@@ -191,45 +651,61 @@ class FileSync:
                     if (now() - c.last_activity).total_seconds() < 10
                 ]
                 computers_names = {c.name for c in computers}
+                priorities = TaskProvider(self.session).queued_projects(
+                    computer.name)
+                manifests = SyncManifestProvider(self.session)
+                loads = serving_loads(computers)
 
+                # source computer -> its transfers
+                links = defaultdict(list)
                 for c, project, tasks in task_synced_provider.for_computer(
                         computer.name):
-                    if c.sync_with_this_computer:
-                        if c.name not in computers_names:
-                            self.logger.info(f'Computer = {c.name} '
-                                             f'is offline. Can not sync',
-                                             ComponentType.WorkerSupervisor,
-                                             hostname)
-                            continue
-
-                        if c.syncing_computer:
-                            continue
-
-                        sync_folders = yaml_load(project.sync_folders)
-                        ignore_folders = yaml_load(project.ignore_folders)
-
-                        sync_folders = correct_folders(sync_folders,
-                                                       project.name)
-                        ignore_folders = correct_folders(ignore_folders,
-                                                         project.name)
-
-                        if not isinstance(sync_folders, list):
-                            sync_folders = []
-                        if not isinstance(ignore_folders, list):
-                            ignore_folders = []
-
-                        folders = [[s, ignore_folders] for s in sync_folders]
-
-                        computer.syncing_computer = c.name
-                        provider.update()
-
-                        sync_directed(self.session, c, computer, folders)
-
-                    for t in tasks:
-                        task_synced_provider.add(
-                            TaskSynced(computer=computer.name, task=t.id)
+                    if not c.sync_with_this_computer:
+                        for t in tasks:
+                            task_synced_provider.add(
+                                TaskSynced(computer=computer.name, task=t.id)
+                            )
+                        continue
+
+                    # the manifest of c must be published after
+                    # the tasks finished
+                    min_time = max(t.finished or now() for t in tasks)
+                    folders = project_folders(project)
+
+                    source = c
+                    if SYNC_FANOUT > 0:
+                        candidates = [
+                            s for s in computers if s.sync_with_this_computer
+                            and s.name != computer.name
+                        ]
+                        choice = choose_source(
+                            manifests, c, candidates, folders, min_time,
+                            loads, SYNC_FANOUT
                         )
-
+                        if choice is None:
+                            # the up-to-date computers are busy
+                            continue
+                        source, min_time = choice
+                    elif c.syncing_computer:
+                        continue
+
+                    if source.name not in computers_names:
+                        self.logger.info(f'Computer = {c.name} '
+                                         f'is offline. Can not sync',
+                                         ComponentType.WorkerSupervisor,
+                                         hostname)
+                        continue
+
+                    loads[source.name] += 1
+                    links[source.name].append(
+                        (priorities.get(project.id, 0),
+                         folders,
+                         [t.id for t in tasks],
+                         min_time)
+                    )
+
+                if len(links) > 0:
+                    self.transfer(computer, provider, links)
                     time.sleep(FILE_SYNC_INTERVAL)
 
             computer.last_synced = sync_start
@@ -1,9 +1,12 @@
+import importlib
 import os
+import pkgutil
 import shutil
 import socket
+import subprocess
+import sys
 import time
 import traceback
-import sys
 from os.path import join, dirname, abspath
 from typing import List
 
@@ -12,7 +15,7 @@ from sqlalchemy.orm import joinedload
 from celery.signals import celeryd_after_setup
 from celery import states
 
-from mlcomp import MODEL_FOLDER, TASK_FOLDER, DOCKER_IMG
+from mlcomp import MODEL_FOLDER, TASK_FOLDER, DOCKER_IMG, WORKER_WARM_POOL
 from mlcomp.db.core import Session
 from mlcomp.db.enums import ComponentType, TaskStatus
 from mlcomp.db.models import Task, Dag
@@ -23,15 +26,22 @@ from mlcomp.utils.logging import create_logger
 from mlcomp.utils.io import yaml_load, yaml_dump
 from mlcomp.utils.misc import set_global_seed, now
 from mlcomp.worker.app import app
-from mlcomp.worker.executors import Executor
+from mlcomp.worker.executors import Executor, TaskPreempted
 from mlcomp.worker.storage import Storage
 from mlcomp.utils.config import Config
 
 
 class ExecuteBuilder:
-    def __init__(self, id: int, repeat_count: int = 1, exit=True):
+    def __init__(
+            self,
+            id: int,
+            repeat_count: int = 1,
+            exit=True,
+            started: float = None
+    ):
         self.session = Session.create_session(key='ExecuteBuilder')
         self.id = id
+        self.started = started or time.time()
         self.repeat_count = repeat_count
         self.logger = create_logger(self.session, 'ExecuteBuilder')
         self.logger_db = create_logger(self.session, 'ExecuteBuilder.db',
@@ -119,9 +129,10 @@ class ExecuteBuilder:
 
         cuda_visible_devices = cuda_visible_devices or ''
 
+        threads = self.set_affinity()
         env = {
-            'MKL_NUM_THREADS': 1,
-            'OMP_NUM_THREADS': 1,
+            'MKL_NUM_THREADS': threads,
+            'OMP_NUM_THREADS': threads,
             'CUDA_VISIBLE_DEVICES': cuda_visible_devices
         }
         env.update(executor.get('env', {}))
@@ -130,6 +141,32 @@ class ExecuteBuilder:
             os.environ[k] = str(v)
             self.info(f'Set env. {k} = {v}')
 
+        # the env does not change the threads of an imported torch
+        torch = sys.modules.get('torch')
+        if torch is not None:
+            torch.set_num_threads(int(os.environ['OMP_NUM_THREADS']))
+
+    def set_affinity(self):
+        """
+        Pins the process to the cores assigned by the supervisor.
+        The indexes are mapped to the cores available to the worker,
+        e.g. the cpuset of a docker container
+        :return: count of the threads for the task
+        """
+        threads = max(self.task.cpu or 1, 1)
+        if not self.task.cpu_assigned or \
+                not hasattr(os, 'sched_setaffinity'):
+            return threads
+
+        available = sorted(os.sched_getaffinity(0))
+        cores = {
+            available[int(c) % len(available)]
+            for c in self.task.cpu_assigned.split(',')
+        }
+        os.sched_setaffinity(0, cores)
+        self.info(f'Set affinity. cores = {sorted(cores)}')
+        return len(cores)
+
     def check_status(self):
         self.info('check_status')
 
@@ -154,6 +191,46 @@ class ExecuteBuilder:
         self.task.started = now()
         self.provider.commit()
 
+    def restart_in_env(self):
+        """
+        The versions of the imported libraries can not be changed.
+        If the dag requires other versions of them, the task is run by
+        a new interpreter with the environment of the dag in front of
+        site-packages
+        :return: whether the task has been run by the new interpreter
+        """
+        if self.task.debug or os.getenv('MLCOMP_TASK_ENV'):
+            return False
+
+        libraries = self.library_provider.dag(self.task.dag)
+        env = self.storage.install_libraries(libraries)
+        if not env or not env[1]:
+            return False
+
+        path, imported = env
+        self.info(f'restart_in_env. {imported} have already been imported. '
+                  f'The task is run by a new interpreter')
+
+        # the new interpreter takes the task
+        self.task.status = TaskStatus.Queued.value
+        self.provider.commit()
+
+        python_path = [path, os.getenv('PYTHONPATH')]
+        code = subprocess.call(
+            [sys.executable, '-m', 'mlcomp.worker', 'execute', str(self.id),
+             '--repeat_count', str(self.repeat_count)],
+            env={
+                **os.environ,
+                'PYTHONPATH': os.pathsep.join(p for p in python_path if p),
+                'MLCOMP_TASK_ENV': path
+            }
+        )
+        if code != 0:
+            self.session.refresh(self.task)
+            raise Exception(f'task process with the environment exited '
+                            f'with code = {code}')
+        return True
+
     def download(self):
         self.info('download')
 
@@ -173,42 +250,32 @@ class ExecuteBuilder:
         mlcomp_base_folder = os.path.abspath(join(mlcomp_executors_folder,
                                                   '../../../'))
 
-        imported, was_installation = self.storage.import_executor(
+        imported = self.storage.import_executor(
             mlcomp_executors_folder,
             mlcomp_base_folder,
-            executor_type)
+            executor_type,
+            index=self.storage.folder_index(
+                mlcomp_executors_folder, mlcomp_base_folder
+            ),
+            scan=False
+        )
 
         if not imported:
-            imported, was_installation = self.storage.import_executor(
+            index = yaml_load(self.dag.executor_index) \
+                if self.dag.executor_index else None
+            imported = self.storage.import_executor(
                 folder,
                 folder,
                 executor_type,
-                libraries)
+                libraries,
+                index=index
+            )
 
             if not imported:
                 raise Exception(f'Executor = {executor_type} not found')
 
         self.info('download. executor imported')
 
-        if was_installation and not self.task.debug:
-            if self.repeat_count > 0:
-                self.info('was installation. '
-                          'set task status to Queued. '
-                          'And resending the task to a queue')
-                self.task.status = TaskStatus.Queued.value
-                self.provider.commit()
-
-                try:
-                    execute.apply_async(
-                        (self.id, self.repeat_count - 1),
-                        queue=self.queue_personal,
-                        retry=False
-                    )
-                except Exception:
-                    pass
-                finally:
-                    sys.exit()
-
         assert Executor.is_registered(executor_type), \
             f'Executor {executor_type} was not found'
 
@@ -262,6 +329,33 @@ class ExecuteBuilder:
 
         self.info('execute end')
 
+    def requeue(self, reason: str):
+        """
+        Returns the preempted task to the queue.
+        It resumes from the last checkpoint of this computer
+        """
+        self.info(f'requeue: {reason}')
+
+        info = yaml_load(self.task.additional_info)
+        info['resume'] = {
+            'master_computer': self.hostname,
+            'master_task_id': self.task.id,
+            'load_last': True
+        }
+        self.task.additional_info = yaml_dump(info)
+
+        self.task.status = TaskStatus.NotRan.value
+        self.task.preempt = False
+        self.task.pid = None
+        self.task.started = None
+        self.task.computer_assigned = None
+        self.task.celery_id = None
+        self.task.worker_index = None
+        self.task.docker_assigned = None
+        self.task.gpu_assigned = None
+        self.task.cpu_assigned = None
+        self.provider.commit()
+
     def build(self):
         try:
             self.create_base()
@@ -272,12 +366,23 @@ class ExecuteBuilder:
 
             self.change_status()
 
+            if self.restart_in_env():
+                return
+
             self.download()
 
             self.create_executor()
 
+            self.info(
+                f'startup time since the worker has taken the task = '
+                f'{time.time() - self.started:.2f}s. '
+                f'warm pool = {WORKER_WARM_POOL}'
+            )
+
             self.execute()
 
+        except TaskPreempted as e:
+            self.requeue(str(e))
         except Exception as e:
             step = self.executor.step.id if \
                 (self.executor and self.executor.step) else None
@@ -301,11 +406,83 @@ class ExecuteBuilder:
                 os._exit(0)
 
 
-def execute_by_id(id: int, repeat_count=1, exit=True):
-    ex = ExecuteBuilder(id, repeat_count=repeat_count, exit=exit)
+def execute_by_id(id: int, repeat_count=1, exit=True, started=None):
+    ex = ExecuteBuilder(
+        id, repeat_count=repeat_count, exit=exit, started=started
+    )
     ex.build()
 
 
+def _after_fork_in_child():
+    """
+    The broker connections of the worker are dropped in a forked task
+    process, not closed: the worker keeps using them
+    """
+    # noinspection PyProtectedMember
+    app._after_fork()
+
+
+_fork_hooks_registered = False
+
+
+def execute_forked(id: int, repeat_count=1, started: float = None):
+    """
+    Executes the task in a child process forked from the warm worker.
+    The worker keeps its imports and is not restarted after the task.
+    A task process which exits with an error fails the task
+    """
+    global _fork_hooks_registered
+    if not _fork_hooks_registered:
+        os.register_at_fork(after_in_child=_after_fork_in_child)
+        _fork_hooks_registered = True
+
+    # the child must not share the db connections of the worker
+    Session.dispose_all()
+
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            execute_by_id(id, repeat_count, exit=False, started=started)
+            code = 0
+        except Exception:
+            traceback.print_exc()
+        finally:
+            # noinspection PyProtectedMember
+            os._exit(code)
+
+    _, status = os.waitpid(pid, 0)
+    code = os.waitstatus_to_exitcode(status)
+    if code == 0:
+        return
+
+    session = Session.create_session(key='ExecuteBuilder')
+    provider = TaskProvider(session)
+    task = provider.by_id(id)
+    # a stopped task is killed
+    if task.status <= TaskStatus.InProgress.value:
+        logger = create_logger(session, 'ExecuteBuilder')
+        logger.error(f'task process exited with code = {code}',
+                     ComponentType.Worker, socket.gethostname(), id)
+        provider.change_status(task, TaskStatus.Failed)
+    raise Exception(f'task = {id} process exited with code = {code}')
+
+
+def preload():
+    """
+    Imports the executors (and torch, catalyst, etc. they depend on)
+    once, so the forked task processes do not spend time on it
+    """
+    folder = join(dirname(abspath(__file__)), 'executors')
+    for _, name, _ in pkgutil.walk_packages(
+            [folder], prefix='mlcomp.worker.executors.'
+    ):
+        try:
+            importlib.import_module(name)
+        except Exception:
+            traceback.print_exc()
+
+
 @celeryd_after_setup.connect
 def capture_worker_name(sender, instance, **kwargs):
     os.environ['WORKER_INDEX'] = sender.split('_')[-1]
@@ -313,7 +490,12 @@ def capture_worker_name(sender, instance, **kwargs):
 
 @app.task
 def execute(id: int, repeat_count: int = 1):
-    execute_by_id(id, repeat_count)
+    # the startup time is measured since the worker has taken the task
+    started = time.time()
+    if WORKER_WARM_POOL:
+        execute_forked(id, repeat_count, started=started)
+    else:
+        execute_by_id(id, repeat_count, started=started)
 
 
 @app.task
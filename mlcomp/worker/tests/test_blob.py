@@ -0,0 +1,78 @@
+# flake8: noqa
+import io
+import os
+import hashlib
+
+# noinspection PyUnresolvedReferences
+from mlcomp.utils.tests import session
+from mlcomp.db.core import Session
+from mlcomp.db.models import Dag, DagStorage
+from mlcomp.db.providers import ProjectProvider, DagProvider, FileProvider, \
+    DagStorageProvider
+from mlcomp.worker.blob import FolderBlobStore, LocalCache
+from mlcomp.worker.storage import Storage
+
+
+class TestBlob(object):
+    def test_store(self, tmpdir):
+        store = FolderBlobStore(str(tmpdir))
+        content = b'print(1)'
+        md5 = store.write(content)
+        assert md5 == hashlib.md5(content).hexdigest()
+        assert store.read(md5) == content
+
+        assert store.write_stream(io.BytesIO(content)) == (md5, len(content))
+        assert list(store.hashes()) == [md5]
+
+        store.remove(md5)
+        assert not store.exists(md5)
+
+    def test_migrate(self, session: Session, tmpdir):
+        project = ProjectProvider(session).add_project(name='test')
+        dag = DagProvider(session).add(
+            Dag(name='test', project=project.id, config=''))
+
+        storage = Storage(session)
+        storage.blobs = FolderBlobStore(str(tmpdir))
+        content = b'print(1)'
+        md5 = hashlib.md5(content).hexdigest()
+        file = storage.create_file(content, md5, project.id, dag.id)
+        FileProvider(session).add(file)
+
+        assert storage.migrate_blobs() == 1
+        assert file.content is None
+        assert storage.file_content(file) == content
+
+        storage.blobs.write(b'orphan')
+        assert storage.collect_garbage(min_age=0) == 1
+        assert storage.blobs.exists(md5)
+
+    def test_download_cache(self, session: Session, tmpdir):
+        project = ProjectProvider(session).add_project(name='test')
+        dag = DagProvider(session).add(
+            Dag(name='test', project=project.id, config=''))
+
+        storage = Storage(session)
+        storage.cache = LocalCache(str(tmpdir.join('cache')))
+        content = b'print(1)'
+        md5 = hashlib.md5(content).hexdigest()
+        file = FileProvider(session).add(
+            storage.create_file(content, md5, project.id, dag.id))
+        DagStorageProvider(session).add_all([
+            DagStorage(dag=dag.id, path='src', is_dir=True),
+            DagStorage(dag=dag.id, path='src/main.py', file=file.id,
+                       is_dir=False)
+        ])
+
+        for task in ['1', '2']:
+            folder = str(tmpdir.join(task))
+            storage.download_dag(dag.id, folder)
+            path = os.path.join(folder, 'src', 'main.py')
+            assert open(path, 'rb').read() == content
+            # a task rewriting its file does not change the cache
+            with open(path, 'wb') as f:
+                f.write(b'print(2)')
+            assert storage.cache.read(md5) == content
+
+        assert storage.cache.trim(0) == 1
+        assert not storage.cache.exists(md5)
@@ -0,0 +1,32 @@
+# flake8: noqa
+import os
+import sys
+
+from mlcomp.worker.env import EnvCache
+
+
+class TestEnvCache(object):
+    def test_build(self, tmpdir, monkeypatch):
+        calls = []
+
+        def pip(*args):
+            calls.append(args[0])
+            if args[0] == 'install':
+                target = args[args.index('--target') + 1]
+                os.makedirs(os.path.join(target, 'mlcomp_env_lib'))
+                os.makedirs(os.path.join(target, 'lib-1.0.dist-info'))
+
+        cache = EnvCache(str(tmpdir.join('env')), str(tmpdir.join('wheel')))
+        monkeypatch.setattr(cache, '_pip', pip)
+
+        libraries = [('lib', '1.0'), ('other', '2.0')]
+        path = cache.build(libraries)
+        assert cache.build(list(reversed(libraries))) == path
+        assert calls == ['wheel', 'install']
+        assert cache.modules(path) == {'mlcomp_env_lib'}
+
+        try:
+            assert cache.activate(path) == []
+            assert path in sys.path
+        finally:
+            sys.path.remove(path)
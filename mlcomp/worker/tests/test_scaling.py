@@ -0,0 +1,35 @@
+# flake8: noqa
+import time
+
+from mlcomp.worker import scaling
+from mlcomp.worker.scaling import WorkerScaler, supervisord_workers
+
+
+class TestScaling(object):
+    def test_plan(self):
+        scaler = WorkerScaler(4, min_workers=1, idle_timeout=60,
+                              max_memory=90)
+
+        # 2 tasks are queued, a task waits for the worker 3
+        start, stop = scaler.plan({0}, {3}, 2, 50)
+        assert start == [3, 1] and stop == []
+
+        # no more workers when the memory is used
+        start, stop = scaler.plan({0}, set(), 2, 95)
+        assert start == [] and stop == []
+
+        # idle workers stop after the timeout, the minimum is kept
+        start, stop = scaler.plan({0, 1, 3}, {1}, 0, 50)
+        assert start == [] and stop == []
+        for i in scaler.idle_since:
+            scaler.idle_since[i] -= 60
+        start, stop = scaler.plan({0, 1, 3}, {1}, 0, 50)
+        assert start == [] and stop == [3, 0]
+
+    def test_config(self, monkeypatch):
+        monkeypatch.setattr(scaling, 'WORKER_SCALE', True)
+        monkeypatch.setattr(scaling, 'WORKER_MIN', 1)
+        text = '\n'.join(supervisord_workers('worker', 2))
+        assert '[supervisorctl]' in text
+        assert 'command=worker 0\nautostart=true' in text
+        assert 'command=worker 1\nautostart=false' in text
@@ -0,0 +1,311 @@
+# flake8: noqa
+import os
+from io import BytesIO
+from zipfile import ZipFile, ZIP_STORED
+
+# noinspection PyUnresolvedReferences
+from mlcomp.utils.tests import session
+from mlcomp.db.core import Session
+from mlcomp.db.models import Dag, File, DagLibrary, DagStorage, \
+    CodeSnapshot
+from mlcomp.db.providers import ProjectProvider, DagProvider, \
+    DagStorageProvider, FileProvider, DagLibraryProvider
+from mlcomp.utils.io import yaml_load
+from mlcomp.utils import req
+from mlcomp.worker import storage as storage_module
+from mlcomp.worker.blob import LocalCache
+from mlcomp.worker.storage import Storage
+
+
+class TestStorage(object):
+    def _dag(self, session: Session, project: int):
+        return DagProvider(session).add(
+            Dag(name='test', project=project, config='', file_size=0))
+
+    def test_upload(self, session: Session, tmpdir, monkeypatch):
+        tmpdir.join('src').mkdir()
+        tmpdir.join('src', 'train.py').write('class MyTrain:\n    pass\n')
+        tmpdir.join('readme.txt').write('readme')
+        tmpdir.join('logs').mkdir()
+        tmpdir.join('logs', 'log.txt').write('log')
+
+        project = ProjectProvider(session).add_project(name='test')
+        dag = self._dag(session, project.id)
+        storage = Storage(session)
+        storage.upload(str(tmpdir), dag, control_reqs=False)
+
+        paths = sorted(s.path for s, _ in
+                       DagStorageProvider(session).by_dag(dag.id))
+        assert paths == ['readme.txt', 'src', 'src/train.py']
+        assert yaml_load(dag.executor_index)['my_train'] == \
+               ['src.train', 'MyTrain']
+
+        def hash_file(path):
+            raise Exception(f'{path} is reread')
+
+        monkeypatch.setattr(storage_module, 'hash_file', hash_file)
+
+        dag = self._dag(session, project.id)
+        storage.upload(str(tmpdir), dag, control_reqs=False)
+
+        assert len(DagStorageProvider(session).by_dag(dag.id)) == 3
+        assert FileProvider(session).query(File).count() == 2
+        assert yaml_load(dag.executor_index)['MyTrain'] == \
+               ['src.train', 'MyTrain']
+
+    def test_find_imports(self, tmpdir, monkeypatch):
+        tmpdir.join('train.py').write(
+            'import os.path\nimport pathspec\nfrom . import utils\n')
+        tmpdir.join('copy.py').write(
+            'import os.path\nimport pathspec\nfrom . import utils\n')
+        tmpdir.join('cached.py').write('import pathspec\n')
+        file = str(tmpdir.join('cached.py'))
+
+        libs = req.find_imports(str(tmpdir),
+                                imports={file: ['sqlalchemy']})
+        assert sorted(lib for lib, _ in libs) == ['pathspec', 'sqlalchemy']
+
+        def parse(content, encoding):
+            raise Exception('the file is parsed again')
+
+        monkeypatch.setattr(req, '_parse_imports', parse)
+        assert req.find_imports(str(tmpdir),
+                                imports={file: ['sqlalchemy']}) == libs
+
+    def test_broken_file(self, session: Session, tmpdir):
+        tmpdir.join('train.py').write('def train(:\n')
+        file = str(tmpdir.join('train.py'))
+        md5, classes, imports = storage_module.hash_file(file)
+        assert classes == [] and imports is None
+
+        try:
+            req.find_imports(str(tmpdir))
+            assert False
+        except SyntaxError:
+            pass
+
+    def test_copy_from(self, session: Session, tmpdir):
+        tmpdir.join('src').mkdir()
+        tmpdir.join('src', 'train.py').write('class MyTrain:\n    pass\n')
+
+        project = ProjectProvider(session).add_project(name='test')
+        src = self._dag(session, project.id)
+        storage = Storage(session)
+        storage.upload(str(tmpdir), src, control_reqs=False)
+        DagLibraryProvider(session).add(
+            DagLibrary(dag=src.id, library='numpy', version='1.0'))
+
+        dag = self._dag(session, project.id)
+        storage.copy_from(src.id, dag)
+
+        items = DagStorageProvider(session).by_dag(dag.id)
+        assert sorted((s.path, s.is_dir) for s, _ in items) == \
+               [('src', True), ('src/train.py', False)]
+        assert DagLibraryProvider(session).dag(dag.id) == [('numpy', '1.0')]
+        assert dag.executor_index == src.executor_index
+
+    def test_snapshot(self, session: Session, tmpdir):
+        tmpdir.join('train.py').write('class MyTrain:\n    pass\n')
+
+        project = ProjectProvider(session).add_project(name='test')
+        src = self._dag(session, project.id)
+        storage = Storage(session)
+        storage.upload(str(tmpdir), src, control_reqs=False)
+
+        dag = self._dag(session, project.id)
+        storage.copy_from(src.id, dag)
+        assert dag.snapshot == src.snapshot
+
+        provider = DagStorageProvider(session)
+        item, file = provider.by_dag(dag.id)[0]
+        content = b'class MyValid:\n    pass\n'
+        new_file = FileProvider(session).add(
+            storage.create_file(content, 'md5', project.id, dag.id))
+        provider.override(dag.id, item.id, new_file.id)
+
+        assert provider.by_dag(dag.id)[0][1].id == new_file.id
+        assert provider.by_dag(src.id)[0][1].id == file.id
+
+        dag_provider = DagProvider(session)
+        dag_provider.remove_all([src.id])
+        assert provider.by_dag(dag.id)[0][1].id == new_file.id
+
+        dag_provider.remove_all([dag.id])
+        assert provider.query(DagStorage).count() == 0
+
+    def test_zip_dag(self, session: Session, tmpdir):
+        folder = tmpdir.mkdir('code')
+        folder.mkdir('src')
+        folder.join('src', 'train.py').write('class MyTrain:\n    pass\n')
+        folder.join('data.gz').write_binary(b'\x1f\x8b')
+
+        project = ProjectProvider(session).add_project(name='test')
+        dag = self._dag(session, project.id)
+        storage = Storage(session)
+        storage.upload(str(folder), dag, control_reqs=False)
+
+        cache = str(tmpdir.join('cache'))
+        for _ in range(2):
+            content = b''.join(storage.zip_dag(dag.id, cache_folder=cache))
+            with ZipFile(BytesIO(content)) as zip_obj:
+                assert zip_obj.read('src/train.py') == \
+                       b'class MyTrain:\n    pass\n'
+                assert zip_obj.getinfo('data.gz').compress_type == \
+                       ZIP_STORED
+        assert len(os.listdir(cache)) == 1
+
+    def test_compression(self, session: Session, tmpdir):
+        content = 'x = 1\n' * 1000
+        tmpdir.join('train.py').write(content)
+
+        project = ProjectProvider(session).add_project(name='test')
+        dag = self._dag(session, project.id)
+        storage = Storage(session)
+        storage.codec = 'zlib'
+        storage.upload(str(tmpdir), dag, control_reqs=False)
+
+        file = FileProvider(session).query(File).one()
+        assert file.codec == 'zlib'
+        assert storage.file_content(file) == content.encode()
+        assert dag.file_physical_size < dag.file_size
+
+        storage.codec = None
+        assert storage.recompress() == 1
+        assert file.codec is None
+        assert file.content == content.encode()
+        assert dag.file_physical_size == dag.file_size
+
+        stats = FileProvider(session).stats()
+        assert stats[0]['saved'] == 0
+
+    def test_compression_raw(self, session: Session, tmpdir):
+        content = os.urandom(1000)
+        tmpdir.join('table.bin').write_binary(content)
+
+        project = ProjectProvider(session).add_project(name='test')
+        dag = self._dag(session, project.id)
+        storage = Storage(session)
+        storage.codec = 'zlib'
+        storage.upload(str(tmpdir), dag, control_reqs=False)
+
+        # the random content does not shrink and stays raw
+        file = FileProvider(session).query(File).one()
+        assert file.codec is None
+        assert file.codec_checked == 'zlib'
+        assert storage.recompress() == 0
+
+        storage.codec = 'none'
+        assert storage.recompress() == 1
+        assert storage.recompress() == 0
+        assert storage.file_content(file) == content
+
+    def test_chunks(self, session: Session, tmpdir):
+        folder = tmpdir.mkdir('code')
+        content = os.urandom(1000) * 3
+        folder.join('table.bin').write_binary(content)
+        folder.join('copy.bin').write_binary(content[:1000] * 2)
+
+        project = ProjectProvider(session).add_project(name='test')
+        dag = self._dag(session, project.id)
+        storage = Storage(session)
+        storage.chunk_size = 1000
+        storage.upload(str(folder), dag, control_reqs=False)
+
+        # 2 chunked files sharing 1 chunk
+        assert FileProvider(session).query(File).count() == 3
+        for s, file in DagStorageProvider(session).by_dag(dag.id):
+            expected = content if s.path == 'table.bin' else content[:2000]
+            assert storage.file_content(file) == expected
+
+        storage.cache = LocalCache(str(tmpdir.join('cache')))
+        storage.download_dag(dag.id, str(tmpdir.join('task')))
+        assert tmpdir.join('task', 'table.bin').read_binary() == content
+
+        stats = FileProvider(session).stats()
+        assert stats[0]['size'] == dag.file_size
+
+    def test_shared_chunks(self, session: Session, tmpdir):
+        content = os.urandom(1000) * 2
+        tmpdir.mkdir('a').join('table.bin').write_binary(content)
+        tmpdir.mkdir('b').join('table.bin').write_binary(content + b'x')
+
+        project = ProjectProvider(session).add_project(name='test')
+        storage = Storage(session)
+        storage.chunk_size = 1000
+        a = self._dag(session, project.id)
+        storage.upload(str(tmpdir.join('a')), a, control_reqs=False)
+        b = self._dag(session, project.id)
+        storage.upload(str(tmpdir.join('b')), b, control_reqs=False)
+
+        # the chunk created by the dag a is used by the dag b
+        FileProvider(session).remove({'dag': a.id})
+        (_, file), = DagStorageProvider(session).by_dag(b.id)
+        assert storage.file_content(file) == content + b'x'
+
+        file.size += 1
+        try:
+            storage.file_content(file)
+            assert False
+        except Exception as e:
+            assert 'broken' in str(e)
+
+    def test_stale_index(self, session: Session, tmpdir):
+        folder = tmpdir.mkdir('stale_index')
+        folder.join('train_v2.py').write('class NewTrain:\n    pass\n')
+
+        project = ProjectProvider(session).add_project(name='test')
+        dag = self._dag(session, project.id)
+        storage = Storage(session)
+        storage.update_executor_index(dag.id, 'train_v2.py',
+                                      b'class NewTrain:\n    pass\n')
+        assert yaml_load(dag.executor_index)['new_train'] == \
+               ['train_v2', 'NewTrain']
+
+        # the executor is not in the index, the folder is scanned
+        assert storage.import_executor(str(folder), str(folder),
+                                       'other_train', index={}) is False
+        folder.join('other.py').write('class OtherTrain:\n    pass\n')
+        assert storage.import_executor(str(folder), str(folder),
+                                       'other_train', index={})
+
+    def test_index_not_executor(self, session: Session, tmpdir):
+        folder = tmpdir.mkdir('index_not_executor')
+        folder.join('helpers.py').write('my_train = 1\n')
+        folder.join('train.py').write(
+            'from mlcomp.worker.executors import Executor\n\n\n'
+            'class MyTrain(Executor):\n    pass\n'
+        )
+
+        # the name in the index is not an executor class
+        storage = Storage(session)
+        index = {'my_train': ['helpers', 'my_train']}
+        assert storage.import_executor(str(folder), str(folder), 'my_train',
+                                       index=index, scan=False) is False
+
+        index = {'my_train': ['train', 'MyTrain']}
+        assert storage.import_executor(str(folder), str(folder), 'my_train',
+                                       index=index, scan=False)
+
+    def test_remove_dag(self, session: Session, tmpdir):
+        tmpdir.join('train.py').write('class MyTrain:\n    pass\n')
+        tmpdir.join('table.bin').write_binary(os.urandom(3000))
+
+        project = ProjectProvider(session).add_project(name='test')
+        storage = Storage(session)
+        storage.chunk_size = 1000
+        a = self._dag(session, project.id)
+        storage.upload(str(tmpdir), a, control_reqs=False)
+        b = self._dag(session, project.id)
+        storage.upload(str(tmpdir), b, control_reqs=False)
+
+        # the files uploaded with the dag a are used by the dag b
+        provider = DagProvider(session)
+        provider.remove(a.id)
+        for s, file in DagStorageProvider(session).by_dag(b.id):
+            assert storage.file_content(file) == \
+                   tmpdir.join(s.path).read_binary()
+
+        provider.remove(b.id)
+        assert provider.query(CodeSnapshot).count() == 0
+        assert provider.query(DagStorage).count() == 0
+        assert provider.query(File).count() == 0
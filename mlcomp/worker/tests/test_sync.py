@@ -0,0 +1,171 @@
+# flake8: noqa
+import socket
+import subprocess
+
+# noinspection PyUnresolvedReferences
+from mlcomp.utils.tests import session
+from mlcomp.db.core import Session
+from mlcomp.db.models import Computer
+from mlcomp.db.providers import ComputerProvider, SyncManifestProvider
+from mlcomp.utils.misc import now
+from mlcomp.worker import sync
+from mlcomp.worker.sync import folder_manifest, changed_entries, \
+    sync_directed, bandwidth_limit, SyncProgress, choose_source
+
+
+class TestSync(object):
+    def _folder(self, root):
+        folder = root.mkdir('data')
+        folder.mkdir('images').join('1.png').write('1')
+        folder.mkdir('logs').join('log.txt').write('log')
+        folder.join('train.csv').write('a,b')
+        return folder
+
+    def test_manifest(self, tmpdir):
+        source = self._folder(tmpdir.mkdir('source'))
+        target = self._folder(tmpdir.mkdir('target'))
+
+        manifest = folder_manifest(str(source), ['logs'])
+        assert manifest == folder_manifest(str(target), ['logs'])
+        assert set(manifest['children']) == {'images', 'train.csv'}
+
+        target.join('images', '1.png').write('12')
+        target.join('logs', 'log.txt').write('log2')
+        target_manifest = folder_manifest(str(target), ['logs'])
+        assert changed_entries(manifest, target_manifest) == ['images']
+        assert changed_entries(
+            manifest, folder_manifest(str(target), [])) is None
+
+    def test_sync_directed(self, session: Session, tmpdir, monkeypatch):
+        provider = ComputerProvider(session)
+        fields = dict(ip='localhost', port=22, user='user', disk=0)
+        source = Computer(name='source', root_folder=str(tmpdir.join('s')),
+                          **fields)
+        target = Computer(name=socket.gethostname(),
+                          root_folder=str(tmpdir.join('t')), **fields)
+        provider.add(source)
+        provider.add(target)
+
+        self._folder(tmpdir.mkdir('s'))
+        self._folder(tmpdir.mkdir('t'))
+        min_time = now()
+        manifests = SyncManifestProvider(session)
+        manifests.save('source', 'data',
+                       folder_manifest(str(tmpdir.join('s', 'data')), []))
+
+        inputs = []
+
+        def check_output(command, **kwargs):
+            inputs.append(kwargs['input'])
+
+        monkeypatch.setattr(subprocess, 'check_output', check_output)
+
+        sync_directed(session, source, target, [['data', []]])
+        assert inputs == [None]
+
+        sync_directed(session, source, target, [['data', []]],
+                      min_time=min_time)
+        assert len(inputs) == 1
+
+        tmpdir.join('s', 'data', 'train.csv').write('a,b,c')
+        manifests.save('source', 'data',
+                       folder_manifest(str(tmpdir.join('s', 'data')), []))
+        sync_directed(session, source, target, [['data', []]],
+                      min_time=min_time)
+        assert inputs[-1] == 'train.csv'
+
+    def test_same_machine(self, session: Session, tmpdir, monkeypatch):
+        provider = ComputerProvider(session)
+        fields = dict(ip='localhost', user='user', disk=0)
+        source = Computer(name='source', root_folder=str(tmpdir.join('s')),
+                          port=22, **fields)
+        target = Computer(name=socket.gethostname(),
+                          root_folder=str(tmpdir.join('t')), port=22, **fields)
+        other = Computer(name='other', root_folder=str(tmpdir.join('o')),
+                         port=2222, **fields)
+        for computer in [source, target, other]:
+            provider.add(computer)
+
+        commands = []
+        monkeypatch.setattr(sync, '_run_rsync',
+                            lambda command, *args: commands.append(command))
+
+        # the current host is the target
+        sync_directed(session, source, target, [['data', []]])
+        assert commands[-1].startswith('rsync -vhru ' + str(tmpdir))
+
+        # the same ip, but another ssh port
+        sync_directed(session, other, target, [['data', []]])
+        assert 'ssh -p 2222' in commands[-1]
+
+        # the current host is neither the source nor the target
+        sync_directed(session, source, other, [['data', []]])
+        assert commands[-1].startswith('ssh -p 22 user@localhost')
+
+    def test_bandwidth_limit(self, monkeypatch):
+        assert bandwidth_limit(2) is None
+
+        monkeypatch.setattr(sync, 'SYNC_BANDWIDTH', 10)
+        assert bandwidth_limit(4) == 2560
+
+        monkeypatch.setattr(sync, 'SYNC_LINK_BANDWIDTH', 1)
+        assert bandwidth_limit(4) == 1024
+
+    def test_progress(self):
+        progress = SyncProgress()
+        command = "printf '  1,024  50%%  1.00MB/s  0:00:01\\r" \
+                  "  2,048 100%%  1.00MB/s  0:00:02\\nsent 2,048 bytes\\n'"
+        sync._run_rsync(command, progress=lambda size, percent:
+                        progress.update('source', 'data', size, percent))
+
+        item, = progress.items()
+        assert item['bytes'] == 2048 and item['percent'] == 100
+        progress.finish('source')
+        assert progress.items() == []
+
+    def test_fanout(self, session: Session, tmpdir, monkeypatch):
+        # several computers on one machine, each one has its root folder
+        provider = ComputerProvider(session)
+        manifests = SyncManifestProvider(session)
+        computers = []
+        for name in ['origin', 'a', 'b', 'c']:
+            computer = Computer(name=name, root_folder=str(tmpdir.join(name)),
+                                ip='localhost', port=22, user='user', disk=0)
+            provider.add(computer)
+            computers.append(computer)
+        origin, a, b, c = computers
+
+        min_time = now()
+        for computer in [origin, a]:
+            folder = self._folder(tmpdir.mkdir(computer.name))
+            manifests.save(computer.name, 'data',
+                           folder_manifest(str(folder), []))
+        tmpdir.mkdir('b')
+        manifests.save('b', 'data',
+                       folder_manifest(str(tmpdir.join('b', 'data')), []))
+
+        folders = [['data', []]]
+        source, _ = choose_source(manifests, origin, computers, folders,
+                                  min_time, {}, 1)
+        assert source.name == 'a'
+
+        source, _ = choose_source(manifests, origin, computers, folders,
+                                  min_time, {'a': 1}, 1)
+        assert source.name == 'origin'
+
+        assert choose_source(manifests, origin, computers, folders,
+                             min_time, {'a': 1, 'origin': 1}, 1) is None
+
+        commands = []
+
+        def check_output(command, **kwargs):
+            commands.append(command)
+
+        monkeypatch.setattr(subprocess, 'check_output', check_output)
+        # the current host is the target
+        monkeypatch.setattr(socket, 'gethostname', lambda: 'b')
+        sync_directed(session, a, b, folders, min_time=min_time)
+        assert commands == [
+            f'rsync -vhru {tmpdir}/a/data/ {tmpdir}/b/data/ '
+            f' --perms  --chmod=777 --size-only --files-from=-'
+        ]
@@ -0,0 +1,76 @@
+# flake8: noqa
+import os
+
+# noinspection PyUnresolvedReferences
+from mlcomp.utils.tests import session
+from mlcomp.db.core import Session
+from mlcomp.db.enums import TaskStatus, TaskType
+from mlcomp.db.models import Dag, Task
+from mlcomp.db.providers import ProjectProvider, DagProvider, \
+    TaskProvider, DagLibraryProvider
+from mlcomp.worker import tasks
+from mlcomp.worker.storage import Storage
+
+
+class TestTasks(object):
+    def test_forked_exit_code(self, session: Session, monkeypatch):
+        project = ProjectProvider(session).add_project(name='test')
+        dag = DagProvider(session).add(
+            Dag(name='test', project=project.id, config=''))
+        provider = TaskProvider(session)
+        task = provider.add(
+            Task(name='task', dag=dag.id, executor='train',
+                 type=TaskType.Train.value, additional_info='',
+                 status=TaskStatus.InProgress.value)
+        )
+
+        def execute_by_id(*args, **kwargs):
+            raise Exception('the task process has crashed')
+
+        monkeypatch.setattr(tasks, 'execute_by_id', execute_by_id)
+        try:
+            tasks.execute_forked(task.id)
+            assert False
+        except Exception as e:
+            assert 'exited with code = 1' in str(e)
+
+        session.expire_all()
+        assert provider.by_id(task.id).status == TaskStatus.Failed.value
+
+    def test_restart_in_env(self, session: Session, monkeypatch):
+        project = ProjectProvider(session).add_project(name='test')
+        dag = DagProvider(session).add(
+            Dag(name='test', project=project.id, config=''))
+        provider = TaskProvider(session)
+        task = provider.add(
+            Task(name='task', dag=dag.id, executor='train',
+                 type=TaskType.Train.value, additional_info='',
+                 status=TaskStatus.InProgress.value)
+        )
+
+        builder = tasks.ExecuteBuilder(task.id, exit=False)
+        builder.session = session
+        builder.task = task
+        builder.provider = provider
+        builder.library_provider = DagLibraryProvider(session)
+        builder.storage = Storage(session)
+
+        env = None
+        monkeypatch.setattr(builder.storage, 'install_libraries',
+                            lambda libraries: env)
+        calls = []
+
+        def call(args, env):
+            calls.append((args, env))
+            return 0
+
+        monkeypatch.setattr(tasks.subprocess, 'call', call)
+        assert not builder.restart_in_env()
+
+        # torch of another version has already been imported
+        env = ('/env', ['torch'])
+        assert builder.restart_in_env()
+        (args, env), = calls
+        assert args[-3:] == [str(task.id), '--repeat_count', '1']
+        assert env['PYTHONPATH'].split(os.pathsep)[0] == '/env'
+        assert task.status == TaskStatus.Queued.value
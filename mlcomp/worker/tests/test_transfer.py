@@ -0,0 +1,70 @@
+# flake8: noqa
+import os
+
+import pytest
+
+from mlcomp.worker.transfer import LocalPeer, ShellPeer, FileTransfer
+
+
+class FailingPeer(LocalPeer):
+    def __init__(self, fail_offset: int):
+        self.fail_offset = fail_offset
+
+    def read(self, path, offset, length, compress=False):
+        if offset == self.fail_offset:
+            raise Exception('connection lost')
+        return super().read(path, offset, length, compress)
+
+
+class TestTransfer(object):
+    def _file(self, tmpdir, size=10000):
+        file = tmpdir.join('source.pth')
+        file.write_binary(os.urandom(size))
+        return str(file)
+
+    def test_loopback(self, tmpdir):
+        source = self._file(tmpdir)
+        target = str(tmpdir.join('target', 'last_full.pth'))
+        transfer = FileTransfer(ShellPeer(['sh', '-c']), chunk_size=1024,
+                                compress=True)
+        assert transfer.fetch(source, target)
+        assert open(target, 'rb').read() == open(source, 'rb').read()
+        assert os.listdir(str(tmpdir.join('target'))) == ['last_full.pth']
+
+    def test_resume(self, tmpdir):
+        source = self._file(tmpdir)
+        target = str(tmpdir.join('target.pth'))
+        transfer = FileTransfer(FailingPeer(5 * 1024), chunk_size=1024,
+                                streams=1)
+        with pytest.raises(Exception, match='connection lost'):
+            transfer.fetch(source, target)
+        assert not os.path.exists(target)
+
+        reads = []
+
+        class Peer(LocalPeer):
+            def read(self, path, offset, length, compress=False):
+                reads.append(offset)
+                return super().read(path, offset, length, compress)
+
+        transfer = FileTransfer(Peer(), chunk_size=1024)
+        assert transfer.fetch(source, target)
+        # the chunks received before the failure are not read again
+        assert 5 * 1024 in reads and min(reads) == 5 * 1024
+        assert open(target, 'rb').read() == open(source, 'rb').read()
+
+    def test_corrupted(self, tmpdir):
+        source = self._file(tmpdir)
+        target = str(tmpdir.join('target.pth'))
+        transfer = FileTransfer(FailingPeer(9 * 1024), chunk_size=1024,
+                                retries=1)
+        with pytest.raises(Exception, match='connection lost'):
+            transfer.fetch(source, target)
+
+        with open(f'{target}.part', 'r+b') as f:
+            f.seek(2048)
+            f.write(b'broken')
+
+        transfer = FileTransfer(ShellPeer(['sh', '-c']), chunk_size=1024)
+        assert transfer.fetch(source, target)
+        assert open(target, 'rb').read() == open(source, 'rb').read()
@@ -0,0 +1,231 @@
+import gzip
+import hashlib
+import json
+import os
+import shlex
+import socket
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from mlcomp.db.core import Session
+from mlcomp.db.models import Computer
+from mlcomp.db.providers import ComputerProvider
+
+
+def _md5_file(path: str, chunk_size: int = 2 ** 20):
+    md5 = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+class LocalPeer:
+    """
+    Files of this computer
+    """
+
+    def size(self, path: str):
+        return os.path.getsize(path)
+
+    def read(self, path: str, offset: int, length: int,
+             compress: bool = False):
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            return f.read(length)
+
+    def md5(self, path: str):
+        return _md5_file(path)
+
+    def chunk_md5s(self, path: str, chunk_size: int, count: int):
+        res = []
+        with open(path, 'rb') as f:
+            for _ in range(count):
+                res.append(hashlib.md5(f.read(chunk_size)).hexdigest())
+        return res
+
+
+class ShellPeer:
+    """
+    Files read by shell commands run with the prefix:
+    ssh for another computer, ['sh', '-c'] for a loopback peer
+    """
+
+    def __init__(self, prefix: List[str]):
+        self.prefix = prefix
+
+    @classmethod
+    def ssh(cls, computer: Computer):
+        return cls([
+            'ssh', '-p', str(computer.port), '-o',
+            'StrictHostKeyChecking=no', f'{computer.user}@{computer.ip}'
+        ])
+
+    def _run(self, command: str):
+        res = subprocess.run(self.prefix + [command], stdout=subprocess.PIPE,
+                             stderr=subprocess.PIPE)
+        if res.returncode != 0:
+            raise Exception(res.stderr.decode(errors='replace'))
+        return res.stdout
+
+    def size(self, path: str):
+        return int(self._run(f'stat -c %s {shlex.quote(path)}'))
+
+    def read(self, path: str, offset: int, length: int,
+             compress: bool = False):
+        command = f'tail -c +{offset + 1} {shlex.quote(path)} ' \
+                  f'| head -c {length}'
+        if compress:
+            command += ' | gzip -1'
+        res = self._run(command)
+        return gzip.decompress(res) if compress else res
+
+    def md5(self, path: str):
+        return self._run(f'md5sum {shlex.quote(path)}').split()[0].decode()
+
+    def chunk_md5s(self, path: str, chunk_size: int, count: int):
+        command = f'for i in $(seq 0 {count - 1}); do ' \
+                  f'tail -c +$((i * {chunk_size} + 1)) {shlex.quote(path)} ' \
+                  f'| head -c {chunk_size} | md5sum; done'
+        return [
+            line.split()[0].decode()
+            for line in self._run(command).splitlines()
+        ]
+
+
+class FileTransfer:
+    """
+    Copies a file from a peer by chunks in parallel streams.
+
+    The file is written to <path>.part, the md5 of the received chunks
+    are kept in <path>.part.json, so an interrupted transfer resumes
+    from the received chunks. The md5 of the whole file is checked
+    at the end, the chunks which differ are transferred again
+    """
+
+    def __init__(self, peer, chunk_size: int = 64 * 2 ** 20,
+                 streams: int = 4, compress: bool = False,
+                 retries: int = 3):
+        self.peer = peer
+        self.chunk_size = chunk_size
+        self.streams = streams
+        self.compress = compress
+        self.retries = retries
+
+    def _load_state(self, file: str, size: int, source: str):
+        try:
+            with open(file) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if state['size'] != size or state['source'] != source or \
+                state['chunk_size'] != self.chunk_size:
+            return None
+        return state
+
+    def _save_state(self, file: str, state: dict):
+        tmp = f'{file}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, file)
+
+    def _fetch_chunks(self, path_from: str, part: str, state_file: str,
+                      state: dict, indexes: List[int]):
+        lock = threading.Lock()
+        size = state['size']
+        fd = os.open(part, os.O_WRONLY)
+
+        def fetch(index: int):
+            offset = index * self.chunk_size
+            length = min(self.chunk_size, size - offset)
+            for attempt in range(self.retries):
+                try:
+                    data = self.peer.read(path_from, offset, length,
+                                          compress=self.compress)
+                    if len(data) != length:
+                        raise Exception(f'chunk {index}: {len(data)} bytes '
+                                        f'received, {length} expected')
+                    break
+                except Exception:
+                    if attempt == self.retries - 1:
+                        raise
+
+            os.pwrite(fd, data, offset)
+            with lock:
+                state['done'][str(index)] = hashlib.md5(data).hexdigest()
+                self._save_state(state_file, state)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.streams) as executor:
+                for _ in executor.map(fetch, indexes):
+                    pass
+        finally:
+            os.close(fd)
+
+    def fetch(self, path_from: str, path_to: str, source: str = ''):
+        """
+        :param source: name of the peer, a transfer from another one
+        does not resume
+        """
+        part = f'{path_to}.part'
+        state_file = f'{part}.json'
+        size = self.peer.size(path_from)
+        count = max((size + self.chunk_size - 1) // self.chunk_size, 1)
+
+        state = self._load_state(state_file, size, source)
+        if state is None or not os.path.exists(part):
+            os.makedirs(os.path.dirname(os.path.abspath(path_to)),
+                        exist_ok=True)
+            with open(part, 'wb') as f:
+                f.truncate(size)
+            state = {
+                'size': size,
+                'source': source,
+                'chunk_size': self.chunk_size,
+                'done': dict()
+            }
+            self._save_state(state_file, state)
+
+        indexes = [i for i in range(count) if str(i) not in state['done']]
+        md5 = None
+        for _ in range(self.retries):
+            if size > 0:
+                self._fetch_chunks(path_from, part, state_file, state,
+                                   indexes)
+
+            md5 = md5 or self.peer.md5(path_from)
+            if _md5_file(part) == md5:
+                os.replace(part, path_to)
+                os.remove(state_file)
+                return True
+
+            remote = self.peer.chunk_md5s(path_from, self.chunk_size, count)
+            local = LocalPeer().chunk_md5s(part, self.chunk_size, count)
+            indexes = [i for i in range(count) if local[i] != remote[i]]
+            for i in indexes:
+                state['done'].pop(str(i), None)
+        return False
+
+
+def fetch_remote(
+        session: Session, computer_from: str, path_from: str, path_to: str,
+        **kwargs
+):
+    """
+    Copies a file from a computer, e.g. a checkpoint of a resumed task.
+    :param kwargs: FileTransfer arguments
+    """
+    if computer_from == socket.gethostname():
+        peer = LocalPeer()
+    else:
+        computer = ComputerProvider(session).by_name(computer_from)
+        peer = ShellPeer.ssh(computer)
+
+    transfer = FileTransfer(peer, **kwargs)
+    return transfer.fetch(path_from, path_to, source=computer_from)
+
+
+__all__ = ['LocalPeer', 'ShellPeer', 'FileTransfer', 'fetch_remote']
@@ -0,0 +1,111 @@
+import socket
+from typing import List
+
+import psutil
+
+from mlcomp import DOCKER_IMG
+from mlcomp.db.core import Session
+from mlcomp.db.enums import TaskStatus
+from mlcomp.db.models import Task
+from mlcomp.db.providers import TaskProvider, TaskUsageProvider
+from mlcomp.utils.io import yaml_load
+
+
+class TaskUsageSampler:
+    """
+    Samples the process trees of the tasks running on this computer:
+    cpu, rss, io and threads
+    """
+
+    def __init__(self):
+        # cpu_percent is measured since the previous call on the same object
+        self.processes = dict()
+
+    def _process(self, pid: int):
+        process = self.processes.get(pid)
+        if process is None or not process.is_running():
+            process = psutil.Process(pid)
+            self.processes[pid] = process
+        return process
+
+    def tree(self, task: Task):
+        """
+        The task process, the child processes it has reported
+        and all their children
+        """
+        pids = [task.pid]
+        if task.additional_info:
+            info = yaml_load(task.additional_info)
+            pids.extend(info.get('child_processes', []))
+
+        res = dict()
+        for pid in pids:
+            try:
+                process = self._process(pid)
+                res[process.pid] = process
+                for child in process.children(recursive=True):
+                    res[child.pid] = self._process(child.pid)
+            except psutil.Error:
+                continue
+        return list(res.values())
+
+    @staticmethod
+    def memory(process: psutil.Process):
+        """
+        Proportional set size, MB. The pages shared by the forked processes
+        (e.g. DataLoader workers) are divided between them.
+        rss if the system does not provide it
+        """
+        try:
+            info = process.memory_full_info()
+            if hasattr(info, 'pss'):
+                return info.pss / 2 ** 20
+            return info.uss / 2 ** 20
+        except (psutil.AccessDenied, AttributeError):
+            return process.memory_info().rss / 2 ** 20
+
+    @staticmethod
+    def measure(processes: List[psutil.Process]):
+        res = {'cpu': 0, 'memory': 0, 'read': 0, 'write': 0, 'threads': 0}
+        for process in processes:
+            try:
+                with process.oneshot():
+                    res['cpu'] += process.cpu_percent()
+                    res['memory'] += TaskUsageSampler.memory(process)
+                    res['threads'] += process.num_threads()
+                    try:
+                        io = process.io_counters()
+                        res['read'] += io.read_bytes / 2 ** 20
+                        res['write'] += io.write_bytes / 2 ** 20
+                    except (psutil.AccessDenied, AttributeError):
+                        pass
+            except psutil.Error:
+                continue
+        return res
+
+    def sample(self, session: Session):
+        provider = TaskProvider(session)
+        usage_provider = TaskUsageProvider(session)
+        tasks = provider.by_status(
+            TaskStatus.InProgress, task_docker_assigned=DOCKER_IMG,
+            computer_assigned=socket.gethostname()
+        )
+
+        pids = set()
+        for task in tasks:
+            if not task.pid:
+                continue
+            processes = self.tree(task)
+            if len(processes) == 0:
+                continue
+            pids.update(p.pid for p in processes)
+            usage_provider.add_sample(
+                task.id, task.started, self.measure(processes)
+            )
+
+        self.processes = {
+            pid: p for pid, p in self.processes.items() if pid in pids
+        }
+
+
+__all__ = ['TaskUsageSampler']